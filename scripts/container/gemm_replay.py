@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+
+"""
+gemm_replay.py
+
+Micro-benchmarks every unique GEMM of a hipBLASLt shape aggregate (hipblaslt_gemms.json written
+by run_model.py, a merged aggregate or a raw hipblaslt.log) and ranks them by aggregate cost,
+count x per-call time, so it's clear which shapes actually take the time.
+
+Benchmark backends are pluggable (BACKENDS):
+
+torch              torch.matmul on --device (cuda, or cpu to try the pipeline without a GPU),
+                   with the logged transposes reproduced as strided views
+hipblaslt-bench    runs hipblaslt-bench for every shape and reads its timing
+
+The worst offenders are exported as hipblaslt-bench command lines, the format of the
+HIPBLASLT_LOG_MASK=32 log, which hipBLASLt's offline tuning takes as input.
+
+Standalone usage:
+
+scripts/container/gemm_replay.py hipblaslt_gemms.json --top 50 -o gemm_replay.json
+scripts/container/gemm_replay.py hipblaslt_gemms.json --device cpu --top 5 -o gemm_replay.json
+scripts/container/gemm_replay.py merged.json --backend hipblaslt-bench --export-bench tune.txt
+
+"""
+
+import argparse
+import csv
+import json
+import statistics
+import subprocess
+import time
+from pathlib import Path
+
+from hipblaslt_log import KEY_FIELDS, GemmAggregate
+
+TORCH_DTYPES = {
+    "f16_r": "float16",
+    "bf16_r": "bfloat16",
+    "f32_r": "float32",
+    "f64_r": "float64",
+}
+DEFAULT_BENCH = "/opt/rocm/bin/hipblaslt-bench"
+
+
+def load_gemms(path):
+    path = Path(path)
+    if path.suffix == ".json":
+        aggregate = GemmAggregate.from_json(path)
+    else:
+        aggregate = GemmAggregate.from_log(path)
+    return aggregate.records()
+
+
+def flops(gemm):
+    return 2 * gemm["m"] * gemm["n"] * gemm["k"] * gemm["batch_count"]
+
+
+def bench_args(gemm):
+    # leading dimensions and strides are left to hipblaslt-bench, they follow from the shape
+    return [
+        "-m",
+        str(gemm["m"]),
+        "-n",
+        str(gemm["n"]),
+        "-k",
+        str(gemm["k"]),
+        "--batch_count",
+        str(gemm["batch_count"]),
+        "--transA",
+        gemm["transA"],
+        "--transB",
+        gemm["transB"],
+        *(
+            item
+            for name in ("a_type", "b_type", "c_type", "d_type", "compute_type")
+            if gemm[name]
+            for item in (f"--{name}", gemm[name])
+        ),
+    ]
+
+
+class TorchBackend:
+    """
+    Times torch.matmul on operands laid out like the logged column-major hipBLASLt call.
+    """
+
+    name = "torch"
+
+    def __init__(self, device="cuda"):
+        import torch
+
+        self.torch = torch
+        self.device = torch.device(device)
+
+    def supports(self, gemm):
+        # torch.matmul needs equal input types, the output type follows them
+        return gemm["a_type"] == gemm["b_type"] and gemm["a_type"] in TORCH_DTYPES
+
+    def _operand(self, rows, cols, transposed, dtype, batch):
+        size = (cols, rows) if transposed else (rows, cols)
+        tensor = self.torch.randn(
+            *((batch,) if batch > 1 else ()), *size, dtype=dtype, device=self.device
+        )
+        return tensor.transpose(-2, -1) if transposed else tensor
+
+    def _synchronize(self):
+        if self.device.type == "cuda":
+            self.torch.cuda.synchronize(self.device)
+
+    def operands(self, gemm):
+        """
+        (a, b) such that torch.matmul(b, a) runs the logged call: torch is row-major, the
+        column-major m x n result is a row-major n x m tensor, so torch computes
+        op(B)^T @ op(A)^T, which it hands to hipBLASLt as op(A) @ op(B).
+        """
+        dtype = getattr(self.torch, TORCH_DTYPES[gemm["a_type"]])
+        m, n, k, batch = gemm["m"], gemm["n"], gemm["k"], gemm["batch_count"]
+        a = self._operand(k, m, gemm["transA"] == "T", dtype, batch)
+        b = self._operand(n, k, gemm["transB"] == "T", dtype, batch)
+        return a, b
+
+    def time(self, gemm, warmup, repeats, rounds):
+        a, b = self.operands(gemm)
+        with self.torch.inference_mode():
+            for _ in range(warmup):
+                self.torch.matmul(b, a)
+            self._synchronize()
+            per_call = []
+            for _ in range(rounds):
+                start = time.perf_counter()
+                for _ in range(repeats):
+                    self.torch.matmul(b, a)
+                self._synchronize()
+                per_call.append((time.perf_counter() - start) / repeats)
+        return statistics.median(per_call)
+
+
+class HipblasltBenchBackend:
+    """
+    Runs hipblaslt-bench for every GEMM and reads the us column of its result table.
+    """
+
+    name = "hipblaslt-bench"
+
+    def __init__(self, bench=DEFAULT_BENCH, timeout=300):
+        self.bench = bench
+        self.timeout = timeout
+
+    def supports(self, gemm):
+        return True
+
+    def time(self, gemm, warmup, repeats, rounds):
+        cmd = [
+            self.bench,
+            *bench_args(gemm),
+            "-j",
+            str(warmup),
+            "-i",
+            str(repeats * rounds),
+        ]
+        proc = subprocess.run(cmd, capture_output=True, text=True, timeout=self.timeout)
+        if proc.returncode != 0:
+            raise RuntimeError(proc.stderr.strip() or f"exit code {proc.returncode}")
+        lines = [line.split(":", 1)[-1] for line in proc.stdout.splitlines()]
+        for header, values in zip(lines, lines[1:]):
+            columns = header.split(",")
+            if "us" in columns:
+                return float(values.split(",")[columns.index("us")]) / 1e6
+        raise RuntimeError("no timing in hipblaslt-bench output")
+
+
+BACKENDS = {
+    TorchBackend.name: TorchBackend,
+    HipblasltBenchBackend.name: HipblasltBenchBackend,
+}
+
+
+def replay(gemms, backend, warmup=10, repeats=50, rounds=5):
+    """
+    Times every GEMM, returns them with per_call_us and total_us (count x per call time),
+    ranked by total_us. GEMMs the backend can't run keep a status instead of timings.
+    """
+    results = []
+    for index, gemm in enumerate(gemms, 1):
+        label = (
+            f"m={gemm['m']} n={gemm['n']} k={gemm['k']} batch={gemm['batch_count']} "
+            f"{gemm['transA']}{gemm['transB']} {gemm['a_type']}"
+        )
+        status, per_call = "ok", None
+        if not backend.supports(gemm):
+            status = f"unsupported by {backend.name}"
+        else:
+            try:
+                per_call = backend.time(gemm, warmup, repeats, rounds)
+            except Exception as e:
+                status = f"failed: {e}"
+        print(
+            f"[{index}/{len(gemms)}] {label}: "
+            + (f"{per_call * 1e6:.2f} us x {gemm['count']}" if per_call else status)
+        )
+        results.append(
+            gemm
+            | {
+                "status": status,
+                "per_call_us": per_call * 1e6 if per_call else None,
+                "total_us": per_call * 1e6 * gemm["count"] if per_call else None,
+                "tflops": flops(gemm) / per_call / 1e12 if per_call else None,
+            }
+        )
+    results.sort(
+        key=lambda result: (result["total_us"] is None, -(result["total_us"] or 0))
+    )
+    return results
+
+
+def write_results(results, out_path, backend_name):
+    out_path = Path(out_path)
+    with out_path.with_suffix(".json").open("w") as f:
+        json.dump({"backend": backend_name, "gemms": results}, f, indent=1)
+    with out_path.with_suffix(".csv").open("w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(
+            [
+                "rank",
+                *KEY_FIELDS,
+                "count",
+                "per_call_us",
+                "total_us",
+                "tflops",
+                "status",
+            ]
+        )
+        for rank, result in enumerate(results, 1):
+            writer.writerow(
+                [
+                    rank,
+                    *(result[name] for name in KEY_FIELDS),
+                    result["count"],
+                    result["per_call_us"],
+                    result["total_us"],
+                    result["tflops"],
+                    result["status"],
+                ]
+            )
+
+
+def export_bench(results, path, top=None):
+    # one hipblaslt-bench line per GEMM, worst aggregate cost first
+    timed = [result for result in results if result["total_us"] is not None]
+    with Path(path).open("w") as f:
+        for result in timed[:top]:
+            f.write(" ".join(["hipblaslt-bench", *bench_args(result)]) + "\n")
+    return len(timed[:top])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark logged hipBLASLt GEMMs and rank them by aggregate cost."
+    )
+    parser.add_argument(
+        "gemms",
+        help="hipblaslt_gemms.json, a merged aggregate or a raw hipblaslt.log.",
+        type=Path,
+    )
+    parser.add_argument("--backend", choices=BACKENDS, default=TorchBackend.name)
+    parser.add_argument(
+        "--device", help="torch device, e.g. cuda or cpu.", default="cuda"
+    )
+    parser.add_argument(
+        "--bench", help="hipblaslt-bench executable.", default=DEFAULT_BENCH
+    )
+    parser.add_argument(
+        "--top", help="Only benchmark the most frequent GEMMs.", type=int
+    )
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument(
+        "--repeats", help="Calls per timed round.", type=int, default=50
+    )
+    parser.add_argument(
+        "--rounds", help="Timed rounds, the median is kept.", type=int, default=5
+    )
+    parser.add_argument("-o", "--output", type=Path, default=Path("gemm_replay.json"))
+    parser.add_argument(
+        "--export-bench",
+        help="Write the worst GEMMs as hipblaslt-bench lines for tuning.",
+        type=Path,
+    )
+    parser.add_argument("--export-top", help="GEMMs to export.", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.backend == TorchBackend.name:
+        backend = TorchBackend(args.device)
+    else:
+        backend = HipblasltBenchBackend(bench=args.bench)
+
+    gemms = load_gemms(args.gemms)[: args.top]
+    results = replay(gemms, backend, args.warmup, args.repeats, args.rounds)
+    write_results(results, args.output, backend.name)
+    print(f"Ranking of {len(results)} GEMMs written to {args.output}")
+    if args.export_bench:
+        exported = export_bench(results, args.export_bench, args.export_top)
+        print(f"Exported {exported} GEMMs to {args.export_bench}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+
+"""
+harness_bench.py
+
+Measures how much the harness adds to the latency it reports, per request, by running the text
+runner against the mock engine (LLM_BACKEND=mock, see runners/runner_utilities/mock.py), whose
+engine time is known from the request metrics it returns.
+
+Every scenario (<num_prompts>x<output_len>) runs on two paths:
+
+runner      the runner script on its own, output discarded
+run_model   the runner under run_model.py: subprocess pipe, Tee, LogWriter, MIOpen and engine
+            log parsing, like every container run
+
+and the steady state is split into:
+
+engine      the longest request of every iteration (prefill and decode sleeps)
+call        time inside the measured generate call the engine didn't spend (prompt handling,
+            output objects, progress output written to the pipe)
+loop        time between measured calls (metrics collection, trace window)
+
+Runs on a CPU-only box, no GPU, vLLM or torch needed:
+
+scripts/container/harness_bench.py -o harness_bench.csv
+scripts/container/harness_bench.py --scenarios 1x16 256x64 --decode-ms-per-step 0 --iterations 50
+
+"""
+
+import argparse
+import csv
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent
+RUNNER = "qwen_text.py"
+MODEL = "mock/harness-bench"
+PATHS = ("runner", "run_model")
+COLUMNS = (
+    "scenario",
+    "path",
+    "requests",
+    "wall_s",
+    "steady_state_s",
+    "engine_s",
+    "call_overhead_us",
+    "loop_overhead_us",
+    "overhead_us",
+    "overhead_pct",
+)
+
+
+def parse_scenario(value):
+    num_prompts, _, output_len = value.partition("x")
+    return int(num_prompts), int(output_len)
+
+
+def write_prompts(path, num_prompts, input_len):
+    # distinct prompts so the mock's prefix cache doesn't skip their prefill
+    with path.open("w") as f:
+        json.dump(
+            {
+                "prompts": [
+                    " ".join(f"w{i}_{j}" for j in range(input_len))
+                    for i in range(num_prompts)
+                ]
+            },
+            f,
+        )
+
+
+def overhead(log_dir):
+    """
+    Splits the steady state of a run into engine, in-call and between-call time.
+    """
+    with (log_dir / "metrics.json").open("r") as f:
+        metrics = json.load(f)
+    steady_state = sum(
+        phase["duration_s"]
+        for phase in metrics["phases"]
+        if phase["name"] == "steady_state"
+    )
+
+    # all requests of an iteration arrive together, the longest one is the engine's time
+    engine_by_iteration = defaultdict(float)
+    with (log_dir / "requests.csv").open("r", newline="") as f:
+        requests = list(csv.DictReader(f))
+    for request in requests:
+        iteration = request["iteration"]
+        engine_by_iteration[iteration] = max(
+            engine_by_iteration[iteration], float(request["e2e_s"])
+        )
+    with (log_dir / "iterations.csv").open("r", newline="") as f:
+        measured = sum(float(row["duration_s"]) for row in csv.DictReader(f))
+
+    engine = sum(engine_by_iteration.values())
+    num_requests = len(requests)
+    return {
+        "requests": num_requests,
+        "steady_state_s": steady_state,
+        "engine_s": engine,
+        "call_overhead_us": (measured - engine) / num_requests * 1e6,
+        "loop_overhead_us": (steady_state - measured) / num_requests * 1e6,
+        "overhead_us": (steady_state - engine) / num_requests * 1e6,
+        "overhead_pct": (
+            (steady_state - engine) / steady_state * 100 if steady_state else None
+        ),
+    }
+
+
+def run_path(path, work_dir, scenario, prompts_path, args, env):
+    runner_args = ["--prompts-path", str(prompts_path)]
+    runner_args += ["--iterations", str(args.iterations)]
+    if path == "runner":
+        log_dir = work_dir / "runner" / scenario
+        env = env | {"LOG_DIR": str(log_dir)}
+        cmd = [sys.executable, str(SCRIPT_DIR / "runners" / RUNNER), "--model", MODEL]
+    else:
+        logs_root = work_dir / "run_model"
+        env = env | {"LOGS_ROOT": str(logs_root), "RUN_ID": scenario}
+        log_dir = logs_root / env["DEVICE_NAME"] / MODEL.replace("/", "_") / scenario
+        cmd = [sys.executable, str(SCRIPT_DIR / "run_model.py"), "--script", RUNNER]
+        cmd += ["--model", MODEL]
+
+    start = time.monotonic()
+    result = subprocess.run(
+        cmd + runner_args,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    wall = time.monotonic() - start
+    if result.returncode != 0 or not (log_dir / "metrics.json").exists():
+        raise RuntimeError(
+            f"{path} failed on {scenario}: {result.stderr.strip()[-2000:]}"
+        )
+    return {"scenario": scenario, "path": path, "wall_s": wall} | overhead(log_dir)
+
+
+def bench(args, work_dir):
+    rows = []
+    for value in args.scenarios:
+        num_prompts, output_len = parse_scenario(value)
+        scenario = f"{num_prompts}x{output_len}"
+        prompts_path = work_dir / f"prompts_{scenario}.yaml"
+        write_prompts(prompts_path, num_prompts, args.input_len)
+        env = os.environ | {
+            "LLM_BACKEND": "mock",
+            "MOCK_OUTPUT_LEN": str(output_len),
+            "MOCK_PREFILL_MS_PER_TOKEN": str(args.prefill_ms_per_token),
+            "MOCK_DECODE_MS_PER_STEP": str(args.decode_ms_per_step),
+            "DEVICE_NAME": "mock",
+            "GPU_MEM_UTIL": "0.9",
+            "MAX_MODEL_LEN": str(args.input_len + output_len),
+            "SP_TEMPERATURE": "0",
+            "SP_MAX_TOKENS": str(output_len),
+            "WARMUP_ITERATIONS": "1",
+            "TELEMETRY": "0",
+        }
+        env.pop("GPU_DEVICE", None)
+        for path in args.paths:
+            row = run_path(path, work_dir, scenario, prompts_path, args, env)
+            print(
+                f"{scenario:>10} {path:>10}: {row['overhead_us']:.1f} us/request "
+                f"({row['overhead_pct']:.2f}% of steady state)"
+            )
+            rows.append(row)
+    return rows
+
+
+def print_rows(rows):
+    print(
+        f"\n{'scenario':>10} {'path':>10} {'requests':>9} {'engine s':>9} "
+        f"{'call us':>9} {'loop us':>9} {'total us':>9} {'%':>7}"
+    )
+    for row in rows:
+        print(
+            f"{row['scenario']:>10} {row['path']:>10} {row['requests']:>9} "
+            f"{row['engine_s']:>9.3f} {row['call_overhead_us']:>9.1f} "
+            f"{row['loop_overhead_us']:>9.1f} {row['overhead_us']:>9.1f} "
+            f"{row['overhead_pct']:>7.2f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the harness overhead per request on the mock engine."
+    )
+    parser.add_argument(
+        "--scenarios",
+        help="<num_prompts>x<output_len> per scenario.",
+        nargs="+",
+        default=["1x16", "16x128", "64x128", "256x32"],
+    )
+    parser.add_argument(
+        "--input-len", help="Words (mock tokens) per prompt.", type=int, default=128
+    )
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--prefill-ms-per-token", type=float, default=0.05)
+    parser.add_argument("--decode-ms-per-step", type=float, default=1.0)
+    parser.add_argument("--paths", choices=PATHS, nargs="+", default=list(PATHS))
+    parser.add_argument(
+        "--keep-logs",
+        help="Write the run logs here instead of a temporary directory.",
+        type=Path,
+    )
+    parser.add_argument("-o", "--output", help="Write the results as CSV.", type=Path)
+    args = parser.parse_args()
+
+    if args.keep_logs:
+        args.keep_logs.mkdir(parents=True, exist_ok=True)
+        rows = bench(args, args.keep_logs.resolve())
+    else:
+        with tempfile.TemporaryDirectory(prefix="harness_bench_") as work_dir:
+            rows = bench(args, Path(work_dir))
+
+    print_rows(rows)
+    if args.output:
+        with args.output.open("w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=COLUMNS)
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+
+"""
+hipblaslt_log.py
+
+Streaming aggregator for hipBLASLt bench logs (HIPBLASLT_LOG_MASK=32).
+
+Every logged GEMM is parsed into a normalized shape key, so formatting differences between
+otherwise identical calls no longer split them into separate entries. The log is tailed while
+the model runs, keeping memory bounded by the number of unique shapes rather than log size.
+
+Standalone usage:
+
+scripts/container/hipblaslt_log.py aggregate hipblaslt.log -o hipblaslt_gemms.json
+scripts/container/hipblaslt_log.py merge .logs/*/*/hipblaslt_gemms.json -o merged.json
+
+"""
+
+import argparse
+import csv
+import json
+import threading
+from collections import Counter, defaultdict
+from pathlib import Path
+
+# fields which identify a GEMM, everything else (leading dims, strides, alpha/beta) is ignored
+KEY_FIELDS = (
+    "m",
+    "n",
+    "k",
+    "batch_count",
+    "transA",
+    "transB",
+    "a_type",
+    "b_type",
+    "c_type",
+    "d_type",
+    "compute_type",
+)
+INT_FIELDS = {"m", "n", "k", "batch_count"}
+DEFAULTS = {"batch_count": 1, "transA": "N", "transB": "N"}
+
+# hard caps keeping memory bounded regardless of log size
+MAX_UNIQUE_KEYS = 100_000
+MAX_LINE_LENGTH = 64 * 1024
+
+
+def _normalize_type(value):
+    # some hipBLASLt versions prefix compute types, e.g. c_f32_r vs f32_r
+    value = value.lower()
+    return value[2:] if value.startswith("c_") else value
+
+
+def parse_line(line):
+    """
+    Parse a single hipblaslt-bench log line into a normalized GEMM key tuple (ordered as
+    KEY_FIELDS), or return None if the line is not a GEMM record.
+    """
+    if "-m" not in line or "-k" not in line:
+        return None
+    tokens = line.split()
+
+    fields = {}
+    for i, token in enumerate(tokens):
+        if not token.startswith("-") or i + 1 >= len(tokens):
+            continue
+        name = token.lstrip("-")
+        if name in KEY_FIELDS and name not in fields:
+            fields[name] = tokens[i + 1]
+
+    if not all(dim in fields for dim in ("m", "n", "k")):
+        return None
+
+    key = []
+    for name in KEY_FIELDS:
+        value = fields.get(name, DEFAULTS.get(name, ""))
+        if name in INT_FIELDS:
+            try:
+                value = int(value)
+            except ValueError:
+                return None
+        elif name.startswith("trans"):
+            value = str(value).upper()
+        else:
+            value = _normalize_type(str(value))
+        key.append(value)
+    return tuple(key)
+
+
+class GemmAggregate:
+    """
+    Counts of unique GEMM keys, broken down by source (e.g. "GPU/MODEL").
+    Keys beyond MAX_UNIQUE_KEYS are only counted in the overflow counter.
+    """
+
+    def __init__(self, source=None, max_keys=MAX_UNIQUE_KEYS):
+        self.source = source or "unknown"
+        self.max_keys = max_keys
+        self.counts = defaultdict(Counter)
+        self.unparsed = 0
+        self.overflow = 0
+
+    def add(self, key, count=1, source=None):
+        source = source or self.source
+        if key not in self.counts and len(self.counts) >= self.max_keys:
+            self.overflow += count
+            return
+        self.counts[key][source] += count
+
+    def feed(self, line):
+        if len(line) > MAX_LINE_LENGTH:
+            self.unparsed += 1
+            return
+        key = parse_line(line)
+        if key is None:
+            if line.strip():
+                self.unparsed += 1
+            return
+        self.add(key)
+
+    def merge(self, other):
+        for key, sources in other.counts.items():
+            for source, count in sources.items():
+                self.add(key, count, source)
+        self.unparsed += other.unparsed
+        self.overflow += other.overflow
+        return self
+
+    def records(self):
+        records = [
+            dict(zip(KEY_FIELDS, key))
+            | {"count": sum(sources.values()), "sources": dict(sources)}
+            for key, sources in self.counts.items()
+        ]
+        # descending sort by frequency
+        records.sort(key=lambda record: record["count"], reverse=True)
+        return records
+
+    def write_json(self, path):
+        with Path(path).open("w") as f:
+            json.dump(
+                {
+                    "key_fields": list(KEY_FIELDS),
+                    "unparsed": self.unparsed,
+                    "overflow": self.overflow,
+                    "gemms": self.records(),
+                },
+                f,
+                indent=1,
+            )
+
+    def write_csv(self, path):
+        with Path(path).open("w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow([*KEY_FIELDS, "count", "sources"])
+            for record in self.records():
+                writer.writerow(
+                    [
+                        *(record[name] for name in KEY_FIELDS),
+                        record["count"],
+                        ";".join(
+                            f"{source}={count}"
+                            for source, count in record["sources"].items()
+                        ),
+                    ]
+                )
+
+    @classmethod
+    def from_json(cls, path):
+        with Path(path).open("r") as f:
+            data = json.load(f)
+        aggregate = cls()
+        for record in data["gemms"]:
+            key = tuple(record[name] for name in KEY_FIELDS)
+            for source, count in record["sources"].items():
+                aggregate.add(key, count, source)
+        aggregate.unparsed = data.get("unparsed", 0)
+        aggregate.overflow = data.get("overflow", 0)
+        return aggregate
+
+    @classmethod
+    def from_log(cls, path, source=None):
+        aggregate = cls(source=source)
+        with Path(path).open("r", errors="replace") as f:
+            for line in f:
+                aggregate.feed(line)
+        return aggregate
+
+
+class LogTailer(threading.Thread):
+    """
+    Follows a log file while it is being written and feeds complete lines into an aggregate.
+    The file does not need to exist yet when the tailer is started.
+    """
+
+    def __init__(self, path, aggregate, interval=0.5, chunk_size=1 << 20):
+        super().__init__(daemon=True)
+        self.path = Path(path)
+        self.aggregate = aggregate
+        self.interval = interval
+        self.chunk_size = chunk_size
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self._offset = 0
+        self._partial = b""
+
+    def _poll(self):
+        with self._lock:
+            self._poll_locked()
+
+    def _poll_locked(self):
+        if not self.path.is_file():
+            return
+        if self.path.stat().st_size < self._offset:
+            # file was truncated/recreated, start over
+            self._offset = 0
+            self._partial = b""
+        with self.path.open("rb") as f:
+            f.seek(self._offset)
+            while chunk := f.read(self.chunk_size):
+                self._offset += len(chunk)
+                lines = (self._partial + chunk).split(b"\n")
+                self._partial = lines.pop()
+                if len(self._partial) > MAX_LINE_LENGTH:
+                    self._partial = b""
+                    self.aggregate.unparsed += 1
+                for line in lines:
+                    self.aggregate.feed(line.decode(errors="replace"))
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self._poll()
+
+    def take(self, aggregate):
+        """
+        Feeds everything written so far into the current aggregate and returns it, the following
+        lines go to the given one (e.g. per workload of a warm worker).
+        """
+        with self._lock:
+            self._poll_locked()
+            taken, self.aggregate = self.aggregate, aggregate
+        return taken
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        # drain whatever was written after the last poll, including an unterminated last line
+        self._poll()
+        if self._partial:
+            self.aggregate.feed(self._partial.decode(errors="replace"))
+            self._partial = b""
+        return self.aggregate
+
+
+def write_aggregate(aggregate, out_path):
+    out_path = Path(out_path)
+    aggregate.write_json(out_path.with_suffix(".json"))
+    aggregate.write_csv(out_path.with_suffix(".csv"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate hipBLASLt GEMM logs.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    aggregate_parser = subparsers.add_parser(
+        "aggregate", help="Aggregate a raw hipblaslt.log file."
+    )
+    aggregate_parser.add_argument("log", type=Path)
+    aggregate_parser.add_argument("--source", help="Label for this log, e.g. GPU/MODEL")
+    aggregate_parser.add_argument("-o", "--output", type=Path, required=True)
+
+    merge_parser = subparsers.add_parser(
+        "merge", help="Merge aggregates across runs, models and GPUs."
+    )
+    merge_parser.add_argument("aggregates", type=Path, nargs="+")
+    merge_parser.add_argument("-o", "--output", type=Path, required=True)
+
+    args = parser.parse_args()
+
+    if args.command == "aggregate":
+        aggregate = GemmAggregate.from_log(args.log, source=args.source)
+    else:
+        aggregate = GemmAggregate()
+        for path in args.aggregates:
+            aggregate.merge(GemmAggregate.from_json(path))
+
+    write_aggregate(aggregate, args.output)
+    print(f"Wrote {len(aggregate.counts)} unique GEMMs to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
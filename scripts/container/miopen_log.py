@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+
+"""
+miopen_log.py
+
+Extracts the MIOpenDriver commands MIOpen logs with MIOPEN_ENABLE_LOGGING_CMD=1, dedupes and
+counts them, and replays every unique command on its own to time it.
+
+Commands are normalized into a key of driver (conv, convfp16, bnorm, ...) and sorted arguments,
+without the timing/verification/iteration flags, so repeated calls of one config collapse into
+a single entry. run_model.py feeds the runner output into an aggregate while the model runs and
+writes miopen_cmds.json next to cmd.log. Ranked by count x time, the replay shows which
+convolution/normalization configs matter, and miopen_replay.sh holds them as standalone
+reproducers.
+
+Standalone usage:
+
+scripts/container/miopen_log.py extract .logs/<GPU>/<MODEL>/<run_id> -o miopen_cmds.json
+scripts/container/miopen_log.py replay miopen_cmds.json --top 20 -o miopen_replay.json
+
+"""
+
+import argparse
+import csv
+import json
+import re
+import shlex
+import subprocess
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from utilities import log_segments, open_log_segment
+
+COMMAND_PATTERN = re.compile(r"MIOpenDriver\s+(\w+)\s*(.*)$")
+# flags controlling how the driver runs rather than what it runs, replay sets its own
+RUN_FLAGS = {"t", "time", "V", "verify", "i", "iter", "w", "wall"}
+NUMBER = re.compile(r"-?\d+(\.\d+)?")
+ELAPSED = re.compile(r"Elapsed:\s*([\d.]+)\s*ms(.*)")
+DEFAULT_DRIVER = "/opt/rocm/bin/MIOpenDriver"
+
+# hard caps keeping memory bounded regardless of log size
+MAX_UNIQUE_KEYS = 100_000
+MAX_LINE_LENGTH = 64 * 1024
+
+
+def _is_flag(token):
+    return token.startswith("-") and not NUMBER.fullmatch(token)
+
+
+def parse_line(line):
+    """
+    Parse a log line into a normalized (driver, ((flag, value), ...)) key, or return None if
+    the line holds no MIOpenDriver command.
+    """
+    match = COMMAND_PATTERN.search(line)
+    if not match:
+        return None
+    driver, tokens = match.group(1), shlex.split(match.group(2), posix=False)
+
+    arguments = {}
+    i = 0
+    while i < len(tokens):
+        if not _is_flag(tokens[i]):
+            # stray token, e.g. a log suffix after the command
+            i += 1
+            continue
+        flag = tokens[i].lstrip("-")
+        value = ""
+        if i + 1 < len(tokens) and not _is_flag(tokens[i + 1]):
+            value = tokens[i + 1]
+            i += 1
+        if flag not in RUN_FLAGS:
+            arguments.setdefault(flag, value)
+        i += 1
+    return driver, tuple(sorted(arguments.items()))
+
+
+def command_args(key):
+    driver, arguments = key
+    args = [driver]
+    for flag, value in arguments:
+        args.append(f"-{flag}" if len(flag) == 1 else f"--{flag}")
+        if value != "":
+            args.append(value)
+    return args
+
+
+class MiopenCommands:
+    """
+    Counts of unique MIOpenDriver commands, broken down by source (e.g. "GPU/MODEL").
+    Keys beyond MAX_UNIQUE_KEYS are only counted in the overflow counter.
+    """
+
+    def __init__(self, source=None, max_keys=MAX_UNIQUE_KEYS):
+        self.source = source or "unknown"
+        self.max_keys = max_keys
+        self.counts = defaultdict(Counter)
+        self.overflow = 0
+
+    def add(self, key, count=1, source=None):
+        source = source or self.source
+        if key not in self.counts and len(self.counts) >= self.max_keys:
+            self.overflow += count
+            return
+        self.counts[key][source] += count
+
+    def feed(self, line):
+        if len(line) > MAX_LINE_LENGTH or "MIOpenDriver" not in line:
+            return
+        key = parse_line(line)
+        if key is not None:
+            self.add(key)
+
+    def merge(self, other):
+        for key, sources in other.counts.items():
+            for source, count in sources.items():
+                self.add(key, count, source)
+        self.overflow += other.overflow
+        return self
+
+    def records(self):
+        records = [
+            {
+                "driver": key[0],
+                "args": dict(key[1]),
+                "command": shlex.join(command_args(key)),
+                "count": sum(sources.values()),
+                "sources": dict(sources),
+            }
+            for key, sources in self.counts.items()
+        ]
+        # descending sort by frequency
+        records.sort(key=lambda record: record["count"], reverse=True)
+        return records
+
+    def write_json(self, path):
+        with Path(path).open("w") as f:
+            json.dump(
+                {"overflow": self.overflow, "commands": self.records()}, f, indent=1
+            )
+
+    @classmethod
+    def from_json(cls, path):
+        with Path(path).open("r") as f:
+            data = json.load(f)
+        commands = cls()
+        for record in data["commands"]:
+            key = (record["driver"], tuple(sorted(record["args"].items())))
+            for source, count in record["sources"].items():
+                commands.add(key, count, source)
+        commands.overflow = data.get("overflow", 0)
+        return commands
+
+    @classmethod
+    def from_log(cls, path, source=None):
+        """
+        Reads a log and its rotated, possibly compressed segments (cmd.log.1.zst, ...).
+        """
+        commands = cls(source=source)
+        for segment in log_segments(path):
+            with open_log_segment(segment) as f:
+                for line in f:
+                    commands.feed(line)
+        return commands
+
+
+def _elapsed_ms(output):
+    # prefer the averages over all iterations, the first iteration includes kernel compilation
+    timings = [(float(ms), "average" in rest) for ms, rest in ELAPSED.findall(output)]
+    averages = [ms for ms, average in timings if average]
+    values = averages or [ms for ms, _ in timings]
+    return sum(values) / len(values) if values else None
+
+
+def replay(records, driver=DEFAULT_DRIVER, iterations=10, timeout=300):
+    """
+    Runs every command on its own with timing on and verification off, returns the records
+    with time_ms (per call) and total_ms (count x time), ranked by total_ms.
+    """
+    results = []
+    for record in records:
+        args = shlex.split(record["command"])
+        cmd = [driver, *args, "-t", "1", "-V", "0", "-i", str(iterations)]
+        print(f"Replaying ({record['count']}x): {shlex.join(cmd)}")
+        try:
+            proc = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+            returncode, output = proc.returncode, proc.stdout + proc.stderr
+        except subprocess.TimeoutExpired:
+            returncode, output = None, ""
+        time_ms = _elapsed_ms(output) if returncode == 0 else None
+        results.append(
+            record
+            | {
+                "replay": shlex.join(cmd),
+                "returncode": returncode,
+                "time_ms": time_ms,
+                "total_ms": record["count"] * time_ms if time_ms is not None else None,
+            }
+        )
+    results.sort(
+        key=lambda result: (result["total_ms"] is None, -(result["total_ms"] or 0))
+    )
+    return results
+
+
+def write_replay(results, out_path):
+    out_path = Path(out_path)
+    with out_path.with_suffix(".json").open("w") as f:
+        json.dump({"commands": results}, f, indent=1)
+    with out_path.with_suffix(".csv").open("w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(
+            ["rank", "count", "time_ms", "total_ms", "returncode", "command"]
+        )
+        for rank, result in enumerate(results, 1):
+            writer.writerow(
+                [
+                    rank,
+                    result["count"],
+                    result["time_ms"],
+                    result["total_ms"],
+                    result["returncode"],
+                    result["replay"],
+                ]
+            )
+    # standalone reproducers, worst offenders first
+    with out_path.with_suffix(".sh").open("w") as f:
+        f.write("#!/usr/bin/env bash\n")
+        for result in results:
+            time_ms = (
+                f"{result['time_ms']:.4f} ms"
+                if result["time_ms"] is not None
+                else "failed"
+            )
+            f.write(f"# {result['count']} calls, {time_ms} per call\n")
+            f.write(f"{result['replay']}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract and replay MIOpen commands.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    extract_parser = subparsers.add_parser(
+        "extract",
+        help="Collect MIOpenDriver commands from logs (run dirs, cmd.log or miopen_cmds.json).",
+    )
+    extract_parser.add_argument("logs", type=Path, nargs="+")
+    extract_parser.add_argument("-o", "--output", type=Path, required=True)
+
+    replay_parser = subparsers.add_parser(
+        "replay", help="Time the most frequent commands of a miopen_cmds.json."
+    )
+    replay_parser.add_argument("commands", type=Path)
+    replay_parser.add_argument("--driver", default=DEFAULT_DRIVER)
+    replay_parser.add_argument(
+        "--top", help="Number of most frequent commands to replay.", type=int
+    )
+    replay_parser.add_argument("--iterations", type=int, default=10)
+    replay_parser.add_argument(
+        "--timeout", help="Seconds per command.", type=float, default=300
+    )
+    replay_parser.add_argument("-o", "--output", type=Path, required=True)
+
+    args = parser.parse_args()
+
+    if args.command == "extract":
+        commands = MiopenCommands()
+        for path in args.logs:
+            if path.suffix == ".json":
+                commands.merge(MiopenCommands.from_json(path))
+                continue
+            log_path = path / "cmd.log" if path.is_dir() else path
+            source = (
+                f"{log_path.parent.parent.parent.name}/{log_path.parent.parent.name}"
+            )
+            commands.merge(MiopenCommands.from_log(log_path, source=source))
+        commands.write_json(args.output)
+        print(f"Wrote {len(commands.counts)} unique MIOpen commands to {args.output}")
+    else:
+        records = MiopenCommands.from_json(args.commands).records()[: args.top]
+        results = replay(records, args.driver, args.iterations, args.timeout)
+        write_replay(results, args.output)
+        print(f"Replayed {len(results)} commands, ranking written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
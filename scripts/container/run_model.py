@@ -12,23 +12,67 @@ from pathlib import Path
 import subprocess
 import sys
 import argparse
+import json
+import re
+import time
 import traceback
-from collections import Counter
-from utilities import Tee
+from utilities import LogWriter, Tee
+from hipblaslt_log import GemmAggregate, LogTailer, write_aggregate
+from miopen_log import MiopenCommands
+from telemetry import annotate_metrics, start_sampler
+
+sys.path.insert(0, str(Path(__file__).parent / "runners"))
+from runner_utilities.events import emit
+
+# startup phases vLLM only reports in its log, (phase, pattern capturing the duration in seconds)
+ENGINE_PHASE_PATTERNS = [
+    ("weight_download", r"Time spent downloading weights for .*?: ([\d.]+) seconds"),
+    ("weight_load", r"Model loading took .*? and ([\d.]+) seconds"),
+    ("torch_compile", r"torch\.compile takes ([\d.]+) s in total"),
+    ("memory_profiling", r"Memory profiling takes ([\d.]+) seconds"),
+    ("graph_capture", r"Graph capturing finished in ([\d.]+) secs"),
+    ("engine_core_init", r"init engine \(.*?\) took ([\d.]+) seconds"),
+]
+ENGINE_PHASE_PATTERNS = [
+    (name, re.compile(pattern)) for name, pattern in ENGINE_PHASE_PATTERNS
+]
+RUNNERS_DIR = Path(__file__).parent / "runners"
+# the logs dir mounted by docker_tool.py, LOGS_ROOT moves it for runs outside a container
+DEFAULT_LOGS_ROOT = "/workspace/logs"
 
 
 # TODO: move this to docker_tool.py; re-asses whether this script is needed or if commonalities can be
 # mut into a seperate file, env setup in dockertool, and runners executed directly
-def setup_environment(model, **custom_env_vars):
+def run_log_dir(model, run_id=None):
     # TODO: add support for windows paths
+    gpu_name = os.getenv("DEVICE_NAME", "GPU").replace(" ", "_")
+    log_dir = (
+        Path(os.getenv("LOGS_ROOT", DEFAULT_LOGS_ROOT))
+        / gpu_name
+        / model.replace("/", "_")
+    )
+    # sweeps run every configuration in its own subdirectory
+    run_id = os.getenv("RUN_ID") if run_id is None else run_id
+    return log_dir / run_id if run_id else log_dir
+
 
+def setup_environment(model, run_id=None, tee=True, **custom_env_vars):
     gpu_name = os.getenv("DEVICE_NAME", "GPU").replace(" ", "_")
-    log_dir = Path(f'/workspace/logs/{gpu_name}/{model.replace("/", "_")}')
+    log_dir = run_log_dir(model, run_id)
     log_dir.mkdir(parents=True, exist_ok=True)
-    log_file = open(log_dir / "cmd.log", "w", buffering=1)
+    # file IO happens on a background thread, cmd.log is rotated to cmd.log.<n> past LOG_MAX_MB
+    compression = os.getenv("LOG_COMPRESSION", "zstd")
+    log_file = LogWriter(
+        log_dir / "cmd.log",
+        max_bytes=int(float(os.getenv("LOG_MAX_MB", "256")) * 2**20),
+        compression=None if compression == "none" else compression,
+    )
     hipblaslt_log_path = str(log_dir / "hipblaslt.log")
-    sys.stdout = Tee(sys.stdout, log_file)
-    sys.stderr = Tee(sys.stderr, log_file)
+    log_file.flush_with(sys.stdout, sys.stderr)
+    # without tee the caller writes the log itself, e.g. the worker capturing its own output
+    if tee:
+        sys.stdout = Tee(sys.stdout, log_file)
+        sys.stderr = Tee(sys.stderr, log_file)
 
     env = {
         "MIOPEN_ENABLE_LOGGING": "1",
@@ -36,6 +80,8 @@ def setup_environment(model, **custom_env_vars):
         "HIPBLASLT_LOG_MASK": "32",
         "TORCH_BLAS_PREFER_HIPBLASLT": "1",
         "HIPBLASLT_LOG_FILE": hipblaslt_log_path,
+        # runners write machine-readable results (metrics.json, requests.csv) here
+        "LOG_DIR": str(log_dir),
         # default config
         "GPU_MEM_UTIL": os.getenv("GPU_MEM_UTIL", "0.85"),
         "SP_TEMPERATURE": os.getenv("SP_TEMPERATURE", "0.5"),
@@ -49,29 +95,100 @@ def setup_environment(model, **custom_env_vars):
     return (log_file, hipblaslt_log_path, gpu_name)
 
 
-def sort_hipblaslt_log(hipblaslt_log_path):
-    log_path = Path(hipblaslt_log_path)
-    if not log_path.is_file():
-        raise FileNotFoundError(f"{log_path} does not exist")
-
-    sorted_log_path = log_path.parent / "sorted_hipblaslt.log"
-
-    line_counter = Counter()
-    with log_path.open("r") as f:
-        for line in f:
-            line_counter[line] += 1
+def parse_engine_phase(line):
+    """
+    Returns a phase for vLLM log lines reporting a startup duration, the line being printed
+    marks the end of the phase.
+    """
+    for name, pattern in ENGINE_PHASE_PATTERNS:
+        match = pattern.search(line)
+        if match:
+            end = time.time()
+            duration = float(match.group(1))
+            return {
+                "name": name,
+                "start": end - duration,
+                "end": end,
+                "duration_s": duration,
+            }
+    return None
+
+
+def _env_phase(name, start_var, end_var=None, end=None):
+    start = os.getenv(start_var)
+    end = os.getenv(end_var) if end_var else end
+    if not start or not end:
+        return None
+    start, end = float(start), float(end)
+    return {"name": name, "start": start, "end": end, "duration_s": end - start}
+
+
+def write_phase_timeline(log_dir, script_start, engine_phases, container_phases=True):
+    """
+    Merges the container phases, the engine phases parsed from the log and the phases recorded
+    by the runner (in metrics.json) into phases.json. Startup time is everything before
+    the first steady state iteration, from the container launch or, without container_phases
+    (workloads of a warm worker after the first), from script_start.
+    """
+    phases = list(engine_phases)
+    if container_phases:
+        phases += [
+            _env_phase(
+                "container_start",
+                "CONTAINER_LAUNCH_TS",
+                end=os.getenv("PIP_INSTALL_START_TS") or script_start,
+            ),
+            _env_phase("pip_install", "PIP_INSTALL_START_TS", "PIP_INSTALL_END_TS"),
+        ]
+
+    # sweeps (embedding batch sizes, online rates) write a metrics.json per configuration
+    metrics_files = {}
+    for metrics_path in sorted(log_dir.rglob("metrics.json")):
+        with metrics_path.open("r") as f:
+            metrics_files[metrics_path] = json.load(f)
+        phases.extend(metrics_files[metrics_path].get("phases", []))
+    # phases shared by several configurations (prefix-ab arms) are listed in each metrics.json
+    unique = {(phase["name"], phase["start"]): phase for phase in phases if phase}
+    phases = sorted(unique.values(), key=lambda p: p["start"])
+
+    run_start = (
+        float(os.getenv("CONTAINER_LAUNCH_TS", script_start))
+        if container_phases
+        else script_start
+    )
+    steady_state = [phase for phase in phases if phase["name"] == "steady_state"]
+    startup = steady_state[0]["start"] - run_start if steady_state else None
+    # whether compile caches from earlier runs were available (see compile_cache.py on the host)
+    startup_metrics = {
+        "startup_s": startup,
+        "compile_cache": os.getenv("COMPILE_CACHE_STATE"),
+    }
+    with (log_dir / "phases.json").open("w") as f:
+        json.dump(startup_metrics | {"phases": phases}, f, indent=2)
+    emit("startup", **startup_metrics)
 
-    # descending sort by frequency
-    sorted_lines = line_counter.most_common()
+    print(f"\n{'phase':<20} {'duration (s)':>12}")
+    for phase in phases:
+        print(f"{phase['name']:<20} {phase['duration_s']:>12.2f}")
+    if startup is not None:
+        print(f"{'startup total':<20} {startup:>12.2f}")
 
-    with sorted_log_path.open("w") as f:
-        for line, count in sorted_lines:
-            f.write(f"{count} {line}")
+    # startup is tracked like any other metric of the run
+    for metrics_path, metrics in metrics_files.items():
+        with metrics_path.open("w") as f:
+            json.dump(metrics | startup_metrics, f, indent=2)
 
 
 def run(model, script, extra_args):
+    script_start = time.time()
     log_file, hipblaslt_log_path, gpu_name = setup_environment(model)
-    import torch
+    try:
+        import torch
+
+        torch_version = torch.__version__
+    except ImportError:
+        # the mock engine (LLM_BACKEND=mock) runs without torch
+        torch_version = "not installed"
 
     print(f"\n{'='*60}")
     print(f"Model: {model}")
@@ -88,11 +205,22 @@ def run(model, script, extra_args):
     print(f"{'='*60}\n")
 
     print(f"GPU: {gpu_name}")
-    print(f"PyTorch: {torch.__version__}\n")
+    print(f"PyTorch: {torch_version}\n")
+
+    # aggregate GEMM shapes while the model runs instead of re-reading the whole log afterwards
+    # a log left over from a previous run would otherwise be counted before hipBLASLt truncates it
+    Path(hipblaslt_log_path).unlink(missing_ok=True)
+    hipblaslt_tailer = LogTailer(
+        hipblaslt_log_path, GemmAggregate(source=f"{gpu_name}/{model}")
+    )
+    hipblaslt_tailer.start()
+    telemetry_sampler = start_sampler(os.environ["LOG_DIR"])
 
     print(f"Calling: {script}")
+    # the runner arguments (prompts or workload) complete the run's config next to its env
+    emit("run_start", model=model, script=script, args=extra_args)
     proc = subprocess.Popen(
-        [f"/workspace/scripts/runners/{script}", "--model", model, *extra_args],
+        [str(RUNNERS_DIR / script), "--model", model, *extra_args],
         stdout=subprocess.PIPE,
         stderr=subprocess.STDOUT,
         text=True,
@@ -100,11 +228,21 @@ def run(model, script, extra_args):
         env=os.environ.copy(),
     )
 
+    engine_phases = []
+    # MIOpen logs its commands (MIOPEN_ENABLE_LOGGING_CMD) on the runner's stderr
+    miopen_commands = MiopenCommands(source=f"{gpu_name}/{model}")
     for line in proc.stdout:
         sys.stdout.write(line)
+        miopen_commands.feed(line)
+        phase = parse_engine_phase(line)
+        if phase:
+            engine_phases.append(phase)
+            emit("phase", source="vllm_log", **phase)
 
     result = proc.wait()
     proc.stdout.close()
+    telemetry_summary = telemetry_sampler.stop() if telemetry_sampler else None
+    emit("run_end", returncode=result, wall_time_s=time.time() - script_start)
 
     if result != 0:
         print(f"{'='*60}")
@@ -112,6 +250,11 @@ def run(model, script, extra_args):
         traceback.print_stack()
         print(f"{'='*60}")
     else:
+        write_phase_timeline(Path(os.environ["LOG_DIR"]), script_start, engine_phases)
+        if telemetry_sampler:
+            annotate_metrics(os.environ["LOG_DIR"], telemetry_sampler)
+            emit("telemetry", **telemetry_summary)
+            print(f"Telemetry: {json.dumps(telemetry_summary)}")
         print(f"{'='*60}")
         print("Complete!")
         print(f"{'='*60}")
@@ -120,7 +263,12 @@ def run(model, script, extra_args):
     sys.stdout.flush()
     sys.stderr.flush()
     log_file.close()
-    sort_hipblaslt_log(hipblaslt_log_path=hipblaslt_log_path)
+    write_aggregate(
+        hipblaslt_tailer.stop(),
+        Path(hipblaslt_log_path).parent / "hipblaslt_gemms.json",
+    )
+    if miopen_commands.counts:
+        miopen_commands.write_json(Path(hipblaslt_log_path).parent / "miopen_cmds.json")
 
 
 def main():
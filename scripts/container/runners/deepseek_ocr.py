@@ -7,7 +7,7 @@ Script for running Deepseek-OCR image-to-text model.
 
 """
 
-from vllm import LLM, SamplingParams
+from vllm import SamplingParams
 from vllm.model_executor.models.deepseek_ocr import NGramPerReqLogitsProcessor
 
 import os
@@ -15,17 +15,36 @@ import sys
 
 from runner_utilities.preprocess import load_prompts, load_images, prepare_prompts
 from runner_utilities.argparse import parse_and_validate_args
-from runner_utilities.runner_tools import generate_and_collect
+from runner_utilities.runner_tools import build_llm, generate_and_collect
 
 
-def run(model, duration, iterations, prompts):
-    llm = LLM(
+DESCRIPTION = "Run Deepseek-OCR image-to-text model."
+RESOURCES = True
+
+
+def create_llm(model):
+    return build_llm(
         model=model,
+        # default off for this model, ENABLE_PREFIX_CACHING=1 or RUN_MODE=prefix-ab enable it
         enable_prefix_caching=False,
         mm_processor_cache_gb=0,
         logits_processors=[NGramPerReqLogitsProcessor],
+        # needed for per-request timings in RequestOutput.metrics
+        disable_log_stats=False,
+    )
+
+
+def load_inputs(args):
+    return prepare_prompts(
+        load_prompts(args.prompts_path),
+        load_images(args.resources_path),
     )
 
+
+def run(model, duration, iterations, prompts, llm=None):
+    if llm is None:
+        llm = create_llm(model)
+
     # TODO: extract os.getenv and cast in a separate fun shared across runners
     sampling_params = SamplingParams(
         temperature=float(os.getenv("SP_TEMPERATURE")),
@@ -39,7 +58,7 @@ def run(model, duration, iterations, prompts):
         skip_special_tokens=False,
     )
 
-    _ = generate_and_collect(
+    generate_and_collect(
         model=model,
         duration=duration,
         iterations=iterations,
@@ -52,20 +71,14 @@ def run(model, duration, iterations, prompts):
 
 def main():
     args = parse_and_validate_args(
-        description="Run Deepseek-OCR image-to-text model.",
-        resources=True,
-        argv=sys.argv,
+        description=DESCRIPTION, resources=RESOURCES, argv=sys.argv
     )
 
-    prompts = prepare_prompts(
-        load_prompts(args.prompts_path),
-        load_images(args.resources_path),
-    )
     run(
         model=args.model,
         duration=args.duration,
         iterations=args.iterations,
-        prompts=prompts,
+        prompts=load_inputs(args),
     )
 
 
@@ -7,63 +7,150 @@ Script for running embedding models (tested on Qwen-Embedding-4B)
 
 """
 
-from vllm import LLM
+import csv
 import sys
 import time
 import os
+from pathlib import Path
 from runner_utilities.preprocess import load_prompts
 from runner_utilities.argparse import parse_and_validate_args
+from runner_utilities.metrics import MetricsCollector
+from runner_utilities.profiler import TraceWindow
+from runner_utilities.phases import PHASES
+from runner_utilities.runner_tools import build_llm, warmup
+from runner_utilities.workload import load_workload
 
 
-def run(model, duration, iterations, prompts):
+DESCRIPTION = "Script for running embedding models."
+RESOURCES = False
+# synthetic workloads only set the input lengths, embeddings generate nothing
+SYNTHETIC = True
+
+
+def create_llm(model):
     max_model_len = int(os.getenv("MAX_MODEL_LEN", 0))
-    llm = LLM(
+    return build_llm(
+        mode="offline",
         model=model,
         runner="pooling",
         gpu_memory_utilization=float(os.getenv("GPU_MEM_UTIL")),
         max_model_len=max_model_len if max_model_len else None,
     )
 
-    outputs = []
+
+def load_inputs(args):
+    if args.workload:
+        return load_workload(args.workload, args.model)
+    return load_prompts(args.prompts_path)
+
+
+def batch_sizes(num_prompts):
+    # e.g. EMBED_BATCH_SIZES="1,8,32", by default all prompts are embedded in one call
+    value = os.getenv("EMBED_BATCH_SIZES")
+    if not value:
+        return [num_prompts]
+    return [int(size) for size in value.split(",")]
+
+
+def bucket_by_length(llm, prompts):
+    # neighbouring prompts have similar token lengths, so batches carry less padding work
+    tokenizer = llm.get_tokenizer()
+
+    def num_tokens(prompt):
+        if isinstance(prompt, dict):
+            return len(prompt["prompt_token_ids"])
+        return len(tokenizer.encode(prompt))
+
+    return sorted(prompts, key=num_tokens)
+
+
+def run_batch_size(model, duration, iterations, prompts, llm, batch_size):
+    warmup(lambda: llm.embed(prompts[:batch_size], use_tqdm=False))
+
     iteration_count = 0
     start = time.monotonic()
 
-    # yield prompts cyclically until condition is no longer true
-    def prompt_generator():
+    # yield batches of prompts, cycling through the prompt list, until condition is no longer true
+    def batch_generator():
         def condition():
             if duration:
                 return time.monotonic() - start < duration
             elif iterations:
                 return iteration_count < iterations
 
-        while True:
-            for prompt in prompts:
-                if condition():
-                    yield prompt
-                else:
-                    return
-
-    for prompt in prompt_generator():
-        outputs.extend(llm.embed(prompt))
-        iteration_count += 1
+        offset = 0
+        while condition():
+            yield [prompts[(offset + i) % len(prompts)] for i in range(batch_size)]
+            offset = (offset + batch_size) % len(prompts)
+
+    # only per-request records are kept, the embedding vectors are dropped after each call
+    collector = MetricsCollector(model, mode="embed", batch_size=batch_size)
+    trace_window = TraceWindow(llm)
+    with PHASES.phase("steady_state", batch_size=batch_size):
+        for batch in batch_generator():
+            trace_window.before_iteration(iteration_count)
+            batch_start = time.monotonic()
+            batch_outputs = llm.embed(batch)
+            collector.add_batch(batch_outputs, batch_start, time.monotonic())
+            trace_window.after_iteration(iteration_count)
+            iteration_count += 1
 
     print(
-        f"Total runtime: {time.monotonic() - start:.2f}s for {iterations} iterations."
+        f"Batch size {batch_size} total runtime: {time.monotonic() - start:.2f}s "
+        f"for {iteration_count} iterations."
     )
+    return collector
+
+
+def run(model, duration, iterations, prompts, llm=None):
+    if llm is None:
+        llm = create_llm(model)
+
+    if os.getenv("EMBED_BUCKET_BY_LENGTH", "0") == "1":
+        prompts = bucket_by_length(llm, prompts)
+
+    sizes = batch_sizes(len(prompts))
+    if len(sizes) == 1:
+        run_batch_size(model, duration, iterations, prompts, llm, sizes[0]).report()
+        return
+
+    log_dir = Path(os.getenv("LOG_DIR", "."))
+    summaries = [
+        run_batch_size(model, duration, iterations, prompts, llm, size).report(
+            log_dir / f"batch_size_{size}"
+        )
+        for size in sizes
+    ]
+
+    columns = ("batch_size", "requests_per_s", "prompt_tokens_per_s")
+    with (log_dir / "embedding_sweep.csv").open("w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        writer.writerows(
+            [summary[column] for column in columns] for summary in summaries
+        )
+
+    print(f"{'batch size':>12} {'embeddings/s':>14} {'tokens/s':>14}")
+    for summary in summaries:
+        print(
+            f"{summary['batch_size']:>12} {summary['requests_per_s'] or 0:>14.2f} "
+            f"{summary['prompt_tokens_per_s'] or 0:>14.2f}"
+        )
 
 
 def main():
     args = parse_and_validate_args(
-        description="Script for running embedding models.", argv=sys.argv
+        description=DESCRIPTION,
+        resources=RESOURCES,
+        argv=sys.argv,
+        synthetic=SYNTHETIC,
     )
 
-    prompts = load_prompts(args.prompts_path)
-
     run(
         model=args.model,
         duration=args.duration,
         iterations=args.iterations,
-        prompts=prompts,
+        prompts=load_inputs(args),
     )
 
 
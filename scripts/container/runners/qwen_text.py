@@ -7,30 +7,46 @@ Script for running Qwen3 text models.
 
 """
 
-from vllm import LLM, SamplingParams
-import torch
-
 import os
 import sys
-from pathlib import Path
 from runner_utilities.preprocess import load_prompts
 from runner_utilities.argparse import parse_and_validate_args
-from runner_utilities.runner_tools import generate_and_collect
+from runner_utilities.runner_tools import build_llm, generate_and_collect
+from runner_utilities.workload import load_workload, sampling_params_for
+
 
+DESCRIPTION = "Script for running Qwen3 textual models."
+RESOURCES = False
+SYNTHETIC = True
 
-def run(model, duration, iterations, prompts):
-    llm = LLM(
+
+def create_llm(model):
+    return build_llm(
         model=model,
         gpu_memory_utilization=float(os.getenv("GPU_MEM_UTIL")),
         max_model_len=int(os.getenv("MAX_MODEL_LEN")),
+        # needed for per-request timings in RequestOutput.metrics
+        disable_log_stats=False,
     )
 
-    sampling_params = SamplingParams(
+
+def load_inputs(args):
+    if args.workload:
+        return load_workload(args.workload, args.model)
+    return load_prompts(args.prompts_path)
+
+
+def run(model, duration, iterations, prompts, llm=None):
+    if llm is None:
+        llm = create_llm(model)
+
+    sampling_params = sampling_params_for(
+        prompts,
         temperature=float(os.getenv("SP_TEMPERATURE")),
         max_tokens=int(os.getenv("SP_MAX_TOKENS")),
     )
 
-    outputs = generate_and_collect(
+    generate_and_collect(
         model=model,
         duration=duration,
         iterations=iterations,
@@ -43,16 +59,17 @@ def run(model, duration, iterations, prompts):
 
 def main():
     args = parse_and_validate_args(
-        description="Script for running Qwen3 textual models.",
+        description=DESCRIPTION,
+        resources=RESOURCES,
         argv=sys.argv,
+        synthetic=SYNTHETIC,
     )
 
-    prompts = load_prompts(args.prompts_path)
     run(
         model=args.model,
         duration=args.duration,
         iterations=args.iterations,
-        prompts=prompts,
+        prompts=load_inputs(args),
     )
 
 
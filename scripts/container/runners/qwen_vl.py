@@ -7,25 +7,32 @@ Script for running Qwen3-VL models.
 
 """
 
-import torch
-from vllm import LLM, SamplingParams
+from vllm import SamplingParams
 from qwen_vl_utils import process_vision_info
 from transformers import AutoProcessor
 import sys
-import time
 import os
-from runner_utilities.preprocess import load_prompts, prompts_to_messages, load_images
+from concurrent.futures import ThreadPoolExecutor
+from runner_utilities.preprocess import (
+    load_prompts,
+    prompts_to_messages,
+    load_images,
+    replicate_prompts,
+)
 from runner_utilities.argparse import parse_and_validate_args
-from runner_utilities.runner_tools import generate_and_collect
+from runner_utilities.runner_tools import build_llm, generate_and_collect
 
+DESCRIPTION = "Script for running Qwen-VL models."
+RESOURCES = True
 
-def prepare_inputs_for_vllm(prompts, processor):
+
+def prepare_inputs_for_vllm(messages, processor):
     text = processor.apply_chat_template(
-        prompts, tokenize=False, add_generation_prompt=True
+        messages, tokenize=False, add_generation_prompt=True
     )
     # qwen_vl_utils 0.0.14+ reqired
     image_inputs, video_inputs, video_kwargs = process_vision_info(
-        prompts,
+        messages,
         image_patch_size=processor.image_processor.patch_size,
         return_video_kwargs=True,
         return_video_metadata=True,
@@ -44,18 +51,42 @@ def prepare_inputs_for_vllm(prompts, processor):
     }
 
 
-def run(model, duration, iterations, prompts):
-
-    llm = LLM(
+def create_llm(model):
+    return build_llm(
         model=model,
         gpu_memory_utilization=float(os.getenv("GPU_MEM_UTIL")),
         max_model_len=int(os.getenv("MAX_MODEL_LEN")),
         mm_encoder_tp_mode="data",
         enable_expert_parallel=False,  # revisit
-        tensor_parallel_size=torch.cuda.device_count(),
         seed=0,
+        # needed for per-request timings in RequestOutput.metrics
+        disable_log_stats=False,
+    )
+
+
+def load_inputs(args):
+    messages = prompts_to_messages(
+        load_prompts(args.prompts_path),
+        load_images(args.resources_path),
     )
 
+    processor = AutoProcessor.from_pretrained(args.model)
+    # every prompt is its own single-message chat request, templated and processed once
+    with ThreadPoolExecutor(
+        max_workers=int(os.getenv("PREPROCESS_WORKERS", os.cpu_count() or 1))
+    ) as executor:
+        inputs = list(
+            executor.map(
+                lambda message: prepare_inputs_for_vllm([message], processor), messages
+            )
+        )
+    return replicate_prompts(inputs)
+
+
+def run(model, duration, iterations, prompts, llm=None):
+    if llm is None:
+        llm = create_llm(model)
+
     sampling_params = SamplingParams(
         temperature=float(os.getenv("SP_TEMPERATURE")),
         max_tokens=int(os.getenv("SP_MAX_TOKENS")),
@@ -63,7 +94,7 @@ def run(model, duration, iterations, prompts):
         stop_token_ids=[],
     )
 
-    outputs = generate_and_collect(
+    generate_and_collect(
         model=model,
         duration=duration,
         iterations=iterations,
@@ -76,24 +107,14 @@ def run(model, duration, iterations, prompts):
 
 def main():
     args = parse_and_validate_args(
-        description="Script for running Qwen-VL models.", resources=True, argv=sys.argv
+        description=DESCRIPTION, resources=RESOURCES, argv=sys.argv
     )
 
-    prompts = prompts_to_messages(
-        load_prompts(args.prompts_path),
-        load_images(args.resources_path),
-    )
-
-    processor = AutoProcessor.from_pretrained("Qwen/Qwen3-VL-4B-Instruct")
-    parsed_prompts = [
-        prepare_inputs_for_vllm(prompt, processor) for prompt in [prompts]
-    ]
-
     run(
         model=args.model,
         duration=args.duration,
         iterations=args.iterations,
-        prompts=parsed_prompts,
+        prompts=load_inputs(args),
     )
 
 
@@ -8,7 +8,7 @@ from pathlib import Path
 __all__ = ["parse_and_validate_args"]
 
 
-def _create_parser(description, resources=False):
+def _create_parser(description, resources=False, synthetic=False):
     parser = argparse.ArgumentParser(description=description)
 
     parser.add_argument(
@@ -25,12 +25,18 @@ def _create_parser(description, resources=False):
         "--iterations", help="Number of iterations the model should run for", type=int
     )
     # TODO: rework so all prompts are singular file with keys according to model type
-    parser.add_argument(
+    inputs = parser.add_mutually_exclusive_group(required=True)
+    inputs.add_argument(
         "--prompts-path",
         help="The path of the prompts .yaml file.",
         type=Path,
-        required=True,
     )
+    if synthetic:
+        inputs.add_argument(
+            "--workload",
+            help="The path of a synthetic workload .yaml file, used instead of --prompts-path.",
+            type=Path,
+        )
 
     if resources:
         parser.add_argument(
@@ -48,8 +54,10 @@ def _validate_args(args):
     return
 
 
-def parse_and_validate_args(description, resources=False, argv=None):
-    parser = _create_parser(description=description, resources=resources)
+def parse_and_validate_args(description, resources=False, argv=None, synthetic=False):
+    parser = _create_parser(
+        description=description, resources=resources, synthetic=synthetic
+    )
     args, _ = parser.parse_known_args(argv)
     _validate_args(args)
     return args
@@ -0,0 +1,36 @@
+"""
+events.py - structured event channel next to cmd.log
+
+Phases, metrics summaries and run results are appended to <LOG_DIR>/events.jsonl as one JSON
+object per line ({"ts": ..., "event": ..., ...}), so results don't have to be scraped from the
+log. Every event is a single O_APPEND write, so the runner and run_model.py can share the file.
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+
+__all__ = ["emit", "read_events"]
+
+EVENTS_FILE = "events.jsonl"
+
+
+def emit(event, log_dir=None, **fields):
+    log_dir = Path(log_dir or os.getenv("LOG_DIR", "."))
+    log_dir.mkdir(parents=True, exist_ok=True)
+    line = json.dumps({"ts": time.time(), "event": event} | fields, default=str)
+    fd = os.open(log_dir / EVENTS_FILE, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, (line + "\n").encode())
+    finally:
+        os.close(fd)
+
+
+def read_events(log_dir, event=None):
+    events_path = Path(log_dir) / EVENTS_FILE
+    if not events_path.exists():
+        return []
+    with events_path.open("r") as f:
+        events = [json.loads(line) for line in f if line.strip()]
+    return [e for e in events if event is None or e["event"] == event]
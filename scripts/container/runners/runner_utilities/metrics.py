@@ -0,0 +1,236 @@
+"""
+metrics.py - per-request latency and throughput metrics shared by all runners
+
+Every runner reports the same schema: a metrics.json summary, a requests.csv with one row
+per request and, for batched runs, an iterations.csv with one row per batch, all written next
+to cmd.log (LOG_DIR, set by run_model.py).
+"""
+
+import csv
+import json
+import os
+from pathlib import Path
+
+from runner_utilities.events import emit
+from runner_utilities.phases import PHASES
+
+__all__ = ["MetricsCollector", "percentiles", "topology"]
+
+PERCENTILES = (50, 90, 99)
+REQUEST_FIELDS = (
+    "iteration",
+    "prompt_tokens",
+    "generation_tokens",
+    "ttft_s",
+    "tpot_s",
+    "e2e_s",
+    "cached_tokens",
+)
+ITERATION_FIELDS = (
+    "iteration",
+    "duration_s",
+    "requests",
+    "prompt_tokens",
+    "generation_tokens",
+)
+
+
+def percentiles(values):
+    values = sorted(value for value in values if value is not None)
+    if not values:
+        return None
+
+    def percentile(p):
+        # linear interpolation between closest ranks
+        rank = (len(values) - 1) * p / 100
+        low = int(rank)
+        high = min(low + 1, len(values) - 1)
+        return values[low] + (values[high] - values[low]) * (rank - low)
+
+    return {"mean": sum(values) / len(values)} | {
+        f"p{p}": percentile(p) for p in PERCENTILES
+    }
+
+
+def topology():
+    """
+    Devices and parallelism of the run, so multi-GPU runs can be compared to single-GPU ones.
+    """
+    devices = [device for device in os.getenv("GPU_DEVICE", "").split(",") if device]
+    gpu_names = os.getenv("GPU_NAMES") or os.getenv("DEVICE_NAME") or ""
+    return {
+        "num_gpus": len(devices) or 1,
+        "tensor_parallel_size": int(os.getenv("TENSOR_PARALLEL_SIZE", "1")),
+        "data_parallel_size": int(os.getenv("DATA_PARALLEL_SIZE", "1")),
+        "devices": devices,
+        "gpu_names": [name for name in gpu_names.split(",") if name],
+    }
+
+
+def _generation_tokens(output):
+    completions = getattr(output, "outputs", None)
+    if not isinstance(completions, list):
+        # pooling outputs (embeddings) don't generate tokens
+        return 0
+    return sum(len(completion.token_ids) for completion in completions)
+
+
+def _latencies(output, batch_start, batch_end):
+    """
+    Returns (ttft, e2e) in seconds. Uses the engine request metrics when available
+    (V1 RequestStateStats or V0 RequestMetrics) and falls back to the batch wall time,
+    since all requests of an offline batch are submitted together.
+    """
+    metrics = getattr(output, "metrics", None)
+
+    # V1: monotonic engine timestamps, first token latency measured from arrival
+    first_token_latency = getattr(metrics, "first_token_latency", None)
+    if first_token_latency:
+        decode_time = getattr(metrics, "last_token_ts", 0) - getattr(
+            metrics, "first_token_ts", 0
+        )
+        return first_token_latency, first_token_latency + max(decode_time, 0)
+
+    # V0: wall clock timestamps
+    arrival_time = getattr(metrics, "arrival_time", None)
+    first_token_time = getattr(metrics, "first_token_time", None)
+    if arrival_time and first_token_time:
+        finished_time = getattr(metrics, "finished_time", None) or getattr(
+            metrics, "last_token_time", first_token_time
+        )
+        return first_token_time - arrival_time, finished_time - arrival_time
+
+    return None, batch_end - batch_start
+
+
+class MetricsCollector:
+    """
+    Accumulates compact per-request records (not the outputs themselves) across iterations.
+    """
+
+    def __init__(self, model, mode="generate", **extra):
+        self.model = model
+        self.mode = mode
+        # run parameters reported alongside the metrics, e.g. batch_size
+        self.extra = extra
+        self.requests = []
+        # per batch totals, the throughput distribution across iterations
+        self.batches = []
+        self.iterations = 0
+        self.duration = 0.0
+
+    def add_request(
+        self, prompt_tokens, generation_tokens, ttft, e2e, cached_tokens=None
+    ):
+        tpot = (
+            (e2e - ttft) / (generation_tokens - 1)
+            if ttft is not None and generation_tokens > 1
+            else None
+        )
+        self.requests.append(
+            (
+                self.iterations,
+                prompt_tokens,
+                generation_tokens,
+                ttft,
+                tpot,
+                e2e,
+                cached_tokens,
+            )
+        )
+        return tpot
+
+    def add_batch(self, outputs, batch_start, batch_end):
+        first_request = len(self.requests)
+        for output in outputs:
+            ttft, e2e = _latencies(output, batch_start, batch_end)
+            self.add_request(
+                len(getattr(output, "prompt_token_ids", None) or []),
+                _generation_tokens(output),
+                ttft,
+                e2e,
+                # prompt tokens served from the prefix cache (V1 engines)
+                getattr(output, "num_cached_tokens", None),
+            )
+        batch = self.requests[first_request:]
+        self.batches.append(
+            (
+                self.iterations,
+                batch_end - batch_start,
+                len(batch),
+                sum(request[1] for request in batch),
+                sum(request[2] for request in batch),
+            )
+        )
+        self.iterations += 1
+        self.duration += batch_end - batch_start
+
+    def summary(self):
+        prompt_tokens = sum(request[1] for request in self.requests)
+        generation_tokens = sum(request[2] for request in self.requests)
+        cached = [request[6] for request in self.requests if request[6] is not None]
+
+        def rate(count):
+            return count / self.duration if self.duration else None
+
+        return {
+            "model": self.model,
+            "gpu": os.getenv("DEVICE_NAME"),
+            "mode": self.mode,
+            "topology": topology(),
+            **self.extra,
+            "iterations": self.iterations,
+            "duration_s": self.duration,
+            "num_requests": len(self.requests),
+            "prompt_tokens": prompt_tokens,
+            "generation_tokens": generation_tokens,
+            "cached_prompt_tokens": sum(cached) if cached else None,
+            "prefix_cache_hit_rate": (
+                sum(cached) / prompt_tokens if cached and prompt_tokens else None
+            ),
+            "requests_per_s": rate(len(self.requests)),
+            "prompt_tokens_per_s": rate(prompt_tokens),
+            "generation_tokens_per_s": rate(generation_tokens),
+            "ttft_s": percentiles(request[3] for request in self.requests),
+            "tpot_s": percentiles(request[4] for request in self.requests),
+            "e2e_s": percentiles(request[5] for request in self.requests),
+        }
+
+    def write(self, log_dir=None, phases=None):
+        log_dir = Path(log_dir or os.getenv("LOG_DIR", "."))
+        log_dir.mkdir(parents=True, exist_ok=True)
+        # phases recorded by the runner since the last write (engine init, warmup, steady state),
+        # unless the caller passes the phases of this configuration
+        phases = PHASES.drain() if phases is None else phases
+        summary = self.summary() | {"phases": phases}
+        with (log_dir / "metrics.json").open("w") as f:
+            json.dump(summary, f, indent=2)
+        with (log_dir / "requests.csv").open("w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(REQUEST_FIELDS)
+            writer.writerows(self.requests)
+        if self.batches:
+            with (log_dir / "iterations.csv").open("w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(ITERATION_FIELDS)
+                writer.writerows(self.batches)
+        emit("metrics", path=str(log_dir / "metrics.json"), **summary)
+        return summary
+
+    def report(self, log_dir=None, phases=None):
+        summary = self.write(log_dir, phases)
+        print(
+            f"Requests: {summary['num_requests']}, "
+            f"prompt tokens/s: {summary['prompt_tokens_per_s'] or 0:.2f}, "
+            f"generated tokens/s: {summary['generation_tokens_per_s'] or 0:.2f}"
+        )
+        for name in ("ttft_s", "tpot_s", "e2e_s"):
+            if summary[name]:
+                print(
+                    f"{name[:-2].upper()} (ms): "
+                    + ", ".join(
+                        f"{key}={value * 1000:.2f}"
+                        for key, value in summary[name].items()
+                    )
+                )
+        return summary
@@ -0,0 +1,268 @@
+"""
+mock.py - fake engine with synthetic latencies, runs the harness without a GPU or model
+
+LLM_BACKEND=mock makes build_llm return a MockLLM instead of vLLM's LLM, or an OnlineEngine
+around a MockAsyncEngine for RUN_MODE=online. They implement the surface the runners use
+(generate, embed, get_tokenizer, reset_prefix_cache, start_profile/stop_profile) and return
+outputs shaped like vLLM's, so metrics.json, requests.csv and everything downstream are written
+as usual. Engine time is spent sleeping:
+
+MOCK_PREFILL_MS_PER_TOKEN   prefill time per uncached prompt token (default 0.05)
+MOCK_DECODE_MS_PER_STEP     time per decode step, shared by all requests of a batch (default 5)
+MOCK_EMBED_MS_PER_TOKEN     embedding time per prompt token (default 0.02)
+MOCK_OUTPUT_LEN             tokens generated per request, default the request's max_tokens
+
+Text prompts are tokenized by whitespace. Request metrics carry the mock's own timestamps, so
+the time a runner measures around a call minus the engine time of its requests is what the
+harness adds (scripts/container/harness_bench.py).
+"""
+
+import asyncio
+import os
+import sys
+import time
+import zlib
+
+__all__ = [
+    "MockAsyncEngine",
+    "MockLLM",
+    "MockTokenizer",
+    "SamplingParams",
+    "enabled",
+]
+
+VOCAB_SIZE = 32000
+SPECIAL_IDS = (0, 1, 2)
+# tokens per prefix cache block, like vLLM's default block size
+BLOCK_SIZE = 16
+EMBED_DIM = 1024
+
+
+def enabled():
+    return os.getenv("LLM_BACKEND", "vllm") == "mock"
+
+
+def _env_s(name, default_ms):
+    return float(os.getenv(name, default_ms)) / 1000
+
+
+class SamplingParams:
+    """
+    Stand-in for vllm.SamplingParams, only max_tokens matters to the mock.
+    """
+
+    def __init__(self, max_tokens=16, **kwargs):
+        self.max_tokens = max_tokens
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+
+class MockTokenizer:
+    vocab_size = VOCAB_SIZE
+    all_special_ids = list(SPECIAL_IDS)
+
+    def encode(self, text):
+        return [
+            len(SPECIAL_IDS)
+            + zlib.crc32(word.encode()) % (VOCAB_SIZE - len(SPECIAL_IDS))
+            for word in text.split()
+        ]
+
+
+class Completion:
+    def __init__(self, token_ids):
+        self.index = 0
+        self.token_ids = token_ids
+        self.text = " ".join(f"t{token_id}" for token_id in token_ids[:32])
+        self.finish_reason = "length"
+
+
+class RequestMetrics:
+    """
+    The fields of vLLM's V1 RequestStateStats MetricsCollector reads.
+    """
+
+    def __init__(self, arrival, first_token_ts, last_token_ts):
+        self.arrival_time = arrival
+        self.first_token_ts = first_token_ts
+        self.last_token_ts = last_token_ts
+        self.first_token_latency = first_token_ts - arrival
+
+
+class RequestOutput:
+    def __init__(
+        self,
+        request_id,
+        prompt_token_ids,
+        outputs,
+        metrics,
+        cached_tokens,
+        finished=True,
+    ):
+        self.request_id = request_id
+        self.prompt_token_ids = prompt_token_ids
+        self.outputs = outputs
+        self.metrics = metrics
+        self.num_cached_tokens = cached_tokens
+        self.finished = finished
+
+
+class EmbeddingOutput:
+    def __init__(self, request_id, prompt_token_ids):
+        self.request_id = request_id
+        self.prompt_token_ids = prompt_token_ids
+        # pooling outputs hold a single result, not a list of completions
+        self.outputs = type("EmbeddingResult", (), {"embedding": [0.0] * EMBED_DIM})()
+        self.finished = True
+
+
+class _Engine:
+    """
+    Prompt handling and the prefix cache shared by the offline and online mock.
+    """
+
+    def __init__(self, enable_prefix_caching=True, **engine_kwargs):
+        self.tokenizer = MockTokenizer()
+        self.enable_prefix_caching = enable_prefix_caching
+        self.prefill_s = _env_s("MOCK_PREFILL_MS_PER_TOKEN", "0.05")
+        self.decode_s = _env_s("MOCK_DECODE_MS_PER_STEP", "5")
+        self.embed_s = _env_s("MOCK_EMBED_MS_PER_TOKEN", "0.02")
+        self.output_len = int(os.getenv("MOCK_OUTPUT_LEN", "0"))
+        self._cached_blocks = set()
+        self._request_count = 0
+
+    def get_tokenizer(self):
+        return self.tokenizer
+
+    def reset_prefix_cache(self):
+        self._cached_blocks.clear()
+        return True
+
+    def next_request_id(self):
+        self._request_count += 1
+        return str(self._request_count)
+
+    def prompt(self, prompt):
+        # (token ids, cache salt) of a text, token or dict prompt
+        if isinstance(prompt, str):
+            return self.tokenizer.encode(prompt), None
+        if "prompt_token_ids" in prompt:
+            return prompt["prompt_token_ids"], prompt.get("cache_salt")
+        return self.tokenizer.encode(prompt["prompt"]), prompt.get("cache_salt")
+
+    def cached_tokens(self, token_ids, salt):
+        # full blocks served from the cache, the blocks of this prompt are cached afterwards
+        if not self.enable_prefix_caching:
+            return 0
+        cached, block_hash, hit = 0, salt, True
+        for start in range(0, len(token_ids) - BLOCK_SIZE + 1, BLOCK_SIZE):
+            block_hash = hash(
+                (block_hash, tuple(token_ids[start : start + BLOCK_SIZE]))
+            )
+            if hit and block_hash in self._cached_blocks:
+                cached += BLOCK_SIZE
+            else:
+                hit = False
+                self._cached_blocks.add(block_hash)
+        return cached
+
+    def max_tokens(self, params):
+        return self.output_len or max(getattr(params, "max_tokens", None) or 16, 1)
+
+
+def _sleep_until(deadline):
+    # deadlines are absolute, so oversleeping a step doesn't add up over a batch
+    delay = deadline - time.monotonic()
+    if delay > 0:
+        time.sleep(delay)
+
+
+class MockLLM(_Engine):
+    """
+    Offline engine: a generate call prefills every request of the batch at once and then runs
+    decode steps until the longest request is done, like a single continuous batch.
+    """
+
+    def generate(self, prompts, sampling_params=None, use_tqdm=True, **kwargs):
+        prompts = prompts if isinstance(prompts, list) else [prompts]
+        arrival = time.monotonic()
+
+        requests = []
+        uncached_tokens = 0
+        for i, prompt in enumerate(prompts):
+            token_ids, salt = self.prompt(prompt)
+            cached = self.cached_tokens(token_ids, salt)
+            uncached_tokens += len(token_ids) - cached
+            params = (
+                sampling_params[i]
+                if isinstance(sampling_params, list)
+                else sampling_params
+            )
+            requests.append((token_ids, cached, self.max_tokens(params)))
+
+        _sleep_until(arrival + uncached_tokens * self.prefill_s)
+        first_token_ts = time.monotonic()
+
+        # requests finish after output_len - 1 decode steps, sleep to each finishing step
+        finished = {}
+        for steps in sorted({output_len - 1 for _, _, output_len in requests}):
+            _sleep_until(first_token_ts + steps * self.decode_s)
+            finished[steps] = time.monotonic()
+            if use_tqdm:
+                done = sum(output_len - 1 <= steps for _, _, output_len in requests)
+                sys.stderr.write(f"\rProcessed prompts: {done}/{len(requests)}")
+        if use_tqdm:
+            sys.stderr.write("\n")
+
+        return [
+            RequestOutput(
+                self.next_request_id(),
+                token_ids,
+                [Completion(list(range(3, 3 + output_len)))],
+                RequestMetrics(arrival, first_token_ts, finished[output_len - 1]),
+                cached,
+            )
+            for token_ids, cached, output_len in requests
+        ]
+
+    def embed(self, prompts, use_tqdm=True, **kwargs):
+        prompts = prompts if isinstance(prompts, list) else [prompts]
+        start = time.monotonic()
+        token_ids = [self.prompt(prompt)[0] for prompt in prompts]
+        _sleep_until(start + sum(len(ids) for ids in token_ids) * self.embed_s)
+        return [EmbeddingOutput(self.next_request_id(), ids) for ids in token_ids]
+
+    def start_profile(self):
+        pass
+
+    def stop_profile(self):
+        pass
+
+
+class MockAsyncEngine(_Engine):
+    """
+    Async engine for OnlineEngine, streams one output per generated token. Requests don't
+    contend with each other, so the mock never saturates.
+    """
+
+    async def generate(self, prompt, sampling_params, request_id):
+        arrival = time.monotonic()
+        token_ids, salt = self.prompt(prompt)
+        cached = self.cached_tokens(token_ids, salt)
+        output_len = self.max_tokens(sampling_params)
+
+        await asyncio.sleep((len(token_ids) - cached) * self.prefill_s)
+        first_token_ts = time.monotonic()
+        for generated in range(1, output_len + 1):
+            if generated > 1:
+                await asyncio.sleep(
+                    first_token_ts + (generated - 1) * self.decode_s - time.monotonic()
+                )
+            yield RequestOutput(
+                request_id,
+                token_ids,
+                [Completion(list(range(3, 3 + generated)))],
+                RequestMetrics(arrival, first_token_ts, time.monotonic()),
+                cached,
+                finished=generated == output_len,
+            )
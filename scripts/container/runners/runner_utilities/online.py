@@ -0,0 +1,227 @@
+"""
+online.py - open-loop online load mode driving vLLM's async engine in-process
+
+Requests are issued at a target rate (Poisson or fixed-interval arrivals) regardless of how fast
+earlier requests complete, which is what latency under realistic traffic looks like. The rate is
+swept upwards until the engine saturates. Configured through env vars:
+
+RUN_MODE=online          enables this mode for the generation runners
+ONLINE_QPS=1,2,4,8       request rates to sweep
+ONLINE_ARRIVAL=poisson   poisson or fixed
+SLO_TTFT_MS, SLO_TPOT_MS latency targets used for goodput (unset means no target)
+"""
+
+import asyncio
+import csv
+import os
+import random
+import time
+from pathlib import Path
+
+from runner_utilities.metrics import MetricsCollector
+from runner_utilities.phases import PHASES
+
+__all__ = ["OnlineEngine", "run_online"]
+
+DEFAULT_QPS = "1,2,4,8,16,32"
+# a rate is saturated once completed requests/s fall below this fraction of the offered rate
+SATURATION_RATIO = 0.9
+
+
+def _saturated(elapsed, send_window, summary):
+    # completion window excluding the service time of the last request; if the engine keeps up
+    # it matches the send window, if requests queue up it keeps growing
+    completion_window = elapsed - summary["e2e_s"]["p50"]
+    return send_window < SATURATION_RATIO * completion_window
+
+
+class OnlineEngine:
+    """
+    Async engine bound to its own event loop, so it can be driven from synchronous runner
+    code and reused across workloads by warm workers. Built from engine_kwargs unless an
+    engine (e.g. the mock) is passed in.
+    """
+
+    def __init__(self, engine=None, **engine_kwargs):
+        self.loop = asyncio.new_event_loop()
+        if engine is None:
+            from vllm.engine.arg_utils import AsyncEngineArgs
+            from vllm.engine.async_llm_engine import AsyncLLMEngine
+
+            engine = AsyncLLMEngine.from_engine_args(AsyncEngineArgs(**engine_kwargs))
+        self.engine = engine
+        self._request_count = 0
+
+    def run(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    def next_request_id(self):
+        self._request_count += 1
+        return f"online-{self._request_count}"
+
+    def generate(self, prompts, sampling_params):
+        """
+        Submits all prompts at once and waits for them, used for the warmup iterations.
+        """
+
+        async def submit_all():
+            return await asyncio.gather(
+                *(
+                    self.request(prompt, _params(sampling_params, i))
+                    for i, prompt in enumerate(prompts)
+                )
+            )
+
+        return self.run(submit_all())
+
+    async def request(self, prompt, sampling_params):
+        """
+        Returns (prompt_tokens, generation_tokens, ttft, e2e, cached_tokens) of a single
+        streamed request.
+        """
+        send_time = time.perf_counter()
+        first_token_time = None
+        final_output = None
+        async for output in self.engine.generate(
+            prompt, sampling_params, self.next_request_id()
+        ):
+            if first_token_time is None and any(
+                completion.token_ids for completion in output.outputs
+            ):
+                first_token_time = time.perf_counter()
+            final_output = output
+        end_time = time.perf_counter()
+
+        return (
+            len(final_output.prompt_token_ids or []),
+            sum(len(completion.token_ids) for completion in final_output.outputs),
+            first_token_time - send_time if first_token_time else None,
+            end_time - send_time,
+            getattr(final_output, "num_cached_tokens", None),
+        )
+
+
+def _params(sampling_params, i):
+    # one SamplingParams for all prompts, or one per synthetic prompt
+    if isinstance(sampling_params, list):
+        return sampling_params[i % len(sampling_params)]
+    return sampling_params
+
+
+def _env_ms(name):
+    value = os.getenv(name)
+    return float(value) / 1000 if value else None
+
+
+def _meets_slo(ttft, tpot, slo_ttft, slo_tpot):
+    if slo_ttft is not None and (ttft is None or ttft > slo_ttft):
+        return False
+    if slo_tpot is not None and tpot is not None and tpot > slo_tpot:
+        return False
+    return True
+
+
+async def _run_rate(engine, prompts, sampling_params, qps, num_requests, arrival):
+    rng = random.Random(0)
+    tasks = []
+    start = time.perf_counter()
+    send_time = start
+    for i in range(num_requests):
+        delay = send_time - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        last_send = time.perf_counter()
+        tasks.append(
+            asyncio.create_task(
+                engine.request(prompts[i % len(prompts)], _params(sampling_params, i))
+            )
+        )
+        send_time += rng.expovariate(qps) if arrival == "poisson" else 1 / qps
+    records = await asyncio.gather(*tasks)
+    return records, time.perf_counter() - start, last_send - start
+
+
+def run_online(model, duration, iterations, engine, prompts, sampling_params):
+    rates = [float(qps) for qps in os.getenv("ONLINE_QPS", DEFAULT_QPS).split(",")]
+    arrival = os.getenv("ONLINE_ARRIVAL", "poisson")
+    slo_ttft, slo_tpot = _env_ms("SLO_TTFT_MS"), _env_ms("SLO_TPOT_MS")
+    log_dir = Path(os.getenv("LOG_DIR", "."))
+
+    summaries = []
+    for qps in rates:
+        # same amount of work as the offline mode: --duration seconds of traffic
+        # or --iterations passes over the prompt list
+        num_requests = (
+            max(1, int(qps * duration)) if duration else iterations * len(prompts)
+        )
+        with PHASES.phase("steady_state", qps=qps):
+            records, elapsed, send_window = engine.run(
+                _run_rate(engine, prompts, sampling_params, qps, num_requests, arrival)
+            )
+
+        collector = MetricsCollector(model, mode="online", qps=qps, arrival=arrival)
+        good = 0
+        for prompt_tokens, generation_tokens, ttft, e2e, cached_tokens in records:
+            tpot = collector.add_request(
+                prompt_tokens, generation_tokens, ttft, e2e, cached_tokens
+            )
+            good += _meets_slo(ttft, tpot, slo_ttft, slo_tpot)
+        collector.iterations = 1
+        collector.duration = elapsed
+        collector.extra["offered_rps"] = (
+            (num_requests - 1) / send_window if send_window else None
+        )
+        collector.extra["goodput_rps"] = good / elapsed
+
+        print(f"\nOffered rate: {qps:.2f} req/s ({arrival}), {num_requests} requests")
+        summary = collector.report(log_dir / f"qps_{qps:g}")
+        summaries.append(summary)
+
+        if _saturated(elapsed, send_window, summary):
+            print(f"Saturated at {qps:.2f} req/s, stopping the sweep.")
+            break
+
+    columns = (
+        "qps",
+        "requests_per_s",
+        "goodput_rps",
+        "generation_tokens_per_s",
+        "ttft_p50_s",
+        "ttft_p99_s",
+        "tpot_p50_s",
+        "tpot_p99_s",
+        "e2e_p99_s",
+    )
+
+    def row(summary):
+        def latency(name, percentile):
+            return (summary[name] or {}).get(percentile)
+
+        return [
+            summary["qps"],
+            summary["requests_per_s"],
+            summary["goodput_rps"],
+            summary["generation_tokens_per_s"],
+            latency("ttft_s", "p50"),
+            latency("ttft_s", "p99"),
+            latency("tpot_s", "p50"),
+            latency("tpot_s", "p99"),
+            latency("e2e_s", "p99"),
+        ]
+
+    log_dir.mkdir(parents=True, exist_ok=True)
+    with (log_dir / "online_sweep.csv").open("w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        writer.writerows(row(summary) for summary in summaries)
+
+    print(
+        f"\n{'qps':>8} {'req/s':>8} {'goodput':>8} {'TTFT p99 ms':>12} {'TPOT p99 ms':>12}"
+    )
+    for summary in summaries:
+        _, rps, goodput, _, _, ttft_p99, _, tpot_p99, _ = row(summary)
+        print(
+            f"{summary['qps']:>8.2f} {rps or 0:>8.2f} {goodput:>8.2f} "
+            f"{(ttft_p99 or 0) * 1000:>12.2f} {(tpot_p99 or 0) * 1000:>12.2f}"
+        )
+    return summaries
@@ -0,0 +1,42 @@
+"""
+phases.py - wall clock timeline of the phases a runner goes through
+
+Phases are recorded with absolute timestamps (time.time()) so run_model.py can merge them with
+the container start, pip install and engine log phases into a single timeline.
+"""
+
+import time
+from contextlib import contextmanager
+
+from runner_utilities.events import emit
+
+__all__ = ["PHASES", "PhaseTimer"]
+
+
+class PhaseTimer:
+    def __init__(self):
+        self._phases = []
+
+    @contextmanager
+    def phase(self, name, **info):
+        start = time.time()
+        try:
+            yield
+        finally:
+            end = time.time()
+            phase = {
+                "name": name,
+                "start": start,
+                "end": end,
+                "duration_s": end - start,
+            } | info
+            self._phases.append(phase)
+            emit("phase", **phase)
+
+    def drain(self):
+        # phases are reported once, e.g. a warm worker's engine init only with its first workload
+        phases, self._phases = self._phases, []
+        return phases
+
+
+PHASES = PhaseTimer()
@@ -0,0 +1,120 @@
+"""
+prefix_cache.py - prefix caching A/B on a single engine
+
+RUN_MODE=prefix-ab builds the engine with prefix caching enabled and runs every iteration twice:
+once as is (cache_on) and once with a unique cache_salt per request (cache_off), which keeps
+requests from sharing cached blocks without changing any other engine argument. The prefix cache
+is reset before every pass and the arms alternate, so drift (clocks, temperature) hits both.
+Combined with a shared-prefix workload (shared_prefix in yaml/workloads) this quantifies
+cache hit rate, prefill tokens saved and the TTFT/throughput gained.
+
+Every measured pass is a steady_state phase of its arm, so each arm's metrics.json holds the
+windows its own requests ran in (energy and tokens per joule are per arm), next to the shared
+engine init and warmup phases.
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+
+from runner_utilities.metrics import MetricsCollector
+from runner_utilities.phases import PHASES, PhaseTimer
+
+__all__ = ["run_prefix_ab"]
+
+ARMS = ("cache_on", "cache_off")
+
+
+def _salted(prompts, arm):
+    if arm == "cache_on":
+        return prompts
+    salted = []
+    for i, prompt in enumerate(prompts):
+        prompt = prompt if isinstance(prompt, dict) else {"prompt": prompt}
+        salted.append(prompt | {"cache_salt": f"prefix-ab-{i}"})
+    return salted
+
+
+def _delta(on, off):
+    return (on - off) / off * 100 if on is not None and off else None
+
+
+def _p50(summary, name):
+    return (summary[name] or {}).get("p50")
+
+
+def run_prefix_ab(model, duration, iterations, llm, prompts, sampling_params):
+    log_dir = Path(os.getenv("LOG_DIR", "."))
+    arm_prompts = {arm: _salted(prompts, arm) for arm in ARMS}
+    collectors = {
+        arm: MetricsCollector(model, mode="prefix-ab", arm=arm) for arm in ARMS
+    }
+
+    timers = {arm: PhaseTimer() for arm in ARMS}
+
+    def run_pass(arm, collector=None):
+        llm.reset_prefix_cache()
+        batch_start = time.monotonic()
+        outputs = llm.generate(arm_prompts[arm], sampling_params, use_tqdm=False)
+        if collector:
+            collector.add_batch(outputs, batch_start, time.monotonic())
+
+    with PHASES.phase("warmup", iterations=1):
+        for arm in ARMS:
+            run_pass(arm)
+    # engine init and warmup are shared by both arms
+    shared_phases = PHASES.drain()
+
+    start = time.monotonic()
+    iteration_count = 0
+    while (
+        time.monotonic() - start < duration
+        if duration
+        else iteration_count < iterations
+    ):
+        # alternate which arm goes first
+        for arm in ARMS if iteration_count % 2 == 0 else reversed(ARMS):
+            with timers[arm].phase("steady_state", arm=arm, iteration=iteration_count):
+                run_pass(arm, collectors[arm])
+        iteration_count += 1
+
+    summaries = {}
+    for arm in ARMS:
+        print(f"\n{arm}:")
+        summaries[arm] = collectors[arm].report(
+            log_dir / arm, phases=shared_phases + timers[arm].drain()
+        )
+
+    on, off = summaries["cache_on"], summaries["cache_off"]
+    result = {
+        "model": model,
+        "iterations": iteration_count,
+        "prefix_cache_hit_rate": on["prefix_cache_hit_rate"],
+        "prefill_tokens_saved": (on["cached_prompt_tokens"] or 0)
+        - (off["cached_prompt_tokens"] or 0),
+        "ttft_p50_s": {arm: _p50(summaries[arm], "ttft_s") for arm in ARMS},
+        "ttft_p50_delta_pct": _delta(_p50(on, "ttft_s"), _p50(off, "ttft_s")),
+        "e2e_p50_delta_pct": _delta(_p50(on, "e2e_s"), _p50(off, "e2e_s")),
+        "requests_per_s_delta_pct": _delta(on["requests_per_s"], off["requests_per_s"]),
+        "generation_tokens_per_s_delta_pct": _delta(
+            on["generation_tokens_per_s"], off["generation_tokens_per_s"]
+        ),
+    }
+    with (log_dir / "prefix_ab.json").open("w") as f:
+        json.dump(result, f, indent=2)
+
+    def fmt(value, suffix=""):
+        return f"{value:+.1f}{suffix}" if value is not None else "n/a"
+
+    print(
+        f"\nPrefix cache hit rate: {(result['prefix_cache_hit_rate'] or 0) * 100:.1f}%"
+    )
+    print(f"Prefill tokens saved: {result['prefill_tokens_saved']}")
+    print(f"TTFT p50 delta: {fmt(result['ttft_p50_delta_pct'], '%')}")
+    print(f"Requests/s delta: {fmt(result['requests_per_s_delta_pct'], '%')}")
+    print(
+        f"Generated tokens/s delta: "
+        f"{fmt(result['generation_tokens_per_s_delta_pct'], '%')}"
+    )
+    return result
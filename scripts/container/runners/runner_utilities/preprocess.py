@@ -4,23 +4,95 @@ preprocess.py - utilities for pre-processing the prompts written inside the yaml
 
 """
 
+import hashlib
+import os
+from collections.abc import Mapping
+from pathlib import Path
+
 import yaml
-from PIL import Image
 
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".bmp", ".gif"}
+DEFAULT_IMAGE_RESOLUTION = "224x224"
+# mounted from the host (.cache/container), so decoded images survive between containers
+DEFAULT_IMAGE_CACHE_DIR = "/workspace/.cache/images"
 
-def load_images(images_path):
-    if not images_path.exists():
-        raise (FileNotFoundError(f"No images files found at {images_path}"))
-    image_dict = {}
-    extensions = {".png", ".jpg", ".jpeg", ".bmp", ".gif"}
-    for img_file in images_path.iterdir():
-        if img_file.suffix.lower() not in extensions:
-            continue
 
-        with Image.open(img_file).convert("RGB") as img:
-            image_dict[img_file.stem] = img.resize((224, 224))
+def image_resolution():
+    """
+    IMAGE_RESOLUTION as (width, height), e.g. "448" or "448x336", None for "native" (no resize).
+    """
+    value = os.getenv("IMAGE_RESOLUTION", DEFAULT_IMAGE_RESOLUTION).lower()
+    if value == "native":
+        return None
+    width, _, height = value.partition("x")
+    return int(width), int(height or width)
+
+
+class ImageCache(Mapping):
+    """
+    Maps image names (file stems) to RGB images, decoding an image only when a prompt uses it.
+    Decoded and resized pixels are stored as .npy files keyed by the file content hash and
+    target size, and memory-mapped on later runs instead of being decoded again.
+    """
+
+    def __init__(self, images_path, resolution=None, cache_dir=None):
+        self.files = {
+            img_file.stem: img_file
+            for img_file in sorted(images_path.iterdir())
+            if img_file.suffix.lower() in IMAGE_EXTENSIONS
+        }
+        self.resolution = resolution
+        self.cache_dir = Path(
+            cache_dir or os.getenv("IMAGE_CACHE_DIR", DEFAULT_IMAGE_CACHE_DIR)
+        )
+        self._images = {}
+
+    def __getitem__(self, name):
+        from PIL import Image
+
+        if name not in self._images:
+            self._images[name] = Image.fromarray(self._pixels(self.files[name]))
+        return self._images[name]
+
+    def __iter__(self):
+        return iter(self.files)
+
+    def __len__(self):
+        return len(self.files)
 
-    return image_dict
+    def _cache_path(self, img_file):
+        digest = hashlib.sha256(img_file.read_bytes()).hexdigest()
+        size = "native" if self.resolution is None else "%dx%d" % self.resolution
+        return self.cache_dir / f"{digest}_{size}.npy"
+
+    def _pixels(self, img_file):
+        # imported here, text runners and the mock engine don't need numpy or Pillow
+        import numpy as np
+        from PIL import Image
+
+        cache_path = self._cache_path(img_file)
+        if cache_path.exists():
+            return np.load(cache_path, mmap_mode="r")
+
+        with Image.open(img_file) as img:
+            img = img.convert("RGB")
+            if self.resolution is not None:
+                img = img.resize(self.resolution)
+            pixels = np.asarray(img)
+
+        # write then rename, containers on other GPUs may be filling the same cache
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+        with tmp_path.open("wb") as f:
+            np.save(f, pixels)
+        tmp_path.rename(cache_path)
+        return pixels
+
+
+def load_images(images_path, resolution=None):
+    if not images_path.exists():
+        raise (FileNotFoundError(f"No images files found at {images_path}"))
+    return ImageCache(images_path, resolution or image_resolution())
 
 
 def load_prompts(prompts_path):
@@ -30,6 +102,17 @@ def load_prompts(prompts_path):
         return yaml.safe_load(f)["prompts"]
 
 
+def replicate_prompts(prompts, batch_size=None):
+    """
+    Repeats the prompts up to PROMPT_BATCH_SIZE requests per iteration, the same preprocessed
+    inputs are reused for every copy.
+    """
+    batch_size = batch_size or int(os.getenv("PROMPT_BATCH_SIZE", 0))
+    if not batch_size:
+        return prompts
+    return [prompts[i % len(prompts)] for i in range(batch_size)]
+
+
 # TODO: rename?
 def prompts_to_messages(prompts, multimedia_dict):
     return [
@@ -0,0 +1,155 @@
+"""
+profiler.py - windowed kernel trace capture for the generation loop
+
+Skips PROFILE_WARMUP_ITERATIONS iterations and then traces up to PROFILE_ITERATIONS iterations,
+writing Chrome/Perfetto traces into <LOG_DIR>/traces. Every traced iteration is its own profiler
+window, so capture stops as soon as the traces written so far exceed PROFILE_MAX_TRACE_MB.
+
+PROFILE_BACKEND=vllm     vLLM's built-in profiler hooks (llm.start_profile/stop_profile), which
+                         trace the engine core process
+PROFILE_BACKEND=torch    torch.profiler in the runner process, the engine core is moved in-process
+                         (VLLM_ENABLE_V1_MULTIPROCESSING=0) so its kernels are visible
+PROFILE_ACTIVITIES       torch backend only, e.g. "cpu,cuda"
+PROFILE_RECORD_SHAPES, PROFILE_WITH_STACK
+                         "1" to record input shapes / Python stacks
+"""
+
+import gzip
+import os
+import shutil
+from pathlib import Path
+
+__all__ = ["TraceWindow", "configure_profiler"]
+
+DEFAULT_MAX_TRACE_MB = 2048
+
+
+def _flag(name):
+    return os.getenv(name, "0") == "1"
+
+
+def _profile_iterations():
+    return int(os.getenv("PROFILE_ITERATIONS", "0"))
+
+
+def _trace_dir():
+    return Path(os.getenv("LOG_DIR", ".")) / "traces"
+
+
+def _dir_size(path):
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+def configure_profiler():
+    """
+    Sets the env vars the profiler needs before the engine is created.
+    """
+    if not _profile_iterations():
+        return
+
+    backend = os.getenv("PROFILE_BACKEND", "vllm")
+    if backend == "vllm":
+        trace_dir = _trace_dir()
+        trace_dir.mkdir(parents=True, exist_ok=True)
+        os.environ["VLLM_TORCH_PROFILER_DIR"] = str(trace_dir)
+        os.environ["VLLM_TORCH_PROFILER_RECORD_SHAPES"] = (
+            "1" if _flag("PROFILE_RECORD_SHAPES") else "0"
+        )
+        os.environ["VLLM_TORCH_PROFILER_WITH_STACK"] = (
+            "1" if _flag("PROFILE_WITH_STACK") else "0"
+        )
+    elif backend == "torch":
+        os.environ["VLLM_ENABLE_V1_MULTIPROCESSING"] = "0"
+    else:
+        raise ValueError(f"Unknown PROFILE_BACKEND {backend}.")
+
+
+class TraceWindow:
+    """
+    Called around every iteration of a runner loop, starts and stops the profiler
+    for the iterations inside the configured window.
+    """
+
+    def __init__(self, llm):
+        self.llm = llm
+        self.iterations = _profile_iterations()
+        self.warmup = int(os.getenv("PROFILE_WARMUP_ITERATIONS", "1"))
+        self.backend = os.getenv("PROFILE_BACKEND", "vllm")
+        self.max_bytes = (
+            int(os.getenv("PROFILE_MAX_TRACE_MB", DEFAULT_MAX_TRACE_MB)) * 1024 * 1024
+        )
+        self.trace_dir = _trace_dir()
+        self.traced = 0
+        self.capped = False
+        self._profiler = None
+
+    def _active(self, iteration):
+        return (
+            self.iterations
+            and not self.capped
+            and self.warmup <= iteration < self.warmup + self.iterations
+        )
+
+    def before_iteration(self, iteration):
+        if not self._active(iteration):
+            return
+        self.trace_dir.mkdir(parents=True, exist_ok=True)
+        if self.backend == "vllm":
+            self.llm.start_profile()
+        else:
+            self._profiler = self._torch_profiler()
+            self._profiler.start()
+
+    def after_iteration(self, iteration):
+        if not self._active(iteration):
+            return
+        if self.backend == "vllm":
+            self.llm.stop_profile()
+            self._collect_vllm_traces()
+        else:
+            self._profiler.stop()
+            self._export_torch_trace(iteration)
+            self._profiler = None
+        self.traced += 1
+
+        size = _dir_size(self.trace_dir)
+        print(f"Traced iteration {iteration}, traces total {size / 2**20:.1f} MiB")
+        if size >= self.max_bytes:
+            print(
+                f"Trace size cap of {self.max_bytes / 2**20:.0f} MiB reached, "
+                f"stopping capture after {self.traced} iterations."
+            )
+            self.capped = True
+
+    def _collect_vllm_traces(self):
+        # warm workers keep the profiler dir of the first run, move traces to the current run
+        profiler_dir = Path(os.getenv("VLLM_TORCH_PROFILER_DIR", self.trace_dir))
+        if profiler_dir.resolve() == self.trace_dir.resolve():
+            return
+        for trace in profiler_dir.iterdir():
+            if trace.is_file():
+                shutil.move(str(trace), self.trace_dir / trace.name)
+
+    def _torch_profiler(self):
+        import torch
+
+        activities = {
+            "cpu": torch.profiler.ProfilerActivity.CPU,
+            "cuda": torch.profiler.ProfilerActivity.CUDA,
+        }
+        return torch.profiler.profile(
+            activities=[
+                activities[name.strip()]
+                for name in os.getenv("PROFILE_ACTIVITIES", "cpu,cuda").split(",")
+            ],
+            record_shapes=_flag("PROFILE_RECORD_SHAPES"),
+            with_stack=_flag("PROFILE_WITH_STACK"),
+        )
+
+    def _export_torch_trace(self, iteration):
+        trace_path = self.trace_dir / f"trace_iter{iteration:04d}.json"
+        self._profiler.export_chrome_trace(str(trace_path))
+        # traces compress very well and perfetto opens .json.gz directly
+        with trace_path.open("rb") as src, gzip.open(f"{trace_path}.gz", "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        trace_path.unlink()
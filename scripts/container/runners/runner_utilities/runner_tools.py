@@ -2,15 +2,87 @@
 running_utils.py - utilities for running inferrence
 """
 
+import os
 import time
 
+from runner_utilities.metrics import MetricsCollector
+from runner_utilities.online import OnlineEngine, run_online
+from runner_utilities.phases import PHASES
+from runner_utilities.prefix_cache import run_prefix_ab
+from runner_utilities.profiler import TraceWindow, configure_profiler
+
+
+def build_llm(mode=None, **engine_kwargs):
+    """
+    Creates the engine for a runner: the offline LLM by default, the async engine when
+    RUN_MODE=online, or an offline LLM with prefix caching for RUN_MODE=prefix-ab.
+    Runners which only support offline runs pass mode="offline".
+    LLM_BACKEND=mock swaps vLLM for the synthetic engine of runner_utilities.mock.
+    """
+    mode = mode or os.getenv("RUN_MODE", "offline")
+    backend = os.getenv("LLM_BACKEND", "vllm")
+    configure_profiler()
+    if mode not in ("online", "offline", "prefix-ab"):
+        raise ValueError(f"Unknown RUN_MODE {mode}.")
+    if backend not in ("vllm", "mock"):
+        raise ValueError(f"Unknown LLM_BACKEND {backend}.")
+
+    # ENABLE_PREFIX_CACHING overrides the runner's default, prefix-ab needs it enabled
+    if os.getenv("ENABLE_PREFIX_CACHING"):
+        engine_kwargs["enable_prefix_caching"] = (
+            os.getenv("ENABLE_PREFIX_CACHING") == "1"
+        )
+    if mode == "prefix-ab":
+        engine_kwargs["enable_prefix_caching"] = True
+
+    # the orchestrator mounts tensor_parallel_size * data_parallel_size devices for these
+    for name in ("tensor_parallel_size", "data_parallel_size"):
+        if os.getenv(name.upper()):
+            engine_kwargs[name] = int(os.getenv(name.upper()))
+
+    # weight loading, memory profiling and graph capture all happen in here
+    with PHASES.phase("engine_init"):
+        if backend == "mock":
+            from runner_utilities.mock import MockAsyncEngine, MockLLM
+
+            if mode == "online":
+                return OnlineEngine(engine=MockAsyncEngine(**engine_kwargs))
+            return MockLLM(**engine_kwargs)
+
+        if mode == "online":
+            return OnlineEngine(**engine_kwargs)
+
+        from vllm import LLM
+
+        return LLM(**engine_kwargs)
+
+
+def warmup(run_iteration):
+    """
+    Runs WARMUP_ITERATIONS (default 1) iterations which are excluded from the metrics,
+    they include torch.compile and lazy graph capture for shapes seen for the first time.
+    """
+    warmup_iterations = int(os.getenv("WARMUP_ITERATIONS", "1"))
+    with PHASES.phase("warmup", iterations=warmup_iterations):
+        for _ in range(warmup_iterations):
+            run_iteration()
+
 
 def generate_and_collect(
     model, duration, iterations, llm, prompts, sampling_params, print_example=True
 ):
+    if isinstance(llm, OnlineEngine):
+        warmup(lambda: llm.generate(prompts, sampling_params))
+        return run_online(model, duration, iterations, llm, prompts, sampling_params)
+    if os.getenv("RUN_MODE") == "prefix-ab":
+        return run_prefix_ab(model, duration, iterations, llm, prompts, sampling_params)
+
+    warmup(lambda: llm.generate(prompts, sampling_params, use_tqdm=False))
+
     start = time.monotonic()
     iteration_count = 0
-    outputs = []
+    # only the last batch is kept, outputs of earlier iterations are dropped once collected
+    batch_outputs, sample = [], None
 
     def condition():
         if duration:
@@ -22,13 +94,23 @@ def generate_and_collect(
                 "Either duration or iterations must be explicitly provided."
             )
 
-    while condition():
-        outputs.extend(llm.generate(prompts, sampling_params))
-        iteration_count += 1
+    collector = MetricsCollector(model)
+    trace_window = TraceWindow(llm)
+    with PHASES.phase("steady_state"):
+        while condition():
+            trace_window.before_iteration(iteration_count)
+            batch_start = time.monotonic()
+            batch_outputs = llm.generate(prompts, sampling_params)
+            collector.add_batch(batch_outputs, batch_start, time.monotonic())
+            trace_window.after_iteration(iteration_count)
+            if sample is None and batch_outputs:
+                sample = batch_outputs[0].outputs[0].text
+            iteration_count += 1
 
     total_duration = time.monotonic() - start
 
-    if print_example:
-        print(f"Sample output from {model}: {outputs[0].outputs[0].text}")
+    if print_example and sample is not None:
+        print(f"Sample output from {model}: {sample}")
     print(f"Total runtime: {total_duration:.2f}s for {iteration_count} iterations.")
-    return outputs
+    collector.report()
+    return batch_outputs
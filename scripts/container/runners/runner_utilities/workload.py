@@ -0,0 +1,151 @@
+"""
+workload.py - synthetic workloads with exact input and output token counts
+
+A workload file (yaml/workloads/*.yaml) describes how many prompts to generate and the
+distributions of their input and output lengths:
+
+num_prompts: 64
+seed: 0
+input_len: {distribution: fixed, value: 2048}
+output_len: {distribution: lognormal, median: 256, sigma: 0.5, min: 16, max: 1024}
+
+Distributions are fixed (value), uniform (min, max) and lognormal (median, sigma, optional
+min/max clamp). An optional shared prefix models system prompts and few-shot templates:
+
+shared_prefix: {ratio: 0.5, num_prefixes: 4}
+
+makes the first half of every prompt one of 4 shared token sequences (PREFIX_SHARED_RATIO
+overrides the ratio, e.g. as a sweep axis). Prompts are random token IDs from the model's tokenizer passed as token prompts,
+so the engine sees exactly input_len tokens, and generation is forced to output_len tokens with
+ignore_eos. Generated workloads are cached per tokenizer, keyed by the workload spec (the mock
+engine's whitespace tokenizer gets its own cache).
+"""
+
+import hashlib
+import json
+import math
+import os
+import random
+from pathlib import Path
+
+import yaml
+
+from runner_utilities import mock
+
+__all__ = ["SyntheticPrompts", "load_workload", "sampling_params_for"]
+
+DEFAULT_WORKLOAD_CACHE_DIR = "/workspace/.cache/workloads"
+
+
+class SyntheticPrompts(list):
+    """
+    Token prompts with the number of tokens to generate for each of them.
+    """
+
+    def __init__(self, prompts, output_lens):
+        super().__init__(prompts)
+        self.output_lens = output_lens
+
+
+def _sample_lengths(spec, count, rng):
+    distribution = spec.get("distribution", "fixed")
+    if distribution == "fixed":
+        return [int(spec["value"])] * count
+    if distribution == "uniform":
+        return [rng.randint(int(spec["min"]), int(spec["max"])) for _ in range(count)]
+    if distribution == "lognormal":
+        mu, sigma = math.log(spec["median"]), float(spec["sigma"])
+        low, high = int(spec.get("min", 1)), int(spec.get("max", 2**31))
+        return [
+            min(max(round(rng.lognormvariate(mu, sigma)), low), high)
+            for _ in range(count)
+        ]
+    raise ValueError(f"Unknown length distribution {distribution}.")
+
+
+def _tokenizer(model):
+    if mock.enabled():
+        return mock.MockTokenizer()
+    from transformers import AutoTokenizer
+
+    return AutoTokenizer.from_pretrained(model)
+
+
+def _generate(model, spec):
+    tokenizer = _tokenizer(model)
+    special_ids = set(tokenizer.all_special_ids)
+    token_ids = [i for i in range(tokenizer.vocab_size) if i not in special_ids]
+
+    rng = random.Random(spec.get("seed", 0))
+    num_prompts = int(spec["num_prompts"])
+    input_lens = _sample_lengths(spec["input_len"], num_prompts, rng)
+    output_lens = _sample_lengths(spec["output_len"], num_prompts, rng)
+    prompts = [rng.choices(token_ids, k=input_len) for input_len in input_lens]
+
+    shared_prefix = spec.get("shared_prefix")
+    if shared_prefix:
+        ratio = float(shared_prefix["ratio"])
+        prefixes = [
+            rng.choices(token_ids, k=round(ratio * max(input_lens)))
+            for _ in range(int(shared_prefix.get("num_prefixes", 1)))
+        ]
+        for i, prompt in enumerate(prompts):
+            prefix_len = round(ratio * len(prompt))
+            prompt[:prefix_len] = prefixes[i % len(prefixes)][:prefix_len]
+    return {"prompt_token_ids": prompts, "output_lens": output_lens}
+
+
+def load_workload(workload_path, model, cache_dir=None):
+    with Path(workload_path).open("r") as f:
+        spec = yaml.safe_load(f)
+    if os.getenv("PREFIX_SHARED_RATIO"):
+        spec["shared_prefix"] = spec.get("shared_prefix", {}) | {
+            "ratio": float(os.getenv("PREFIX_SHARED_RATIO"))
+        }
+
+    spec_hash = hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()
+    cache_path = (
+        Path(cache_dir or os.getenv("WORKLOAD_CACHE_DIR", DEFAULT_WORKLOAD_CACHE_DIR))
+        / (model.replace("/", "_") + ("_mock" if mock.enabled() else ""))
+        / f"{spec_hash[:16]}.json"
+    )
+    if cache_path.exists():
+        with cache_path.open("r") as f:
+            workload = json.load(f)
+    else:
+        workload = _generate(model, spec)
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+        with tmp_path.open("w") as f:
+            json.dump(workload, f)
+        tmp_path.rename(cache_path)
+
+    input_lens = [len(ids) for ids in workload["prompt_token_ids"]]
+    print(
+        f"Workload {Path(workload_path).stem}: {len(input_lens)} prompts, "
+        f"{sum(input_lens)} input tokens, {sum(workload['output_lens'])} output tokens"
+    )
+    return SyntheticPrompts(
+        [{"prompt_token_ids": ids} for ids in workload["prompt_token_ids"]],
+        workload["output_lens"],
+    )
+
+
+def sampling_params_for(prompts, **sampling_kwargs):
+    """
+    One SamplingParams for hand-written prompts, or one per synthetic prompt forcing its
+    output length.
+    """
+    if mock.enabled():
+        SamplingParams = mock.SamplingParams
+    else:
+        from vllm import SamplingParams
+
+    if not isinstance(prompts, SyntheticPrompts):
+        return SamplingParams(**sampling_kwargs)
+    return [
+        SamplingParams(
+            **sampling_kwargs | {"max_tokens": output_len, "ignore_eos": True}
+        )
+        for output_len in prompts.output_lens
+    ]
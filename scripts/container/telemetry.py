@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+
+"""
+telemetry.py
+
+GPU telemetry sampler polling the amdgpu sysfs and hwmon files of the container's device.
+
+A background thread reads GPU busy %, VRAM use, power, temperatures and clocks every
+TELEMETRY_INTERVAL_MS (default 500) and appends them to telemetry.csv. The files are kept open
+and re-read from offset 0, so a sample costs a few pread calls. After the run, the energy used
+during the steady state phases is combined with the token counts in metrics.json into tokens
+per joule. The sysfs root is configurable (TELEMETRY_SYSFS_ROOT), so the sampler can be pointed
+at a fake tree.
+
+Standalone usage:
+
+scripts/container/telemetry.py --device /dev/dri/renderD128 --duration 10 -o telemetry.csv
+scripts/container/telemetry.py --sysfs-root ./fake_sys --device renderD128 --duration 2
+
+"""
+
+import argparse
+import csv
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+# column, file relative to the device dir (globs resolve hwmon*), scale to the column unit
+SENSORS = (
+    ("busy_pct", "gpu_busy_percent", 1),
+    ("vram_used_mib", "mem_info_vram_used", 1 / 2**20),
+    ("power_w", "hwmon/hwmon*/power1_average", 1e-6),
+    ("temp_edge_c", "hwmon/hwmon*/temp1_input", 1e-3),
+    ("temp_junction_c", "hwmon/hwmon*/temp2_input", 1e-3),
+    ("temp_mem_c", "hwmon/hwmon*/temp3_input", 1e-3),
+    ("sclk_mhz", "hwmon/hwmon*/freq1_input", 1e-6),
+    ("mclk_mhz", "hwmon/hwmon*/freq2_input", 1e-6),
+)
+# newer kernels only expose the instantaneous power
+FALLBACKS = {"power_w": "hwmon/hwmon*/power1_input"}
+COLUMNS = ("timestamp", *(name for name, _, _ in SENSORS))
+
+
+def device_dir(device, sysfs_root="/sys"):
+    return Path(sysfs_root) / "class" / "drm" / Path(device).name / "device"
+
+
+def _open_sensor(base, pattern):
+    paths = sorted(base.glob(pattern))
+    if not paths:
+        return None
+    try:
+        return os.open(paths[0], os.O_RDONLY)
+    except OSError:
+        return None
+
+
+def _read(fd):
+    try:
+        return float(os.pread(fd, 64, 0).split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class TelemetrySampler(threading.Thread):
+    def __init__(self, device, out_path, interval=0.5, sysfs_root="/sys"):
+        super().__init__(daemon=True)
+        self.base = device_dir(device, sysfs_root)
+        self.out_path = Path(out_path)
+        self.interval = interval
+        self.sensors = []
+        for name, pattern, scale in SENSORS:
+            fd = _open_sensor(self.base, pattern)
+            if fd is None and name in FALLBACKS:
+                fd = _open_sensor(self.base, FALLBACKS[name])
+            if fd is not None:
+                self.sensors.append((name, fd, scale))
+        # (timestamp, power_w, vram_used_mib) kept for the summary, the full rows go to the csv
+        self.samples = []
+        self._stop_event = threading.Event()
+
+    def sample(self):
+        row = {"timestamp": time.time()}
+        for name, fd, scale in self.sensors:
+            value = _read(fd)
+            row[name] = round(value * scale, 3) if value is not None else None
+        self.samples.append(
+            (row["timestamp"], row.get("power_w"), row.get("vram_used_mib"))
+        )
+        return row
+
+    def run(self):
+        self.out_path.parent.mkdir(parents=True, exist_ok=True)
+        with self.out_path.open("w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=COLUMNS)
+            writer.writeheader()
+            writer.writerow(self.sample())
+            while not self._stop_event.wait(self.interval):
+                writer.writerow(self.sample())
+            writer.writerow(self.sample())
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        for _, fd, _ in self.sensors:
+            os.close(fd)
+        return self.summary()
+
+    def energy(self, start=None, end=None):
+        """
+        Joules used over the whole run (trapezoidal integration), or between start and end as the
+        mean power of the samples around the window times its length, so windows shorter than
+        the sampling interval still get a value.
+        """
+        if start is None or end is None:
+            points = [(t, power) for t, power, _ in self.samples if power is not None]
+            return sum(
+                (t1 - t0) * (p0 + p1) / 2
+                for (t0, p0), (t1, p1) in zip(points, points[1:])
+            )
+        powers = [
+            power
+            for t, power, _ in self.samples
+            if power is not None and start - self.interval <= t <= end + self.interval
+        ]
+        return sum(powers) / len(powers) * (end - start) if powers else None
+
+    def summary(self):
+        powers = [power for _, power, _ in self.samples if power is not None]
+        vram = [used for _, _, used in self.samples if used is not None]
+        return {
+            "samples": len(self.samples),
+            "sensors": [name for name, _, _ in self.sensors],
+            "energy_j": self.energy() if powers else None,
+            "power_mean_w": sum(powers) / len(powers) if powers else None,
+            "power_max_w": max(powers, default=None),
+            "vram_peak_mib": max(vram, default=None),
+        }
+
+
+class SamplerGroup:
+    """
+    Samplers of all devices of a multi-GPU run, energy and power are summed over the devices.
+    """
+
+    def __init__(self, samplers):
+        self.samplers = samplers
+
+    def start(self):
+        for sampler in self.samplers:
+            sampler.start()
+
+    def stop(self):
+        for sampler in self.samplers:
+            sampler.stop()
+        return self.summary()
+
+    def energy(self, start=None, end=None):
+        energies = [sampler.energy(start, end) for sampler in self.samplers]
+        return None if None in energies else sum(energies)
+
+    def summary(self):
+        summaries = [sampler.summary() for sampler in self.samplers]
+
+        def total(name):
+            values = [summary[name] for summary in summaries]
+            return None if None in values else sum(values)
+
+        return {
+            "samples": min(summary["samples"] for summary in summaries),
+            "sensors": summaries[0]["sensors"],
+            "energy_j": total("energy_j"),
+            "power_mean_w": total("power_mean_w"),
+            "power_max_w": max(
+                (
+                    summary["power_max_w"]
+                    for summary in summaries
+                    if summary["power_max_w"]
+                ),
+                default=None,
+            ),
+            "vram_peak_mib": total("vram_peak_mib"),
+            "devices": summaries,
+        }
+
+
+def start_sampler(log_dir):
+    """
+    Starts sampling the container's devices (GPU_DEVICE, comma separated for multi-GPU runs)
+    into <log_dir>/telemetry.csv, or telemetry_<render node>.csv per device of a group.
+    Returns None when disabled (TELEMETRY=0) or no sensors are found.
+    """
+    devices = [device for device in os.getenv("GPU_DEVICE", "").split(",") if device]
+    if os.getenv("TELEMETRY", "1") != "1" or not devices:
+        return None
+    samplers = []
+    for device in devices:
+        out_name = (
+            "telemetry.csv"
+            if len(devices) == 1
+            else f"telemetry_{Path(device).name}.csv"
+        )
+        sampler = TelemetrySampler(
+            device,
+            Path(log_dir) / out_name,
+            interval=float(os.getenv("TELEMETRY_INTERVAL_MS", "500")) / 1000,
+            sysfs_root=os.getenv("TELEMETRY_SYSFS_ROOT", "/sys"),
+        )
+        samplers.append(sampler)
+        if not sampler.sensors:
+            print(f"No GPU telemetry found under {sampler.base}, sampler disabled.")
+            for unused in samplers:
+                for _, fd, _ in unused.sensors:
+                    os.close(fd)
+            return None
+    sampler = samplers[0] if len(samplers) == 1 else SamplerGroup(samplers)
+    sampler.start()
+    return sampler
+
+
+def annotate_metrics(log_dir, sampler):
+    """
+    Adds the telemetry summary and the energy of the steady state phases, as tokens per joule,
+    to every metrics.json under log_dir.
+    """
+    summary = sampler.summary()
+    for metrics_path in sorted(Path(log_dir).rglob("metrics.json")):
+        with metrics_path.open("r") as f:
+            metrics = json.load(f)
+
+        telemetry = dict(summary)
+        steady_state = [
+            phase
+            for phase in metrics.get("phases", [])
+            if phase["name"] == "steady_state"
+        ]
+        energies = [
+            sampler.energy(phase["start"], phase["end"]) for phase in steady_state
+        ]
+        if energies and None not in energies:
+            energy = sum(energies)
+            tokens = metrics.get("prompt_tokens", 0) + metrics.get(
+                "generation_tokens", 0
+            )
+            telemetry["steady_state_energy_j"] = energy
+            telemetry["tokens_per_j"] = tokens / energy if energy else None
+            telemetry["generation_tokens_per_j"] = (
+                metrics.get("generation_tokens", 0) / energy if energy else None
+            )
+
+        with metrics_path.open("w") as f:
+            json.dump(metrics | {"telemetry": telemetry}, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sample GPU telemetry from sysfs.")
+    parser.add_argument(
+        "--device", help="Render node, e.g. /dev/dri/renderD128.", required=True
+    )
+    parser.add_argument("--sysfs-root", default="/sys")
+    parser.add_argument(
+        "--interval", help="Seconds between samples.", type=float, default=0.5
+    )
+    parser.add_argument("--duration", help="Seconds to sample for.", type=float)
+    parser.add_argument("-o", "--output", type=Path, default=Path("telemetry.csv"))
+    args = parser.parse_args()
+
+    sampler = TelemetrySampler(
+        args.device, args.output, interval=args.interval, sysfs_root=args.sysfs_root
+    )
+    print(f"Sensors: {', '.join(name for name, _, _ in sampler.sensors) or 'none'}")
+    sampler.start()
+    try:
+        if args.duration:
+            time.sleep(args.duration)
+        else:
+            sampler.join()
+    except KeyboardInterrupt:
+        pass
+    print(json.dumps(sampler.stop(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
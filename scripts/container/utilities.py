@@ -1,12 +1,201 @@
+import gzip
+import queue
+import threading
+import time
+from pathlib import Path
+
+# seconds between flushes of the Tee'd streams, instead of flushing on every write
+FLUSH_INTERVAL = 0.5
+
+
 class Tee:
     def __init__(self, *files):
         self.files = files
+        self._last_flush = time.monotonic()
 
     def write(self, data):
         for f in self.files:
             f.write(data)
-            f.flush()
+        if time.monotonic() - self._last_flush >= FLUSH_INTERVAL:
+            self.flush()
 
     def flush(self):
         for f in self.files:
             f.flush()
+        self._last_flush = time.monotonic()
+
+
+def _compressed_open(compression):
+    """
+    Returns (suffix, open function) for "zstd" or "gzip", zstd falls back to gzip
+    when no zstd module is available.
+    """
+    if compression == "zstd":
+        try:
+            from compression import zstd  # Python 3.14+
+
+            return ".zst", zstd.open
+        except ImportError:
+            pass
+        try:
+            import zstandard
+
+            return ".zst", zstandard.open
+        except ImportError:
+            pass
+    return ".gz", gzip.open
+
+
+def compress_file(path, compression="zstd"):
+    suffix, open_compressed = _compressed_open(compression)
+    with Path(path).open("rb") as src, open_compressed(f"{path}{suffix}", "wb") as dst:
+        while chunk := src.read(1 << 20):
+            dst.write(chunk)
+    Path(path).unlink()
+
+
+def open_log_segment(path):
+    """
+    Opens a log or one of its rotated segments (.zst, .gz or uncompressed) for reading text.
+    """
+    path = Path(path)
+    if path.suffix == ".zst":
+        try:
+            from compression import zstd  # Python 3.14+
+        except ImportError:
+            import zstandard as zstd
+        return zstd.open(path, "rt", errors="replace")
+    if path.suffix == ".gz":
+        return gzip.open(path, "rt", errors="replace")
+    return path.open("r", errors="replace")
+
+
+def log_segments(path):
+    """
+    The rotated segments of a LogWriter log (<name>.1, <name>.2.zst, ...) followed by the log
+    itself, in the order they were written.
+    """
+    path = Path(path)
+    segments = {}
+    for segment in path.parent.glob(f"{path.name}.*"):
+        index = segment.name[len(path.name) + 1 :].split(".")[0]
+        # a segment still being compressed exists twice, the uncompressed one is complete
+        if index.isdigit() and (
+            int(index) not in segments
+            or len(segment.name) < len(segments[int(index)].name)
+        ):
+            segments[int(index)] = segment
+    return [segments[index] for index in sorted(segments)] + (
+        [path] if path.exists() else []
+    )
+
+
+class LogWriter:
+    """
+    File-like log writer which moves file IO to a background thread. Writes are queued (blocking
+    once queue_size chunks are pending), written through a large buffer and flushed every
+    flush_interval seconds, together with the streams passed to flush_with. Once the log exceeds
+    max_bytes (encoded bytes) it is rotated to <name>.<n>, and finished segments are compressed
+    (zstd or gzip) in the background.
+    """
+
+    _FLUSH = object()
+    _CLOSE = object()
+
+    def __init__(
+        self,
+        path,
+        max_bytes=None,
+        compression="zstd",
+        queue_size=10_000,
+        flush_interval=1.0,
+    ):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.compression = compression
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._file = self._open()
+        self._size = 0
+        self._segments = 0
+        self._streams = []
+        self._compressors = []
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _open(self):
+        return self.path.open("w", buffering=1 << 20, errors="replace")
+
+    def flush_with(self, *streams):
+        """
+        Flushes streams from the writer thread every flush_interval, e.g. the console streams
+        behind a Tee, which only flushes on a write and would hold the last output back.
+        """
+        self._streams.extend(streams)
+
+    def write(self, data):
+        # output after close (e.g. through a Tee'd stdout) still goes to the other streams
+        if data and not self._closed:
+            self._queue.put(data)
+        return len(data)
+
+    def flush(self):
+        if not self._closed:
+            self._queue.put(self._FLUSH)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(self._CLOSE)
+        self._thread.join()
+        for compressor in self._compressors:
+            compressor.join()
+
+    def _run(self):
+        next_flush = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(next_flush - time.monotonic(), 0))
+            except queue.Empty:
+                item = None
+            if item is self._CLOSE:
+                break
+            if isinstance(item, str):
+                self._file.write(item)
+                self._size += len(item) if item.isascii() else self._encoded_len(item)
+                if self.max_bytes and self._size >= self.max_bytes:
+                    self._rotate()
+            # flush on time even while writes keep coming
+            if item is self._FLUSH or time.monotonic() >= next_flush:
+                self._flush()
+                next_flush = time.monotonic() + self.flush_interval
+        self._flush()
+        self._file.close()
+
+    def _encoded_len(self, data):
+        return len(data.encode(self._file.encoding, errors="replace"))
+
+    def _flush(self):
+        self._file.flush()
+        for stream in self._streams:
+            try:
+                stream.flush()
+            except (OSError, ValueError):
+                # closed or broken console, the log itself is unaffected
+                pass
+
+    def _rotate(self):
+        self._file.close()
+        self._segments += 1
+        segment = self.path.with_name(f"{self.path.name}.{self._segments}")
+        self.path.rename(segment)
+        self._file = self._open()
+        self._size = 0
+        if self.compression:
+            compressor = threading.Thread(
+                target=compress_file, args=(segment, self.compression)
+            )
+            compressor.start()
+            self._compressors.append(compressor)
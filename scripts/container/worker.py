@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+
+"""
+worker.py
+
+Long-lived container script which loads a model once and then serves a queue of workloads.
+
+The orchestrator (--warm) drops workload files into <queue-dir>/inbox and waits for the matching
+file in <queue-dir>/done. Workloads only carry runner arguments (prompts, iterations/duration)
+and sampling env vars (SP_*), so the engine built at startup is reused for all of them.
+Engine arguments are fixed for the lifetime of the container, the orchestrator restarts
+the container when they change.
+
+The worker's stdout and stderr file descriptors go through a pipe, so output written below
+Python (MIOpen, the engine core process) reaches cmd.log. Every workload's run dir gets the files
+of a run_model.py run: miopen_cmds.json and vLLM startup phases from the output, its share of
+hipblaslt_gemms.json, phases.json (startup_s and compile_cache in metrics.json) and the telemetry
+summary in metrics.json. The first workload is charged with the container start and engine
+init, the startup of later ones is their warmup. cmd.log and telemetry.csv cover the whole worker
+and stay in its own run dir, which also gets the GEMMs of all workloads.
+
+"""
+
+import argparse
+import importlib
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+from pathlib import Path
+
+from run_model import (
+    parse_engine_phase,
+    run_log_dir,
+    setup_environment,
+    write_phase_timeline,
+)
+from hipblaslt_log import GemmAggregate, LogTailer, write_aggregate
+from miopen_log import MiopenCommands
+from telemetry import annotate_metrics, start_sampler
+from runner_utilities.events import emit
+
+RUNNERS_DIR = Path(__file__).parent / "runners"
+STOP_FILE = "STOP"
+
+
+def load_runner(script):
+    sys.path.insert(0, str(RUNNERS_DIR))
+    return importlib.import_module(Path(script).stem)
+
+
+class OutputCapture(threading.Thread):
+    """
+    Points stdout and stderr (file descriptors 1 and 2) at a pipe and copies every line to the
+    console and the log, like run_model.py does with a runner's output. MIOpen commands and vLLM
+    startup phases are collected until take() hands them to a workload.
+    """
+
+    def __init__(self, log_file, source):
+        super().__init__(daemon=True)
+        self.log_file = log_file
+        self.source = source
+        self._lock = threading.Lock()
+        self._miopen_commands = MiopenCommands(source=source)
+        self._engine_phases = []
+
+        sys.stdout.flush()
+        sys.stderr.flush()
+        self._saved_fds = (os.dup(1), os.dup(2))
+        self._console = os.fdopen(os.dup(1), "w", errors="replace")
+        log_file.flush_with(self._console)
+        read_fd, write_fd = os.pipe()
+        os.dup2(write_fd, 1)
+        os.dup2(write_fd, 2)
+        os.close(write_fd)
+        self._pipe = os.fdopen(read_fd, "r", errors="replace")
+
+    def run(self):
+        for line in self._pipe:
+            self._console.write(line)
+            self.log_file.write(line)
+            phase = parse_engine_phase(line)
+            with self._lock:
+                self._miopen_commands.feed(line)
+                if phase:
+                    self._engine_phases.append(phase)
+            if phase:
+                emit("phase", source="vllm_log", **phase)
+
+    def take(self):
+        # (MIOpen commands, engine phases) since the last call
+        sys.stdout.flush()
+        sys.stderr.flush()
+        with self._lock:
+            taken = (self._miopen_commands, self._engine_phases)
+            self._miopen_commands = MiopenCommands(source=self.source)
+            self._engine_phases = []
+        return taken
+
+    def stop(self):
+        sys.stdout.flush()
+        sys.stderr.flush()
+        for fd, saved_fd in zip((1, 2), self._saved_fds):
+            os.dup2(saved_fd, fd)
+            os.close(saved_fd)
+        # engine processes that inherited the pipe keep it open, don't wait for them
+        self.join(timeout=5)
+        self._console.flush()
+
+
+class WorkloadArtifacts:
+    """
+    Splits what the worker collects (output, hipBLASLt GEMMs, telemetry) into the run dir of
+    each workload.
+    """
+
+    def __init__(self, output, hipblaslt_tailer, telemetry_sampler, worker_start):
+        self.output = output
+        self.hipblaslt_tailer = hipblaslt_tailer
+        self.telemetry_sampler = telemetry_sampler
+        self.worker_start = worker_start
+        # GEMMs of all workloads, for the worker's own run dir
+        self.gemms = GemmAggregate(source=output.source)
+        self._first = True
+
+    def write(self, log_dir, start, succeeded):
+        miopen_commands, engine_phases = self.output.take()
+        gemms = self.hipblaslt_tailer.take(GemmAggregate(source=self.output.source))
+        self.gemms.merge(gemms)
+        write_aggregate(gemms, log_dir / "hipblaslt_gemms.json")
+        if miopen_commands.counts:
+            miopen_commands.write_json(log_dir / "miopen_cmds.json")
+        if succeeded:
+            write_phase_timeline(
+                log_dir,
+                self.worker_start if self._first else start,
+                engine_phases,
+                container_phases=self._first,
+            )
+            if self.telemetry_sampler:
+                # the sampler covers the whole worker, the steady state windows are per workload
+                annotate_metrics(log_dir, self.telemetry_sampler)
+        self._first = False
+
+    def close(self, worker_dir):
+        self.gemms.merge(self.hipblaslt_tailer.stop())
+        write_aggregate(self.gemms, worker_dir / "hipblaslt_gemms.json")
+
+
+def run_workload(runner, model, llm, workload, base_env, log_dir):
+    # sampling env vars are per workload, everything else was fixed at engine creation
+    os.environ.update(base_env | workload.get("env", {}))
+    log_dir.mkdir(parents=True, exist_ok=True)
+    os.environ["LOG_DIR"] = str(log_dir)
+
+    from runner_utilities.argparse import parse_and_validate_args
+
+    emit(
+        "run_start", model=model, script=runner.__name__ + ".py", args=workload["args"]
+    )
+
+    args = parse_and_validate_args(
+        description=runner.DESCRIPTION,
+        resources=runner.RESOURCES,
+        argv=["--model", model, *workload["args"]],
+        synthetic=getattr(runner, "SYNTHETIC", False),
+    )
+    runner.run(
+        model=model,
+        duration=args.duration,
+        iterations=args.iterations,
+        prompts=runner.load_inputs(args),
+        llm=llm,
+    )
+
+
+def serve(model, script, queue_dir, poll_interval, artifacts):
+    inbox = queue_dir / "inbox"
+    done = queue_dir / "done"
+    inbox.mkdir(parents=True, exist_ok=True)
+    done.mkdir(parents=True, exist_ok=True)
+
+    # sampling defaults every workload starts from, so overrides don't leak into the next one
+    base_env = {
+        key: value for key, value in os.environ.items() if key.startswith("SP_")
+    }
+    runner = load_runner(script)
+    print(f"Loading {model} with {script}")
+    llm = runner.create_llm(model)
+    print(f"Worker ready, waiting for workloads in {queue_dir}")
+
+    while not (queue_dir / STOP_FILE).exists():
+        workloads = sorted(inbox.glob("*.json"))
+        if not workloads:
+            time.sleep(poll_interval)
+            continue
+
+        workload_path = workloads[0]
+        with workload_path.open("r") as f:
+            workload = json.load(f)
+        workload_path.unlink()
+
+        print(f"\n{'='*60}")
+        print(f"Workload {workload['id']}: {' '.join(workload['args'])}")
+        print(f"{'='*60}\n")
+        start = time.monotonic()
+        workload_start = time.time()
+        log_dir = run_log_dir(model, workload.get("env", {}).get("RUN_ID"))
+        try:
+            run_workload(runner, model, llm, workload, base_env, log_dir)
+            returncode = 0
+        except Exception:
+            traceback.print_exc()
+            returncode = 1
+        artifacts.write(log_dir, workload_start, succeeded=returncode == 0)
+
+        result = {
+            "id": workload["id"],
+            "returncode": returncode,
+            "wall_time": time.monotonic() - start,
+        }
+        # write then rename so the orchestrator never reads a partial file
+        tmp_path = done / f"{workload['id']}.json.tmp"
+        with tmp_path.open("w") as f:
+            json.dump(result, f)
+        tmp_path.rename(done / f"{workload['id']}.json")
+
+    print("Worker stopped.")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Load a model once and serve queued workloads."
+    )
+    parser.add_argument("--model", help="Model name", required=True, type=str)
+    parser.add_argument(
+        "--script", help="Runner script for the model.", required=True, type=str
+    )
+    parser.add_argument(
+        "--queue-dir",
+        help="Directory shared with the orchestrator holding inbox/ and done/.",
+        required=True,
+        type=Path,
+    )
+    parser.add_argument(
+        "--run-id",
+        help="Run ID of the worker itself, its log is written to the model dir under it.",
+        default="worker",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        help="Seconds between checks for new workloads.",
+        type=float,
+        default=0.5,
+    )
+    args = parser.parse_args()
+
+    worker_start = time.time()
+    # the worker log is shared by all workloads, so it gets its own run dir
+    log_file, hipblaslt_log_path, gpu_name = setup_environment(
+        args.model, run_id=args.run_id, tee=False
+    )
+    worker_dir = Path(hipblaslt_log_path).parent
+    output = OutputCapture(log_file, source=f"{gpu_name}/{args.model}")
+    output.start()
+    Path(hipblaslt_log_path).unlink(missing_ok=True)
+    hipblaslt_tailer = LogTailer(
+        hipblaslt_log_path, GemmAggregate(source=output.source)
+    )
+    hipblaslt_tailer.start()
+    telemetry_sampler = start_sampler(worker_dir)
+    artifacts = WorkloadArtifacts(
+        output, hipblaslt_tailer, telemetry_sampler, worker_start
+    )
+
+    try:
+        serve(args.model, args.script, args.queue_dir, args.poll_interval, artifacts)
+    finally:
+        if telemetry_sampler:
+            telemetry_sampler.stop()
+        output.stop()
+        log_file.close()
+        artifacts.close(worker_dir)
+
+
+if __name__ == "__main__":
+    main()
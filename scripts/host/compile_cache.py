@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+
+"""
+
+compile_cache.py - persistent compile caches shared by containers of the same image and GPU arch
+
+Triton kernels, torch.compile/Inductor artifacts, vLLM's compile cache and MIOpen's kernel and
+find databases are kept on the host in .cache/compile/<image_tag>/<gfx_arch>/ and mounted into
+every container, so only the first run of an image on an architecture pays for compilation.
+The tree is kept under a size limit by evicting the least recently used entries. docker_tool.py
+holds a shared lock on its cache (<arch>.lock next to it) while the container runs, eviction
+skips every cache it can't lock exclusively, so caches mounted by running containers survive.
+
+hipBLASLt has no compile cache to persist, its tuned GEMM solutions come from offline tuning
+(HIPBLASLT_TUNING_OVERRIDE_FILE, see gemm_replay.py --export-bench) and aren't managed here.
+
+Usage:
+
+scripts/host/compile_cache.py report            # cache entries and cold vs warm startup times
+scripts/host/compile_cache.py evict --max-gb 20
+scripts/host/compile_cache.py clear
+
+"""
+
+import argparse
+import fcntl
+import os
+import shutil
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from results import DB_PATH, connect, fetch_runs, print_table
+
+ROOT_DIR = Path(__file__).parent.parent.parent
+CACHE_ROOT = ROOT_DIR / ".cache" / "compile"
+CONTAINER_CACHE_DIR = "/root/.cache/compile"
+KFD_TOPOLOGY = Path("/sys/class/kfd/kfd/topology/nodes")
+DEFAULT_MAX_GB = 50
+
+# env vars pointing each compiler's cache into the mounted tree
+CACHE_ENV = {
+    "TRITON_CACHE_DIR": f"{CONTAINER_CACHE_DIR}/triton",
+    "TORCHINDUCTOR_CACHE_DIR": f"{CONTAINER_CACHE_DIR}/inductor",
+    "VLLM_CACHE_ROOT": f"{CONTAINER_CACHE_DIR}/vllm",
+    "MIOPEN_USER_DB_PATH": f"{CONTAINER_CACHE_DIR}/miopen",
+    "MIOPEN_CUSTOM_CACHE_DIR": f"{CONTAINER_CACHE_DIR}/miopen",
+}
+
+
+def _properties(node):
+    properties = {}
+    with (node / "properties").open("r") as f:
+        for line in f:
+            key, _, value = line.strip().partition(" ")
+            properties[key] = value
+    return properties
+
+
+def gpu_arch(device):
+    """
+    Returns the gfx target (e.g. gfx1100) of a /dev/dri/renderD<minor> device from the KFD
+    topology, None if it can't be determined.
+    """
+    try:
+        render_minor = int(Path(device).name.removeprefix("renderD"))
+        nodes = list(KFD_TOPOLOGY.iterdir())
+    except (ValueError, OSError):
+        return None
+
+    for node in nodes:
+        try:
+            properties = _properties(node)
+        except OSError:
+            continue
+        if int(properties.get("drm_render_minor", -1)) != render_minor:
+            continue
+        # major * 10000 + minor * 100 + stepping, minor and stepping are hex digits in the name
+        version = int(properties.get("gfx_target_version", 0))
+        if not version:
+            return None
+        major, minor, stepping = version // 10000, version // 100 % 100, version % 100
+        return f"gfx{major}{minor:x}{stepping:x}"
+    return None
+
+
+def cache_dir(image_tag, arch):
+    return CACHE_ROOT / image_tag.replace("/", "_").replace(":", "_") / arch
+
+
+def _dir_size(path):
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+def entries():
+    """
+    Returns (path, size in bytes, last used) for every image/arch cache, least recently used first.
+    """
+    if not CACHE_ROOT.exists():
+        return []
+    return sorted(
+        (
+            (path, _dir_size(path), path.stat().st_mtime)
+            for path in CACHE_ROOT.glob("*/*")
+            if path.is_dir()
+        ),
+        key=lambda entry: entry[2],
+    )
+
+
+def lock(path, exclusive=False, blocking=True):
+    """
+    Locks the cache at path through its <arch>.lock file, shared while a container uses it and
+    exclusive while it's evicted. Returns the open lock file, which holds the lock until it's
+    closed, or None if blocking is False and the lock is taken.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # the lock file lives next to the cache, so it outlives the cache being removed
+    lock_file = path.with_name(f"{path.name}.lock").open("a")
+    operation = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+    try:
+        fcntl.flock(lock_file, operation | (0 if blocking else fcntl.LOCK_NB))
+    except BlockingIOError:
+        lock_file.close()
+        return None
+    return lock_file
+
+
+def evict(max_bytes, keep=None):
+    total = sum(size for _, size, _ in entries())
+    for path, size, _ in entries():
+        if total <= max_bytes:
+            break
+        if keep is not None and path == keep:
+            continue
+        lock_file = lock(path, exclusive=True, blocking=False)
+        if lock_file is None:
+            print(f"Compile cache {path.relative_to(CACHE_ROOT)} is in use, keeping it")
+            continue
+        with lock_file:
+            print(
+                f"Evicting compile cache {path.relative_to(CACHE_ROOT)} "
+                f"({size / 2**30:.1f} GiB)"
+            )
+            shutil.rmtree(path, ignore_errors=True)
+        total -= size
+
+
+def prepare(image_tag, arch, max_gb=DEFAULT_MAX_GB):
+    """
+    Creates the cache dir for image_tag/arch and marks it as used.
+    Returns (host path, "cold" or "warm", lock file), the cache is protected from eviction
+    until the lock file is closed.
+    """
+    path = cache_dir(image_tag, arch)
+    # waits for an eviction of this cache to finish
+    lock_file = lock(path)
+    state = (
+        "warm"
+        if path.exists() and any(f.is_file() for f in path.rglob("*"))
+        else "cold"
+    )
+    for env_dir in set(CACHE_ENV.values()):
+        (path / Path(env_dir).name).mkdir(parents=True, exist_ok=True)
+    # the dir mtime is the LRU timestamp, it doesn't change when files deep inside are written
+    os.utime(path)
+    evict(max_gb * 2**30, keep=path)
+    return path, state, lock_file
+
+
+def report(db_path):
+    print_table(
+        ["image", "arch", "size_gib", "last_used"],
+        [
+            [
+                path.parent.name,
+                path.name,
+                f"{size / 2**30:.2f}",
+                time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(last_used)),
+            ]
+            for path, size, last_used in entries()
+        ],
+    )
+
+    if not db_path.exists():
+        return
+    connection = connect(db_path)
+    startup = defaultdict(lambda: defaultdict(list))
+    for run in fetch_runs(connection):
+        metrics = run["metrics"]
+        state = metrics.get("compile_cache")
+        if state and metrics.get("startup_s") is not None and not run["returncode"]:
+            startup[(run["gpu"], run["model"])][state].append(metrics["startup_s"])
+    connection.close()
+
+    def mean(values):
+        return sum(values) / len(values) if values else None
+
+    rows = []
+    for (gpu, model), states in sorted(startup.items()):
+        cold, warm = mean(states["cold"]), mean(states["warm"])
+        rows.append(
+            [
+                gpu,
+                model,
+                f"{cold:.1f}" if cold is not None else "",
+                f"{warm:.1f}" if warm is not None else "",
+                f"{cold - warm:.1f}" if cold is not None and warm is not None else "",
+            ]
+        )
+    print()
+    print_table(["gpu", "model", "cold_startup_s", "warm_startup_s", "saved_s"], rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the host compile caches.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    report_parser = subparsers.add_parser(
+        "report", help="List caches and compare cold and warm startup times."
+    )
+    report_parser.add_argument("--db", type=Path, default=DB_PATH)
+
+    evict_parser = subparsers.add_parser(
+        "evict", help="Evict least recently used caches above a size limit."
+    )
+    evict_parser.add_argument("--max-gb", type=float, default=DEFAULT_MAX_GB)
+
+    subparsers.add_parser("clear", help="Remove all compile caches.")
+
+    args = parser.parse_args()
+
+    if args.command == "report":
+        report(args.db)
+    elif args.command == "evict":
+        evict(args.max_gb * 2**30)
+    elif args.command == "clear":
+        # caches of running containers are kept
+        evict(0)
+        print(f"Cleared {CACHE_ROOT}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
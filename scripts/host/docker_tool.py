@@ -2,12 +2,17 @@
 
 """
 
-docker_tool.py is a script used to run provided docker images. In the future it might
-also be used to build custom dockerfiles as well as run them in one command.
+docker_tool.py is a script used to build and run the profiling docker images.
 
 Current usage:
 
-scripts/host/docker_tool.py --device /dev/dri/<folder_of_desired_device_to_mount>
+scripts/host/docker_tool.py build --image-name <base_vllm_image>
+scripts/host/docker_tool.py run --device /dev/dri/<folder_of_desired_device_to_mount>
+scripts/host/docker_tool.py run --mock --device cpu0 --device-name CPU --script run_model.py -- ...
+
+The build command derives an image from the base vLLM image with the container requirements
+preinstalled. Its tag is a content hash of the base image and requirements.txt, so it is only
+rebuilt when either changes. run builds (or reuses) the derived image automatically.
 
 While it can be used standalone, it's mostly used by orchestrator.py to run the entire config on all
 available GPUs.
@@ -17,13 +22,27 @@ available GPUs.
 # TODO: add logging to files of the docker run command
 
 import argparse
+import hashlib
 import subprocess
 import sys
+import time
 from pathlib import Path
 import os
 import yaml
 
+import compile_cache
+
 ROOT_DIR = Path(__file__).parent.parent.parent
+REQUIREMENTS_PATH = ROOT_DIR / "scripts" / "container" / "requirements.txt"
+DERIVED_IMAGE_REPO = "vllm-profiling"
+DEFAULT_IMAGE = "hyoon11/vllm-dev:20260121_43_py3.12_torch2.9_triton3.5_navi_upstream_6a09612_ubuntu24.04"
+
+DOCKERFILE_TEMPLATE = """
+FROM {base_image}
+LABEL vllm_profiling.base_image="{base_image}"
+COPY requirements.txt /tmp/requirements.txt
+RUN pip install --no-cache-dir -r /tmp/requirements.txt && rm /tmp/requirements.txt
+"""
 
 
 def prepare_env():
@@ -38,6 +57,61 @@ def prepare_env():
     return docker_env
 
 
+def base_image_id(image_name):
+    def inspect():
+        return subprocess.run(
+            ["docker", "image", "inspect", "--format", "{{.Id}}", image_name],
+            capture_output=True,
+            text=True,
+        )
+
+    result = inspect()
+    if result.returncode != 0:
+        subprocess.run(["docker", "pull", image_name], check=True)
+        result = inspect()
+        result.check_returncode()
+    return result.stdout.strip()
+
+
+def derived_image_tag(image_name):
+    # hash of the exact base image contents plus the requirements baked on top of it
+    digest = hashlib.sha256()
+    digest.update(base_image_id(image_name).encode())
+    digest.update(REQUIREMENTS_PATH.read_bytes())
+    return f"{DERIVED_IMAGE_REPO}:{digest.hexdigest()[:16]}"
+
+
+def image_exists(image_name):
+    return (
+        subprocess.run(
+            ["docker", "image", "inspect", image_name],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        ).returncode
+        == 0
+    )
+
+
+def ensure_image(image_name, force=False):
+    """
+    Returns the tag of the derived image for image_name, building it only if the
+    base image or requirements.txt changed since the last build.
+    """
+    tag = derived_image_tag(image_name)
+    if image_exists(tag) and not force:
+        print(f"Using cached image {tag}")
+        return tag
+
+    print(f"Building {tag} from {image_name}")
+    subprocess.run(
+        ["docker", "build", "-t", tag, "-f", "-", str(REQUIREMENTS_PATH.parent)],
+        input=DOCKERFILE_TEMPLATE.format(base_image=image_name),
+        text=True,
+        check=True,
+    )
+    return tag
+
+
 def run_container(args, script_args):
     env = prepare_env()
     cmd = [
@@ -50,13 +124,9 @@ def run_container(args, script_args):
         "--pull=missing",
         "--ipc=host",
         "--network=host",
-        "--group-add",
-        "video",
         "--cap-add=SYS_PTRACE",
         "--security-opt",
         "seccomp=unconfined",
-        "--device",
-        "/dev/kfd",
         "-w",
         "/workspace",
     ]
@@ -70,12 +140,27 @@ def run_container(args, script_args):
         cmd.append("-d")
     """
 
-    # mount appropriate gpu
-    cmd.extend(["--device", args.device])
+    # name the container so it can be stopped from the outside (orchestrator shutdown)
+    if args.container_name:
+        cmd.extend(["--name", args.container_name])
+
+    if args.mock:
+        # the mock engine needs no GPU, --device only names the device for the logs
+        cmd.extend(["-e", "LLM_BACKEND=mock"])
+    else:
+        # mount appropriate gpus, multi-GPU (tensor/data parallel) runs get their whole device group
+        cmd.extend(["--group-add", "video", "--device", "/dev/kfd"])
+        for device in args.device:
+            cmd.extend(["--device", device])
+        # render nodes of the devices, used to find their sysfs telemetry
+        cmd.extend(["-e", f"GPU_DEVICE={','.join(args.device)}"])
 
     # set env var to remember device name
     cmd.extend(["-e", f"DEVICE_NAME={args.device_name}"])
 
+    # host launch time, start of the run's phase timeline (container and host share the clock)
+    cmd.extend(["-e", f"CONTAINER_LAUNCH_TS={time.time()}"])
+
     # mount dirs from host to container
     container_workspace = Path("/workspace")
 
@@ -85,6 +170,28 @@ def run_container(args, script_args):
     cmd.extend(["-v", f"{args.hf_cache_dir}:{hf_cache_container}"])
     print(f"Mounting HuggingFace cache: {args.hf_cache_dir} -> {hf_cache_container}")
 
+    # compile caches (Triton, Inductor, vLLM, MIOpen) shared by runs of this image on this arch
+    if not (args.no_compile_cache or args.mock):
+        arch = args.gpu_arch or compile_cache.gpu_arch(args.device[0])
+        if arch:
+            # the lock keeps other runs from evicting the cache until this function returns
+            cache_dir, cache_state, cache_lock = compile_cache.prepare(
+                args.image_name, arch, max_gb=args.compile_cache_max_gb
+            )
+            cmd.extend(["-v", f"{cache_dir}:{compile_cache.CONTAINER_CACHE_DIR}"])
+            for key, value in compile_cache.CACHE_ENV.items():
+                cmd.extend(["-e", f"{key}={value}"])
+            cmd.extend(["-e", f"COMPILE_CACHE_STATE={cache_state}"])
+            print(
+                f"Mounting compile cache ({cache_state}): {cache_dir} -> "
+                f"{compile_cache.CONTAINER_CACHE_DIR}"
+            )
+        else:
+            print(
+                f"Unknown GPU arch of {args.device[0]}, set arch in gpus.yaml "
+                "to enable the compile cache."
+            )
+
     # local container scripts dir
     scripts_container = str(container_workspace / "scripts")
     cmd.extend(["-v", f"./scripts/container:{scripts_container}"])
@@ -110,11 +217,23 @@ def run_container(args, script_args):
     cmd.extend(["-v", f"./yaml:{yaml_container}"])
     print(f"Mounting ./yaml -> {yaml_container}")
 
+    # container-side caches (decoded images, ...)
+    cache_container = str(container_workspace / ".cache")
+    Path("./.cache/container").mkdir(parents=True, exist_ok=True)
+    cmd.extend(["-v", f"./.cache/container:{cache_container}"])
+    print(f"Mounting ./.cache/container -> {cache_container}")
+
     shell_cmd = []
 
-    shell_cmd.append(
-        f"pip install --no-cache-dir -r {scripts_container}/requirements.txt"
-    )
+    # derived images already have the requirements baked in
+    if args.no_build:
+        shell_cmd.extend(
+            [
+                "export PIP_INSTALL_START_TS=$(date +%s.%N)",
+                f"pip install --no-cache-dir -r {scripts_container}/requirements.txt",
+                "export PIP_INSTALL_END_TS=$(date +%s.%N)",
+            ]
+        )
 
     if args.script:
         # removing prefix -- from remainder args
@@ -148,11 +267,34 @@ def parse_args():
 
     subparsers = parser.add_subparsers(dest="command", required=True)
 
-    run_parser = subparsers.add_parser("run", help="Run an existing Docker image.")
+    build_parser = subparsers.add_parser(
+        "build", help="Build a derived image with the requirements preinstalled."
+    )
+    build_parser.add_argument(
+        "--image-name", help="Base vLLM docker image", default=DEFAULT_IMAGE
+    )
+    build_parser.add_argument(
+        "--force",
+        help="Rebuild even if an image with the same hash exists.",
+        action="store_true",
+    )
+
+    run_parser = subparsers.add_parser("run", help="Run a Docker image.")
     run_parser.add_argument(
         "--image-name",
-        help="Docker image to run",
-        default="hyoon11/vllm-dev:20260121_43_py3.12_torch2.9_triton3.5_navi_upstream_6a09612_ubuntu24.04",
+        help="Base vLLM docker image, the derived image is built from it if needed",
+        default=DEFAULT_IMAGE,
+    )
+    build_mode = run_parser.add_mutually_exclusive_group()
+    build_mode.add_argument(
+        "--prebuilt",
+        help="--image-name is already a derived image (e.g. resolved by the orchestrator).",
+        action="store_true",
+    )
+    build_mode.add_argument(
+        "--no-build",
+        help="Run --image-name as is and install the requirements on container start.",
+        action="store_true",
     )
     run_parser.add_argument("--script", help="Script to run inside container.")
     run_parser.add_argument(
@@ -161,9 +303,36 @@ def parse_args():
         default="./.cache/huggingface",
     )
     run_parser.add_argument(
-        "--device", help="/dev/dri/<dir> location of the device", required=True
+        "--device",
+        help="/dev/dri/<dir> location of the device, repeat to mount a group of devices.",
+        action="append",
+        required=True,
     )
     run_parser.add_argument("--device-name", help="Actual name of the device.")
+    run_parser.add_argument(
+        "--gpu-arch",
+        help="gfx target of the device (e.g. gfx1100), detected from the KFD topology if not set.",
+    )
+    run_parser.add_argument(
+        "--no-compile-cache",
+        help="Don't mount the persistent compile cache, every run compiles from scratch.",
+        action="store_true",
+    )
+    run_parser.add_argument(
+        "--compile-cache-max-gb",
+        help="Size limit of all compile caches, least recently used ones are evicted.",
+        type=float,
+        default=compile_cache.DEFAULT_MAX_GB,
+    )
+    run_parser.add_argument(
+        "--mock",
+        help="Run on the mock engine (LLM_BACKEND=mock) without mounting any GPU.",
+        action="store_true",
+    )
+    run_parser.add_argument(
+        "--container-name",
+        help="Name given to the container, used to stop it when the orchestrator shuts down.",
+    )
 
     return parser.parse_known_args()
 
@@ -175,11 +344,11 @@ def main():
         if not args.hf_cache_dir.endswith(".cache/huggingface"):
             print("Huggingface cache dir invalid: must end with .cache/huggingface")
             sys.exit(1)
+        if not (args.prebuilt or args.no_build):
+            args.image_name = ensure_image(args.image_name)
         run_container(args, extra_args)
-    else:
-        # TODO: implement build functionality?
-        print("Currently only running existing docker images is supported.")
-        exit(1)
+    elif args.command == "build":
+        print(ensure_image(args.image_name, force=args.force))
 
 
 if __name__ == "__main__":
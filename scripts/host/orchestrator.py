@@ -10,12 +10,34 @@ This script orchestrates and executes the configured models on the configured GP
 
 import argparse
 from collections import defaultdict, deque
+import csv
+import hashlib
+import itertools
+import json
+import shutil
+import signal
 import subprocess
+import sys
+import threading
+import time
+import uuid
 from pathlib import Path
 import yaml
 import os
 
+from docker_tool import DEFAULT_IMAGE, ensure_image
+from results import git_commit, metrics_points, register_run
+
 PROJECT_ROOT = Path(__file__).parent.parent.parent
+# work queues shared with warm worker containers, lives under the mounted logs dir
+QUEUE_DIR = PROJECT_ROOT / ".logs" / ".queue"
+LOGS_DIR = PROJECT_ROOT / ".logs"
+# content hashes of completed tasks, reruns skip them unless --force is given
+MANIFEST_PATH = LOGS_DIR / "manifest.json"
+# env vars applied per workload by warm workers, any other env var requires a new engine
+WORKLOAD_ENV_PREFIX = "SP_"
+WORKLOAD_ENV_VARS = {"RUN_ID"}
+STOP_TIMEOUT = 30
 
 
 def prepare_tokens():
@@ -29,14 +51,52 @@ def prepare_tokens():
         os.environ[key] = value
 
 
-def parse_gpus():
+def load_gpu_config():
     file_path = PROJECT_ROOT / ".config" / "gpus.yaml"
     if not file_path.exists():
         subprocess.run(["generate_gpu_yaml.sh"], check=True)
     with file_path.open("r") as f:
-        return [
-            gpu for gpu in yaml.safe_load(f)["gpus"] if not gpu.get("disabled", False)
+        return yaml.safe_load(f)
+
+
+def parse_gpus(config):
+    return [gpu for gpu in config["gpus"] if not gpu.get("disabled", False)]
+
+
+def parse_gpu_groups(config, gpus):
+    """
+    Device groups multi-GPU models run on, every device of a group is mounted into one container:
+
+    groups:
+      - name: 2x Radeon RX 7900 XTX
+        devices: [/dev/dri/renderD128, /dev/dri/renderD129]
+    """
+    gpus_by_device = {gpu["device"]: gpu for gpu in gpus}
+    groups = []
+    for group in config.get("groups") or []:
+        if group.get("disabled", False):
+            continue
+        missing = [
+            device for device in group["devices"] if device not in gpus_by_device
         ]
+        if missing:
+            print(
+                f"Skipping group {group['name']}, {', '.join(missing)} "
+                "not among the enabled gpus."
+            )
+            continue
+        members = [gpus_by_device[device] for device in group["devices"]]
+        if len({member.get("mock", False) for member in members}) > 1:
+            print(f"Skipping group {group['name']}, it mixes mock and real GPUs.")
+            continue
+        names = sorted({member["name"] for member in members})
+        if len(names) > 1:
+            print(
+                f"Group {group['name']} mixes {', '.join(names)}, "
+                "parallel runs are paced by the slowest GPU."
+            )
+        groups.append(group | {"members": members})
+    return groups
 
 
 def parse_models(models_filter=None):
@@ -52,71 +112,897 @@ def parse_models(models_filter=None):
         ]
 
 
-def run(docker_image, num_procs, script, duration, iterations, models_filter):
-    gpus = parse_gpus()
-    models = parse_models(models_filter)
+def expand_sweep(model):
+    """
+    Expands the optional sweep block of a model entry into a list of env overrides:
+
+    sweep:
+      mode: grid  # every combination of the axes, or zip to pair equal-length lists
+      env:
+        GPU_MEM_UTIL: ['0.8', '0.9']
+        MAX_MODEL_LEN: ['8192', '30000']
+    """
+    sweep = model.get("sweep")
+    if not sweep:
+        return [{}]
 
-    # create a map {device_name -> queue({model_to_run, environment})}
+    names = list(sweep["env"])
+    values = [[str(value) for value in sweep["env"][name]] for name in names]
+    mode = sweep.get("mode", "grid")
+    if mode == "grid":
+        points = itertools.product(*values)
+    elif mode == "zip":
+        if len({len(axis) for axis in values}) > 1:
+            raise ValueError(f"Sweep axes of {model['name']} differ in length.")
+        points = zip(*values)
+    else:
+        raise ValueError(f"Unknown sweep mode {mode} for {model['name']}.")
+    return [dict(zip(names, point)) for point in points]
+
+
+def task_run_id(invocation_id, index=None, point=None):
+    # unique across invocations, GPUs and models, so every run gets its own log directory
+    run_id = f"{invocation_id}-{uuid.uuid4().hex[:6]}"
+    if point:
+        label = "-".join(f"{name}={value}" for name, value in point.items())
+        run_id += f"-sweep{index:03d}-{label}"
+    return run_id.replace("/", "_").replace(" ", "_")
+
+
+def parallel_sizes(model):
+    return (
+        int(model.get("tensor_parallel_size", 1)),
+        int(model.get("data_parallel_size", 1)),
+    )
+
+
+def build_task_queues(gpus, models, invocation_id, groups=()):
+    # create a map {device, or comma separated device group -> queue({model_to_run, environment})}
     device_task_queue_map = defaultdict(deque)
+
+    def add_tasks(device, gpu_name, model, env):
+        # sweep values are applied last, they are what is being measured
+        for index, point in enumerate(expand_sweep(model)):
+            run_id = task_run_id(invocation_id, index, point)
+            device_task_queue_map[device].append(
+                {
+                    "model": model,
+                    "gpu": gpu_name,
+                    "run_id": run_id,
+                    "sweep_point": point,
+                    "env": env | point | {"RUN_ID": run_id},
+                }
+            )
+
     for gpu in gpus:
         for model in models:
+            tensor_parallel, data_parallel = parallel_sizes(model)
+            if tensor_parallel * data_parallel > 1:
+                continue
             if gpu["name"] not in model.get("disabled_on", []):
                 # environment is generated by taking the env dictionary from the model and superimposing the env dictionary of the gpu
-                device_task_queue_map[gpu["device"]].append(
-                    {
-                        "model": model,
-                        "env": model.get("env", {})
-                        | gpu.get("env", {})
-                        | gpu.get(model["name"], {}),
-                    }
+                env = (
+                    model.get("env", {})
+                    | gpu.get("env", {})
+                    | gpu.get(model["name"], {})
                 )
+                add_tasks(gpu["device"], gpu["name"], model, env)
 
-    device_to_name_map = {gpu["device"]: gpu["name"] for gpu in gpus}
-    prepare_tokens()
+    # multi-GPU models run on every group with exactly tensor_parallel * data_parallel devices
+    for model in models:
+        tensor_parallel, data_parallel = parallel_sizes(model)
+        num_devices = tensor_parallel * data_parallel
+        if num_devices == 1:
+            continue
+        matching = [
+            group
+            for group in groups
+            if len(group["devices"]) == num_devices
+            and group["name"] not in model.get("disabled_on", [])
+        ]
+        if not matching:
+            print(f"No group of {num_devices} GPUs for {model['name']}, skipping it.")
+        for group in matching:
+            # the first member's env applies to the group, the group's own env on top of it
+            first = group["members"][0]
+            env = (
+                model.get("env", {})
+                | first.get("env", {})
+                | first.get(model["name"], {})
+                | group.get("env", {})
+                | group.get(model["name"], {})
+                | {
+                    "TENSOR_PARALLEL_SIZE": str(tensor_parallel),
+                    "DATA_PARALLEL_SIZE": str(data_parallel),
+                    "GPU_NAMES": ",".join(
+                        member["name"] for member in group["members"]
+                    ),
+                }
+            )
+            add_tasks(",".join(group["devices"]), group["name"], model, env)
+    return device_task_queue_map
 
-    # TODO: implement parallelism, currently writing single threaded but will be expanded later
-    # to include the possibility of starting multiple profiling tasks on different GPUs
-    devices = list(device_task_queue_map.keys())
-    while any(device_task_queue_map.values()):
-        for device in devices:
-            task_queue = device_task_queue_map[device]
-            if task_queue:
-                task = task_queue.popleft()
-                model = task["model"]
-                env = task["env"]
-                iter_dur_arg = (
-                    ["--duration", str(duration)]
-                    if duration
-                    else ["--iterations", str(iterations)]
-                )
-                script_args = [
-                    "--script",
-                    model["script"],
-                    "--model",
-                    model["name"],
-                    "--prompts-path",
-                    f"/workspace/yaml/prompts/{model['type']}.yaml",
-                    "--resources-path",
-                    f"/workspace/images/{model['type']}",
-                    *iter_dur_arg,
+
+def task_log_dir(task):
+    # mirrors run_log_dir in scripts/container/run_model.py
+    return (
+        LOGS_DIR
+        / task["gpu"].replace(" ", "_")
+        / task["model"]["name"].replace("/", "_")
+        / task["run_id"]
+    )
+
+
+def task_inputs_path(model):
+    # host side of the prompts/workload file runner_args points the runner to
+    if model.get("workload"):
+        return PROJECT_ROOT / "yaml" / "workloads" / f"{model['workload']}.yaml"
+    return PROJECT_ROOT / "yaml" / "prompts" / f"{model['type']}.yaml"
+
+
+def task_hash(task, docker_image, script, args):
+    """
+    Content hash identifying what a task measures: model, resolved env (without the run ID),
+    GPU, image, scripts, runner arguments and the prompts/workload it runs.
+    """
+    inputs_path = task_inputs_path(task["model"])
+    content = {
+        "model": task["model"]["name"],
+        "runner": task["model"]["script"],
+        "gpu": task["gpu"],
+        "env": {key: value for key, value in task["env"].items() if key != "RUN_ID"},
+        "image": docker_image,
+        "script": script,
+        "args": args,
+        "inputs": (
+            hashlib.sha256(inputs_path.read_bytes()).hexdigest()
+            if inputs_path.exists()
+            else None
+        ),
+    }
+    return hashlib.sha256(
+        json.dumps(content, sort_keys=True, default=str).encode()
+    ).hexdigest()[:16]
+
+
+class Manifest:
+    """
+    Completed tasks by content hash, rewritten (write then rename) after every completed task,
+    so an interrupted orchestrator can resume where it stopped.
+    """
+
+    def __init__(self, path=MANIFEST_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.tasks = {}
+        if path.exists():
+            with path.open("r") as f:
+                self.tasks = json.load(f)["tasks"]
+
+    def completed(self, task):
+        return task["hash"] in self.tasks
+
+    def record(self, task, result):
+        with self.lock:
+            self.tasks[task["hash"]] = {
+                "run_id": task["run_id"],
+                "gpu": task["gpu"],
+                "model": task["model"]["name"],
+                "completed_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "wall_time": result["wall_time"],
+            }
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".json.tmp")
+            with tmp_path.open("w") as f:
+                json.dump({"tasks": self.tasks}, f, indent=2)
+            tmp_path.rename(self.path)
+
+
+def retry_task(task):
+    # every attempt keeps its own log directory
+    attempt = task.get("attempt", 0) + 1
+    run_id = f"{task.get('base_run_id', task['run_id'])}-retry{attempt}"
+    return task | {
+        "attempt": attempt,
+        "base_run_id": task.get("base_run_id", task["run_id"]),
+        "run_id": run_id,
+        "env": task["env"] | {"RUN_ID": run_id},
+    }
+
+
+def write_sweep_results(results):
+    """
+    Collects metrics.json of every sweep task into a single table across the sweep.
+    """
+    swept = [result for result in results if result["task"]["sweep_point"]]
+    if not swept:
+        return None
+
+    axes = list(dict.fromkeys(name for r in swept for name in r["task"]["sweep_point"]))
+    columns = [
+        "gpu",
+        "model",
+        "run_id",
+        "point",
+        *axes,
+        "returncode",
+        "requests_per_s",
+        "generation_tokens_per_s",
+        "ttft_p50_ms",
+        "tpot_p50_ms",
+        "e2e_p99_ms",
+    ]
+    rows = []
+    for result in swept:
+        task = result["task"]
+        # runner sweeps (batch sizes, QPS, prefix cache arms) get a row per subdir
+        points = metrics_points(task_log_dir(task)) or {"": {}}
+        for point, metrics in points.items():
+
+            def latency_ms(name, percentile):
+                value = (metrics.get(name) or {}).get(percentile)
+                return f"{value * 1000:.2f}" if value is not None else ""
+
+            def rate(name):
+                value = metrics.get(name)
+                return f"{value:.2f}" if value is not None else ""
+
+            rows.append(
+                [
+                    task["gpu"],
+                    task["model"]["name"],
+                    task["run_id"],
+                    point,
+                    *(task["sweep_point"].get(axis, "") for axis in axes),
+                    result["returncode"],
+                    rate("requests_per_s"),
+                    rate("generation_tokens_per_s"),
+                    latency_ms("ttft_s", "p50"),
+                    latency_ms("tpot_s", "p50"),
+                    latency_ms("e2e_s", "p99"),
                 ]
-                result = subprocess.run(
-                    [
-                        "scripts/host/docker_tool.py",
-                        "run",
-                        "--image-name",
-                        docker_image,
-                        "--device-name",
-                        device_to_name_map[device],
-                        "--device",
-                        device,
-                        "--script",
-                        script,
-                        "--",
-                    ]
-                    + script_args,
-                    env=os.environ.copy() | env,
+            )
+
+    results_path = LOGS_DIR / f"sweep_{time.strftime('%Y%m%d_%H%M%S')}.csv"
+    results_path.parent.mkdir(parents=True, exist_ok=True)
+    with results_path.open("w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        writer.writerows(rows)
+
+    widths = [
+        max(len(str(column)), *(len(str(row[i])) for row in rows))
+        for i, column in enumerate(columns)
+    ]
+    for row in [columns, *rows]:
+        print(
+            "  ".join(
+                f"{str(value):<{width}}" for value, width in zip(row, widths)
+            ).rstrip()
+        )
+    print(f"Sweep results written to {results_path}")
+    return results_path
+
+
+def device_slug(device):
+    # renderD128, or renderD128-renderD129 for a device group
+    return "-".join(Path(member).name for member in device.split(","))
+
+
+def container_name(device, model, index):
+    # unique per orchestrator invocation so concurrent sweeps on one host don't collide
+    model_slug = model["name"].replace("/", "_").lower()
+    return f"vllm-profiling-{os.getpid()}-{device_slug(device)}-{model_slug}-{index}"
+
+
+def runner_args(model, duration, iterations):
+    iter_dur_arg = (
+        ["--duration", str(duration)] if duration else ["--iterations", str(iterations)]
+    )
+    # synthetic workloads (yaml/workloads) replace the hand-written prompts of the model type
+    inputs_arg = (
+        ["--workload", f"/workspace/yaml/workloads/{model['workload']}.yaml"]
+        if model.get("workload")
+        else ["--prompts-path", f"/workspace/yaml/prompts/{model['type']}.yaml"]
+    )
+    return [
+        *inputs_arg,
+        "--resources-path",
+        f"/workspace/images/{model['type']}",
+        *iter_dur_arg,
+    ]
+
+
+def docker_tool_cmd(
+    docker_image,
+    build_args,
+    device,
+    device_name,
+    container_name,
+    script,
+    script_args,
+    gpu_arch=None,
+    mock=False,
+):
+    return [
+        "scripts/host/docker_tool.py",
+        "run",
+        "--image-name",
+        docker_image,
+        *build_args,
+        *(["--gpu-arch", gpu_arch] if gpu_arch else []),
+        *(["--mock"] if mock else []),
+        "--device-name",
+        device_name,
+        # one --device per member of a device group
+        *[item for member in device.split(",") for item in ("--device", member)],
+        "--container-name",
+        container_name,
+        "--script",
+        script,
+        "--",
+    ] + script_args
+
+
+def is_workload_env(key):
+    return key.startswith(WORKLOAD_ENV_PREFIX) or key in WORKLOAD_ENV_VARS
+
+
+def engine_key(task):
+    # sampling params (SP_*) are applied per workload, any other env var may change the engine
+    engine_env = {
+        key: value for key, value in task["env"].items() if not is_workload_env(key)
+    }
+    return (
+        task["model"]["name"],
+        task["model"]["script"],
+        tuple(sorted(engine_env.items())),
+    )
+
+
+def group_by_engine(task_queue):
+    # stable grouping so tasks sharing an engine run back to back on a warm container
+    order = {}
+    for task in task_queue:
+        order.setdefault(engine_key(task), len(order))
+    return deque(sorted(task_queue, key=lambda task: order[engine_key(task)]))
+
+
+def stop_container(name, timeout):
+    subprocess.run(
+        ["docker", "stop", "--time", str(timeout), name],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+class ColdExecutor:
+    """
+    Starts a fresh container for every task.
+    """
+
+    persistent = False
+
+    def __init__(self, task_cmd):
+        self.task_cmd = task_cmd
+        self.lock = threading.Lock()
+        self.running = {}
+        self.closed = False
+
+    def execute(self, device, task):
+        # started and registered under the lock, so shutdown either stops the container or
+        # keeps it from being started
+        with self.lock:
+            if self.closed:
+                print(
+                    f"[{device}] shutting down, not starting {task['container_name']}"
                 )
+                return -signal.SIGINT
+            # own session so a terminal Ctrl-C reaches the orchestrator first and
+            # shutdown ordering stays under our control
+            proc = subprocess.Popen(
+                self.task_cmd(device, task),
+                env=os.environ.copy() | task["env"],
+                start_new_session=True,
+            )
+            self.running[device] = (proc, task["container_name"])
+        returncode = proc.wait()
+        with self.lock:
+            self.running.pop(device, None)
+        return returncode
+
+    def close(self, device):
+        pass
+
+    def shutdown(self, timeout):
+        with self.lock:
+            self.closed = True
+            running = list(self.running.values())
+        for proc, name in running:
+            print(f"Stopping container {name}")
+            stop_container(name, timeout)
+        for proc, _ in running:
+            try:
+                proc.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                os.killpg(proc.pid, signal.SIGKILL)
+
+
+class WarmContainer:
+    """
+    Long-lived container running worker.py, which loads the model once and serves
+    workloads dropped into its queue directory.
+    """
+
+    def __init__(self, key, name, cmd, env):
+        self.key = key
+        self.name = name
+        self.cmd = cmd
+        self.env = env
+        self.queue_dir = QUEUE_DIR / name
+        self.proc = None
+        self.workload_count = 0
+
+    def start(self):
+        shutil.rmtree(self.queue_dir, ignore_errors=True)
+        (self.queue_dir / "inbox").mkdir(parents=True)
+        (self.queue_dir / "done").mkdir(parents=True)
+        self.proc = subprocess.Popen(
+            self.cmd, env=os.environ.copy() | self.env, start_new_session=True
+        )
+        return self
+
+    def alive(self):
+        return self.proc is not None and self.proc.poll() is None
+
+    def submit(self, workload_args, workload_env, poll_interval=0.5):
+        workload_id = f"{self.workload_count:05d}"
+        self.workload_count += 1
+        # write then rename so the worker never reads a partial file
+        tmp_path = self.queue_dir / "inbox" / f"{workload_id}.json.tmp"
+        with tmp_path.open("w") as f:
+            json.dump(
+                {"id": workload_id, "args": workload_args, "env": workload_env}, f
+            )
+        tmp_path.rename(self.queue_dir / "inbox" / f"{workload_id}.json")
+
+        done_path = self.queue_dir / "done" / f"{workload_id}.json"
+        while not done_path.exists():
+            if not self.alive():
+                # container died (e.g. engine init failure or OOM)
+                return self.proc.returncode or 1
+            time.sleep(poll_interval)
+        with done_path.open("r") as f:
+            return json.load(f)["returncode"]
+
+    def stop(self, timeout):
+        if self.alive():
+            (self.queue_dir / "STOP").touch()
+            try:
+                self.proc.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                stop_container(self.name, timeout)
+                try:
+                    self.proc.wait(timeout=timeout)
+                except subprocess.TimeoutExpired:
+                    os.killpg(self.proc.pid, signal.SIGKILL)
+        shutil.rmtree(self.queue_dir, ignore_errors=True)
+
+
+class WarmExecutor:
+    """
+    Keeps one warm worker container per device and only restarts it when the engine
+    arguments (model, script or non-sampling env vars) of the next task differ.
+    """
+
+    persistent = True
+
+    def __init__(self, container_cmd, workload_args):
+        self.container_cmd = container_cmd
+        self.workload_args = workload_args
+        self.lock = threading.Lock()
+        self.containers = {}
+
+    def execute(self, device, task):
+        key = engine_key(task)
+        with self.lock:
+            container = self.containers.get(device)
+        if container and not container.alive():
+            # crashed between tasks (e.g. OOM or engine death), not a config change
+            print(
+                f"[{device}] worker died (exit status {container.proc.returncode}), "
+                "restarting"
+            )
+            container.stop(timeout=STOP_TIMEOUT)
+            container = None
+        elif container and container.key != key:
+            print(f"[{device}] engine arguments changed, restarting worker")
+            container.stop(timeout=STOP_TIMEOUT)
+            container = None
+        if container is None:
+            container = WarmContainer(
+                key,
+                task["container_name"],
+                self.container_cmd(device, task),
+                task["env"],
+            ).start()
+            with self.lock:
+                self.containers[device] = container
+
+        workload_env = {
+            key: value for key, value in task["env"].items() if is_workload_env(key)
+        }
+        return container.submit(self.workload_args(task), workload_env)
+
+    def close(self, device):
+        with self.lock:
+            container = self.containers.pop(device, None)
+        if container:
+            container.stop(timeout=STOP_TIMEOUT)
+
+    def shutdown(self, timeout):
+        with self.lock:
+            containers = list(self.containers.values())
+            self.containers.clear()
+        for container in containers:
+            print(f"Stopping container {container.name}")
+            stop_container(container.name, timeout)
+            container.stop(timeout)
+
+
+class DeviceReservations:
+    """
+    All-or-nothing reservations of device sets. A request is granted once none of its devices
+    is busy and no earlier request for any of them is still waiting, so a device group is never
+    held partially (no deadlock) and single-GPU tasks can't keep a group waiting forever.
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.busy = set()
+        self.waiting = []
+        self.tickets = itertools.count()
+
+    def _grantable(self, ticket, devices):
+        return not self.busy & devices and not any(
+            other_ticket < ticket and other_devices & devices
+            for other_ticket, other_devices in self.waiting
+        )
+
+    def acquire(self, devices, stop_event):
+        # returns False without reserving anything once stop_event is set
+        request = (next(self.tickets), frozenset(devices))
+        with self.condition:
+            self.waiting.append(request)
+            try:
+                while not self._grantable(*request):
+                    if stop_event.is_set():
+                        return False
+                    self.condition.wait(timeout=0.5)
+                self.busy |= request[1]
+                return True
+            finally:
+                self.waiting.remove(request)
+                self.condition.notify_all()
+
+    def release(self, devices):
+        with self.condition:
+            self.busy -= set(devices)
+            self.condition.notify_all()
+
+
+class Scheduler:
+    """
+    Runs one worker thread per device or device group, each draining its own task queue.
+    Devices are reserved before a slot is taken, so a group only runs once all of its devices
+    are idle, while the slots semaphore caps the number of containers running at once.
+    """
+
+    def __init__(
+        self,
+        device_task_queue_map,
+        num_procs,
+        executor,
+        on_result=None,
+        retries=0,
+        retry_backoff=30,
+    ):
+        self.device_task_queue_map = device_task_queue_map
+        self.on_result = on_result
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.slots = threading.BoundedSemaphore(max(1, num_procs))
+        self.reservations = DeviceReservations()
+        self.executor = executor
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+        self.results = []
+
+    def _run_task(self, device, task):
+        label = f"{task['model']['name']} [{task['run_id']}]"
+        print(f"[{device}] starting {label}")
+        start = time.monotonic()
+        returncode = self.executor.execute(device, task)
+        wall_time = time.monotonic() - start
+        print(f"[{device}] finished {label} (exit code {returncode}, {wall_time:.1f}s)")
+        return {
+            "device": device,
+            "model": task["model"]["name"],
+            "run_id": task["run_id"],
+            "returncode": returncode,
+            "wall_time": wall_time,
+            "attempts": task.get("attempt", 0) + 1,
+            "task": task,
+        }
+
+    def _drain(self, device, task_queue, hold_slot):
+        devices = device.split(",")
+        while task_queue and not self.stop_event.is_set():
+            if hold_slot:
+                result = self._run_task(device, task_queue.popleft())
+            else:
+                # devices before the slot, so slot holders never wait for a device
+                if not self.reservations.acquire(devices, self.stop_event):
+                    break
+                try:
+                    with self.slots:
+                        if self.stop_event.is_set():
+                            break
+                        result = self._run_task(device, task_queue.popleft())
+                finally:
+                    self.reservations.release(devices)
+            # every attempt is reported, only the last one counts towards the results
+            if self.on_result:
+                self.on_result(result)
+
+            task = result["task"]
+            if result["returncode"] != 0 and task.get("attempt", 0) < self.retries:
+                delay = self.retry_backoff * 2 ** task.get("attempt", 0)
+                print(
+                    f"[{device}] retrying {task['model']['name']} in {delay:.0f}s "
+                    f"(attempt {task.get('attempt', 0) + 2}/{self.retries + 1})"
+                )
+                # backoff outside of the slot and reservation, other tasks can use them meanwhile
+                if self.stop_event.wait(delay):
+                    break
+                task_queue.appendleft(retry_task(task))
+                continue
+            with self.lock:
+                self.results.append(result)
+
+    def _worker(self, device):
+        task_queue = self.device_task_queue_map[device]
+        if self.executor.persistent:
+            # a warm container stays up between tasks, so it keeps its devices and slot
+            # until the queue is done
+            devices = device.split(",")
+            if not self.reservations.acquire(devices, self.stop_event):
+                return
+            try:
+                with self.slots:
+                    self._drain(device, task_queue, hold_slot=True)
+                    if not self.stop_event.is_set():
+                        self.executor.close(device)
+            finally:
+                self.reservations.release(devices)
+        else:
+            self._drain(device, task_queue, hold_slot=False)
+
+    def shutdown(self, timeout=STOP_TIMEOUT):
+        self.stop_event.set()
+        self.executor.shutdown(timeout)
+
+    def run(self):
+        workers = [
+            threading.Thread(target=self._worker, args=(device,), daemon=True)
+            for device in self.device_task_queue_map
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            # join with a timeout so KeyboardInterrupt is delivered to the main thread
+            while any(worker.is_alive() for worker in workers):
+                for worker in workers:
+                    worker.join(timeout=0.5)
+        except KeyboardInterrupt:
+            print("Interrupted, shutting down running containers...")
+            self.shutdown()
+            for worker in workers:
+                worker.join()
+            raise
+        return self.results
+
+
+def print_summary(results, skipped=()):
+    print(f"\n{'='*60}")
+    for task in skipped:
+        print(
+            f"{task['gpu']:<24} {task['model']['name']:<40} {task['hash']:<24} "
+            f"{'':>9}  SKIPPED (completed)"
+        )
+    for result in results:
+        status = (
+            "OK" if result["returncode"] == 0 else f"FAILED ({result['returncode']})"
+        )
+        if result.get("attempts", 1) > 1:
+            status += f" after {result['attempts']} attempts"
+        print(
+            f"{result['device']:<24} {result['model']:<40} {result['run_id']:<24} "
+            f"{result['wall_time']:>8.1f}s  {status}"
+        )
+    passed = sum(result["returncode"] == 0 for result in results)
+    retried = sum(result.get("attempts", 1) > 1 for result in results)
+    print(
+        f"\nskipped: {len(skipped)}, passed: {passed}, retried: {retried}, "
+        f"failed: {len(results) - passed}"
+    )
+    print(f"{'='*60}\n")
+
+
+def run(
+    docker_image,
+    num_procs,
+    script,
+    duration,
+    iterations,
+    models_filter,
+    warm=False,
+    no_build=False,
+    no_compile_cache=False,
+    force=False,
+    retries=0,
+    retry_backoff=30,
+):
+    gpu_config = load_gpu_config()
+    gpus = parse_gpus(gpu_config)
+    groups = parse_gpu_groups(gpu_config, gpus)
+    models = parse_models(models_filter)
+
+    # resolve the derived image once, instead of every task checking its hash
+    if no_build:
+        build_args = ["--no-build"]
+    else:
+        docker_image = ensure_image(docker_image)
+        build_args = ["--prebuilt"]
+    if no_compile_cache:
+        build_args.append("--no-compile-cache")
+
+    invocation_id = time.strftime("%Y%m%d-%H%M%S")
+    device_task_queue_map = build_task_queues(gpus, models, invocation_id, groups)
+    device_to_name_map = {gpu["device"]: gpu["name"] for gpu in gpus} | {
+        ",".join(group["devices"]): group["name"] for group in groups
+    }
+    # gfx arch keying the compile cache, detected by docker_tool if not set in gpus.yaml
+    device_to_arch_map = {gpu["device"]: gpu.get("arch") for gpu in gpus} | {
+        ",".join(group["devices"]): group["members"][0].get("arch") for group in groups
+    }
+    # mock devices run the mock engine without a GPU (gpus.yaml mock: true)
+    device_to_mock_map = {gpu["device"]: gpu.get("mock", False) for gpu in gpus} | {
+        ",".join(group["devices"]): all(
+            member.get("mock", False) for member in group["members"]
+        )
+        for group in groups
+    }
+    prepare_tokens()
+
+    manifest = Manifest()
+    skipped = []
+    for device, task_queue in device_task_queue_map.items():
+        for task in task_queue:
+            task["hash"] = task_hash(
+                task,
+                docker_image,
+                script,
+                runner_args(task["model"], duration, iterations),
+            )
+        if not force:
+            skipped.extend(task for task in task_queue if manifest.completed(task))
+            device_task_queue_map[device] = task_queue = deque(
+                task for task in task_queue if not manifest.completed(task)
+            )
+    if skipped:
+        print(
+            f"Skipping {len(skipped)} tasks completed by earlier runs "
+            f"(see {MANIFEST_PATH}, --force reruns them)"
+        )
+
+    for device, task_queue in device_task_queue_map.items():
+        if warm:
+            device_task_queue_map[device] = task_queue = group_by_engine(task_queue)
+        for index, task in enumerate(task_queue):
+            task["container_name"] = container_name(device, task["model"], index)
+
+    def task_cmd(device, task):
+        model = task["model"]
+        return docker_tool_cmd(
+            docker_image,
+            build_args,
+            device=device,
+            device_name=device_to_name_map[device],
+            gpu_arch=device_to_arch_map[device],
+            mock=device_to_mock_map[device],
+            container_name=task["container_name"],
+            script=script,
+            script_args=[
+                "--script",
+                model["script"],
+                "--model",
+                model["name"],
+                *runner_args(model, duration, iterations),
+            ],
+        )
+
+    def worker_cmd(device, task):
+        model = task["model"]
+        return docker_tool_cmd(
+            docker_image,
+            build_args,
+            device=device,
+            device_name=device_to_name_map[device],
+            gpu_arch=device_to_arch_map[device],
+            mock=device_to_mock_map[device],
+            container_name=task["container_name"],
+            script="worker.py",
+            script_args=[
+                "--script",
+                model["script"],
+                "--model",
+                model["name"],
+                "--queue-dir",
+                f"/workspace/logs/{QUEUE_DIR.name}/{task['container_name']}",
+                "--run-id",
+                f"{invocation_id}-worker-{device_slug(device)}",
+            ],
+        )
+
+    executor = (
+        WarmExecutor(
+            worker_cmd,
+            lambda task: runner_args(task["model"], duration, iterations),
+        )
+        if warm
+        else ColdExecutor(task_cmd)
+    )
+    commit = git_commit()
+
+    def register(result):
+        task = result["task"]
+        try:
+            register_run(
+                run_id=task["run_id"],
+                log_dir=task_log_dir(task),
+                gpu=task["gpu"],
+                model=task["model"]["name"],
+                device=result["device"],
+                script=task["model"]["script"],
+                image=docker_image,
+                env=task["env"],
+                returncode=result["returncode"],
+                wall_time=result["wall_time"],
+                commit=commit,
+            )
+        except Exception as e:
+            print(f"Failed to register run {task['run_id']}: {e}", file=sys.stderr)
+        if result["returncode"] == 0:
+            manifest.record(task, result)
+
+    scheduler = Scheduler(
+        device_task_queue_map,
+        num_procs,
+        executor,
+        on_result=register,
+        retries=retries,
+        retry_backoff=retry_backoff,
+    )
+    try:
+        results = scheduler.run()
+    except KeyboardInterrupt:
+        print_summary(scheduler.results, skipped)
+        sys.exit(130)
+
+    print_summary(results, skipped)
+    write_sweep_results(results)
+    return results
 
 
 def main():
@@ -126,7 +1012,35 @@ def main():
     parser.add_argument(
         "--docker-image",
         help="Docker image on which to run vllm",
-        default="hyoon11/vllm-dev:20260121_43_py3.12_torch2.9_triton3.5_navi_upstream_6a09612_ubuntu24.04",
+        default=DEFAULT_IMAGE,
+    )
+    parser.add_argument(
+        "--no-build",
+        help="""Run --docker-image as is and install the requirements in every container,
+                        instead of building a derived image with them preinstalled.""",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--no-compile-cache",
+        help="""Don't mount the persistent compile caches, e.g. to measure cold startup.""",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--force",
+        help="Rerun tasks recorded as completed in .logs/manifest.json.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--retries",
+        help="Times a failed task is retried.",
+        type=int,
+        default=2,
+    )
+    parser.add_argument(
+        "--retry-backoff",
+        help="Seconds before the first retry, doubled for every further retry.",
+        type=float,
+        default=30,
     )
     parser.add_argument(
         "--num-procs",
@@ -134,6 +1048,7 @@ def main():
                         On a system with multiple GPUs, we can choose to run multiple
                         profiling tasks (1 for each GPU maximum), if resource exhaustion
                         is not a problem (RAM being the main concern)""",
+        type=int,
         default=1,
     )
     parser.add_argument(
@@ -141,6 +1056,13 @@ def main():
         help="Name of the script to run inside the containers.",
         default="run_model.py",
     )
+    parser.add_argument(
+        "--warm",
+        help="""Keep one long-lived container per GPU which loads the model once and
+                        runs all tasks sharing the same engine arguments, instead of starting
+                        a fresh container for every task.""",
+        action="store_true",
+    )
     time_group = parser.add_mutually_exclusive_group(required=True)
     time_group.add_argument
     time_group.add_argument(
@@ -160,14 +1082,22 @@ def main():
     args = parser.parse_args()
     # TODO: remove default docker image from this file (put it in some config)
 
-    run(
+    results = run(
         docker_image=args.docker_image,
         num_procs=args.num_procs,
         script=args.script,
         duration=args.duration,
         iterations=args.iterations,
         models_filter=args.models_filter,
+        warm=args.warm,
+        no_build=args.no_build,
+        no_compile_cache=args.no_compile_cache,
+        force=args.force,
+        retries=args.retries,
+        retry_backoff=args.retry_backoff,
     )
+    if any(result["returncode"] != 0 for result in results):
+        sys.exit(1)
 
 
 if __name__ == "__main__":
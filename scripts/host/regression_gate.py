@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+
+"""
+
+regression_gate.py - statistical comparison of a candidate run against a baseline run
+
+Compares the per-request latency distributions (requests.csv) and the per-iteration throughput
+(iterations.csv) of two runs of the same model, GPU and config. Every statistic gets a bootstrap
+confidence interval of its relative change. A change counts when the interval excludes zero and
+the change exceeds its threshold, so a few percent of noise between runs doesn't fail the gate.
+Statistics with too few samples in either run are reported as insufficient data.
+Runs with sweep points (batch sizes, QPS, prefix cache arms) are compared point by point.
+
+Runs can't be compared if model, GPU, mode, the resolved env (results.db) or the runner script and
+arguments (run_start event) differ.
+Exits 1 if anything regressed, 2 if the runs can't be compared, 0 otherwise, so image, driver
+or ROCm updates can be gated automatically:
+
+scripts/host/regression_gate.py <baseline_run_id> <candidate_run_id>
+scripts/host/regression_gate.py .logs/<GPU>/<MODEL>/<run_a> .logs/<GPU>/<MODEL>/<run_b> -o gate.json
+scripts/host/regression_gate.py <baseline> <candidate> --latency-threshold 3 --confidence 0.99
+
+"""
+
+import argparse
+import csv
+import json
+import random
+import sys
+from pathlib import Path
+
+from results import DB_PATH, PROJECT_ROOT, connect, print_table
+
+# (name, requests.csv column, percentile), lower is better
+LATENCY_STATISTICS = [
+    ("ttft_p50", "ttft_s", 50),
+    ("ttft_p90", "ttft_s", 90),
+    ("tpot_p50", "tpot_s", 50),
+    ("tpot_p90", "tpot_s", 90),
+    ("e2e_p50", "e2e_s", 50),
+    ("e2e_p90", "e2e_s", 90),
+]
+# (name, iterations.csv numerator column), per second of the iteration, higher is better
+THROUGHPUT_STATISTICS = [
+    ("generation_tokens_per_s", "generation_tokens"),
+    ("requests_per_s", "requests"),
+]
+MIN_SAMPLES = 2
+RUN_LENGTH_ARGS = {"--iterations", "--duration"}
+INSUFFICIENT = "insufficient data"
+
+
+def percentile(values, p):
+    # linear interpolation between closest ranks, like runner_utilities.metrics
+    rank = (len(values) - 1) * p / 100
+    low = int(rank)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+
+def mean(values):
+    return sum(values) / len(values)
+
+
+def bootstrap(baseline, candidate, statistic, resamples, confidence, rng):
+    """
+    Relative change of statistic from baseline to candidate, with its bootstrap confidence
+    interval from resampling both samples independently.
+    """
+    base = statistic(baseline)
+    change = (statistic(candidate) - base) / base if base else None
+    changes = []
+    for _ in range(resamples):
+        resampled_base = statistic(rng.choices(baseline, k=len(baseline)))
+        if resampled_base:
+            resampled = statistic(rng.choices(candidate, k=len(candidate)))
+            changes.append((resampled - resampled_base) / resampled_base)
+    if change is None or not changes:
+        return change, None, None
+    changes.sort()
+    alpha = (1 - confidence) / 2
+    return (
+        change,
+        percentile(changes, alpha * 100),
+        percentile(changes, 100 - alpha * 100),
+    )
+
+
+def resolve_run(run):
+    """
+    A run directory, or a run ID looked up in the results database. Returns the directory and
+    the run's database row, None for directories that were never registered.
+    """
+    path = Path(run)
+    connection = connect(DB_PATH)
+    try:
+        if path.is_dir():
+            # registered log dirs may be relative to the project root or absolute
+            for row in connection.execute("SELECT * FROM runs"):
+                if (PROJECT_ROOT / row["log_dir"]).resolve() == path.resolve():
+                    return path, dict(row)
+            return path, None
+        row = connection.execute(
+            "SELECT * FROM runs WHERE run_id = ?", (run,)
+        ).fetchone()
+    finally:
+        connection.close()
+    if row is None:
+        sys.exit(f"{run} is neither a run directory nor a run ID in {DB_PATH}")
+    return PROJECT_ROOT / row["log_dir"], dict(row)
+
+
+def run_config(run_dir, row):
+    """
+    What a run measured besides model and GPU: its resolved env from the results database and
+    the runner script and arguments (prompts or workload) from its run_start event. Run
+    length arguments don't change the distributions and are left out. None if neither is known.
+    """
+    config = {}
+    if row is not None:
+        env = json.loads(row["env"] or "{}")
+        config["env"] = {key: value for key, value in env.items() if key != "RUN_ID"}
+    # sweep points are subdirs of the run, the event is written at the run's top level
+    for events_dir in (run_dir, *run_dir.parents[:2]):
+        events_path = events_dir / "events.jsonl"
+        if not events_path.exists():
+            continue
+        with events_path.open("r") as f:
+            starts = [
+                event
+                for event in map(json.loads, filter(str.strip, f))
+                if event["event"] == "run_start"
+            ]
+        if starts:
+            args = starts[-1]["args"]
+            config["script"] = starts[-1]["script"]
+            config["args"] = [
+                arg
+                for i, arg in enumerate(args)
+                if arg not in RUN_LENGTH_ARGS
+                and (i == 0 or args[i - 1] not in RUN_LENGTH_ARGS)
+            ]
+            break
+    return config or None
+
+
+def config_differences(baseline, candidate):
+    # only what is known for both runs is compared
+    differences = [
+        key
+        for key in ("script", "args")
+        if key in baseline and key in candidate and baseline[key] != candidate[key]
+    ]
+    env_a, env_b = baseline.get("env"), candidate.get("env")
+    if env_a is not None and env_b is not None:
+        differences.extend(
+            f"env:{key}"
+            for key in sorted(set(env_a) | set(env_b))
+            if env_a.get(key) != env_b.get(key)
+        )
+    return differences
+
+
+def read_column(path, column):
+    if not path.exists():
+        return []
+    with path.open("r", newline="") as f:
+        return [
+            float(row[column])
+            for row in csv.DictReader(f)
+            if row.get(column) not in ("", None)
+        ]
+
+
+def throughput(path, column):
+    # per iteration rates, iterations without a duration can't be compared
+    if not path.exists():
+        return []
+    with path.open("r", newline="") as f:
+        return [
+            float(row[column]) / float(row["duration_s"])
+            for row in csv.DictReader(f)
+            if float(row["duration_s"]) > 0
+        ]
+
+
+def points(run_dir):
+    # the run itself or every sweep point below it (batch_size_N, qps_X, cache_on/off)
+    return {
+        path.parent.relative_to(run_dir).as_posix(): path.parent
+        for path in sorted(run_dir.rglob("requests.csv"))
+    }
+
+
+def load_metrics(run_dir):
+    metrics_paths = sorted(run_dir.rglob("metrics.json"))
+    if not metrics_paths:
+        return {}
+    with metrics_paths[0].open("r") as f:
+        return json.load(f)
+
+
+def compare_point(baseline_dir, candidate_dir, args, rng):
+    rows = []
+
+    def add(name, baseline, candidate, statistic, higher_is_better, threshold):
+        if not baseline and not candidate:
+            # the metric doesn't apply to this runner, e.g. TPOT of embeddings
+            return
+        change = low = high = None
+        if len(baseline) >= MIN_SAMPLES and len(candidate) >= MIN_SAMPLES:
+            change, low, high = bootstrap(
+                baseline, candidate, statistic, args.resamples, args.confidence, rng
+            )
+        if change is None or low is None:
+            verdict = INSUFFICIENT
+        else:
+            # positive when the candidate is worse
+            worse = -change if higher_is_better else change
+            worse_low, worse_high = (-high, -low) if higher_is_better else (low, high)
+            if worse_low > 0 and worse * 100 > threshold:
+                verdict = "REGRESSION"
+            elif worse_high < 0 and -worse * 100 > threshold:
+                verdict = "improvement"
+            else:
+                verdict = "ok"
+        rows.append(
+            {
+                "statistic": name,
+                "baseline": statistic(baseline) if baseline else None,
+                "candidate": statistic(candidate) if candidate else None,
+                "change_pct": change * 100 if change is not None else None,
+                "ci_low_pct": low * 100 if low is not None else None,
+                "ci_high_pct": high * 100 if high is not None else None,
+                "threshold_pct": threshold,
+                "samples": [len(baseline), len(candidate)],
+                "verdict": verdict,
+            }
+        )
+
+    for name, column, p in LATENCY_STATISTICS:
+        add(
+            name,
+            read_column(baseline_dir / "requests.csv", column),
+            read_column(candidate_dir / "requests.csv", column),
+            lambda values, p=p: percentile(sorted(values), p),
+            False,
+            args.latency_threshold,
+        )
+    for name, column in THROUGHPUT_STATISTICS:
+        add(
+            name,
+            throughput(baseline_dir / "iterations.csv", column),
+            throughput(candidate_dir / "iterations.csv", column),
+            mean,
+            True,
+            args.throughput_threshold,
+        )
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Gate a candidate run against a baseline run with bootstrap CIs."
+    )
+    parser.add_argument("baseline", help="Baseline run directory or run ID.")
+    parser.add_argument("candidate", help="Candidate run directory or run ID.")
+    parser.add_argument(
+        "--latency-threshold",
+        help="Percent a latency statistic may change before it counts.",
+        type=float,
+        default=5.0,
+    )
+    parser.add_argument(
+        "--throughput-threshold",
+        help="Percent a throughput statistic may change before it counts.",
+        type=float,
+        default=3.0,
+    )
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument(
+        "--resamples", help="Bootstrap resamples.", type=int, default=2000
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--allow-mismatch",
+        help="Compare runs of different models or GPUs.",
+        action="store_true",
+    )
+    parser.add_argument("-o", "--output", help="Write the report as JSON.", type=Path)
+    args = parser.parse_args()
+
+    baseline_dir, baseline_row = resolve_run(args.baseline)
+    candidate_dir, candidate_row = resolve_run(args.candidate)
+    baseline_metrics = load_metrics(baseline_dir)
+    candidate_metrics = load_metrics(candidate_dir)
+    mismatched = [
+        field
+        for field in ("model", "gpu", "mode")
+        if baseline_metrics.get(field) != candidate_metrics.get(field)
+    ]
+    # env (sampling, engine args) and prompts/workload have to match as well
+    baseline_config = run_config(baseline_dir, baseline_row)
+    candidate_config = run_config(candidate_dir, candidate_row)
+    if baseline_config is None or candidate_config is None:
+        print(
+            "Config of a run unknown (not registered, no run_start event), not checked."
+        )
+    else:
+        mismatched.extend(config_differences(baseline_config, candidate_config))
+    if mismatched and not args.allow_mismatch:
+        print(
+            f"Runs differ in {', '.join(mismatched)}, "
+            "pass --allow-mismatch to compare anyway.",
+            file=sys.stderr,
+        )
+        sys.exit(2)
+
+    baseline_points, candidate_points = points(baseline_dir), points(candidate_dir)
+    common = [point for point in baseline_points if point in candidate_points]
+    if not common:
+        print("No requests.csv the runs have in common.", file=sys.stderr)
+        sys.exit(2)
+    for point in sorted(set(baseline_points) ^ set(candidate_points)):
+        print(f"Skipping {point or '.'}, only in one of the runs.")
+
+    rng = random.Random(args.seed)
+    report = {
+        "baseline": str(baseline_dir),
+        "candidate": str(candidate_dir),
+        "confidence": args.confidence,
+        "mismatched": mismatched,
+        "points": {},
+    }
+    table = []
+    for point in common:
+        rows = compare_point(baseline_points[point], candidate_points[point], args, rng)
+        report["points"][point or "."] = rows
+        for row in rows:
+            table.append(
+                [
+                    point or ".",
+                    row["statistic"],
+                    f"{row['baseline']:.4g}" if row["baseline"] is not None else "",
+                    f"{row['candidate']:.4g}" if row["candidate"] is not None else "",
+                    (
+                        f"{row['change_pct']:+.2f}%"
+                        if row["change_pct"] is not None
+                        else ""
+                    ),
+                    (
+                        f"[{row['ci_low_pct']:+.2f}%, {row['ci_high_pct']:+.2f}%]"
+                        if row["ci_low_pct"] is not None
+                        else ""
+                    ),
+                    row["verdict"],
+                ]
+            )
+    print_table(
+        [
+            "point",
+            "statistic",
+            "baseline",
+            "candidate",
+            "change",
+            f"{args.confidence:.0%} CI",
+            "verdict",
+        ],
+        table,
+    )
+
+    verdicts = [row["verdict"] for rows in report["points"].values() for row in rows]
+    report["regressions"] = verdicts.count("REGRESSION")
+    report["improvements"] = verdicts.count("improvement")
+    report["insufficient_data"] = verdicts.count(INSUFFICIENT)
+    if args.output:
+        with args.output.open("w") as f:
+            json.dump(report, f, indent=2)
+    print(
+        f"\n{report['regressions']} regressions, {report['improvements']} improvements, "
+        f"{report['insufficient_data']} with insufficient data "
+        f"out of {len(verdicts)} statistics"
+    )
+    sys.exit(1 if report["regressions"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+
+"""
+
+results.py - local index of profiling runs and queries comparing them
+
+Every task run by orchestrator.py is registered in a SQLite database (.logs/results.db) together
+with the git commit, image, resolved env, GPU, model and the metrics.json written by the runner.
+Runner sweeps writing a metrics.json per subdir (batch sizes, QPS, prefix cache arms) get an
+extra <run_id>/<point> row per subdir.
+
+Usage:
+
+scripts/host/results.py list --model Qwen/Qwen3-4B
+scripts/host/results.py best --model Qwen/Qwen3-4B --metric generation_tokens_per_s
+scripts/host/results.py compare <run_id_a> <run_id_b>
+scripts/host/results.py scaling --model Qwen/Qwen3-VL-8B-Instruct  # multi-GPU scaling efficiency
+scripts/host/results.py register .logs/<GPU>/<MODEL>/<run_id>  # index runs made outside the orchestrator
+
+"""
+
+import argparse
+import json
+import sqlite3
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+DB_PATH = PROJECT_ROOT / ".logs" / "results.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    created_at TEXT,
+    git_commit TEXT,
+    image TEXT,
+    gpu TEXT,
+    device TEXT,
+    model TEXT,
+    script TEXT,
+    env TEXT,
+    returncode INTEGER,
+    wall_time REAL,
+    log_dir TEXT,
+    metrics TEXT
+)
+"""
+
+# metrics which can be queried/compared directly, extracted from metrics.json
+METRICS = {
+    "requests_per_s": ("requests_per_s",),
+    "prompt_tokens_per_s": ("prompt_tokens_per_s",),
+    "generation_tokens_per_s": ("generation_tokens_per_s",),
+    "ttft_p50_s": ("ttft_s", "p50"),
+    "ttft_p99_s": ("ttft_s", "p99"),
+    "tpot_p50_s": ("tpot_s", "p50"),
+    "tpot_p99_s": ("tpot_s", "p99"),
+    "e2e_p50_s": ("e2e_s", "p50"),
+    "e2e_p99_s": ("e2e_s", "p99"),
+    "startup_s": ("startup_s",),
+    "generation_tokens_per_j": ("telemetry", "generation_tokens_per_j"),
+    "num_gpus": ("topology", "num_gpus"),
+}
+# throughput metrics, the ones scaling efficiency is computed for
+RATES = [name for name in METRICS if name.endswith("_per_s")]
+# metrics where lower is better, used to pick the best run
+LOWER_IS_BETTER = {
+    name for name in METRICS if name.endswith("_s") and "_per_" not in name
+}
+
+
+def connect(db_path=DB_PATH):
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    # several orchestrator workers may register runs at the same time
+    connection = sqlite3.connect(db_path, timeout=30)
+    connection.row_factory = sqlite3.Row
+    connection.execute(SCHEMA)
+    return connection
+
+
+def git_commit():
+    result = subprocess.run(
+        ["git", "-C", str(PROJECT_ROOT), "describe", "--always", "--dirty"],
+        capture_output=True,
+        text=True,
+    )
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+def load_metrics(log_dir):
+    metrics_path = Path(log_dir) / "metrics.json"
+    if not metrics_path.exists():
+        return None
+    with metrics_path.open("r") as f:
+        return json.load(f)
+
+
+def metrics_points(log_dir):
+    """
+    Metrics of a run by sweep point, "" for the run dir itself and the subdir for runner sweeps
+    (batch_size_N, qps_X, cache_on/cache_off), which write one metrics.json per point.
+    """
+    log_dir = Path(log_dir)
+    return {
+        path.parent.relative_to(log_dir)
+        .as_posix()
+        .strip("."): load_metrics(path.parent)
+        for path in sorted(log_dir.rglob("metrics.json"))
+    }
+
+
+def metric_value(metrics, name):
+    value = metrics
+    for key in METRICS[name]:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+def register_run(
+    run_id,
+    log_dir,
+    gpu,
+    model,
+    device=None,
+    script=None,
+    image=None,
+    env=None,
+    returncode=None,
+    wall_time=None,
+    commit=None,
+    db_path=DB_PATH,
+):
+    """
+    Registers the run, plus one <run_id>/<point> row per sweep point the runner wrote into
+    a subdir of the run.
+    """
+    points = metrics_points(log_dir)
+    rows = {"": points.get("")} | {point: m for point, m in points.items() if point}
+    created_at = time.strftime("%Y-%m-%d %H:%M:%S")
+    commit = commit or git_commit()
+    with connect(db_path) as connection:
+        for point, metrics in rows.items():
+            connection.execute(
+                """
+                INSERT OR REPLACE INTO runs VALUES
+                (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    f"{run_id}/{point}" if point else run_id,
+                    created_at,
+                    commit,
+                    image,
+                    gpu,
+                    device,
+                    model,
+                    script,
+                    json.dumps(env or {}, sort_keys=True),
+                    returncode,
+                    wall_time,
+                    str(Path(log_dir) / point),
+                    json.dumps(metrics) if metrics is not None else None,
+                ),
+            )
+    connection.close()
+
+
+def fetch_runs(connection, model=None, gpu=None):
+    query = "SELECT * FROM runs WHERE 1=1"
+    params = []
+    if model:
+        query += " AND model = ?"
+        params.append(model)
+    if gpu:
+        query += " AND gpu = ?"
+        params.append(gpu)
+    query += " ORDER BY created_at DESC"
+    return [
+        dict(row) | {"metrics": json.loads(row["metrics"]) if row["metrics"] else {}}
+        for row in connection.execute(query, params)
+    ]
+
+
+def print_table(columns, rows):
+    rows = [["" if value is None else str(value) for value in row] for row in rows]
+    widths = [
+        max([len(column), *(len(row[i]) for row in rows)])
+        for i, column in enumerate(columns)
+    ]
+    for row in [columns, *rows]:
+        print(
+            "  ".join(f"{value:<{width}}" for value, width in zip(row, widths)).rstrip()
+        )
+
+
+def format_metric(value):
+    return f"{value:.4g}" if isinstance(value, float) else value
+
+
+def list_runs(connection, args):
+    runs = fetch_runs(connection, args.model, args.gpu)[: args.limit]
+    print_table(
+        ["run_id", "created_at", "gpu", "model", "rc", args.metric],
+        [
+            [
+                run["run_id"],
+                run["created_at"],
+                run["gpu"],
+                run["model"],
+                run["returncode"],
+                format_metric(metric_value(run["metrics"], args.metric)),
+            ]
+            for run in runs
+        ],
+    )
+
+
+def best_runs(connection, args):
+    best = {}
+    for run in fetch_runs(connection, args.model):
+        value = metric_value(run["metrics"], args.metric)
+        if value is None or run["returncode"] not in (0, None):
+            continue
+        current = best.get(run["gpu"])
+        if current is not None:
+            current_value = metric_value(current["metrics"], args.metric)
+            if args.metric in LOWER_IS_BETTER:
+                better = value < current_value
+            else:
+                better = value > current_value
+            if not better:
+                continue
+        best[run["gpu"]] = run
+
+    print_table(
+        ["gpu", "run_id", args.metric, "git_commit"],
+        [
+            [
+                gpu,
+                run["run_id"],
+                format_metric(metric_value(run["metrics"], args.metric)),
+                run["git_commit"],
+            ]
+            for gpu, run in sorted(best.items())
+        ],
+    )
+
+
+def compare_runs(connection, args):
+    runs = []
+    for run_id in (args.run_a, args.run_b):
+        row = connection.execute(
+            "SELECT * FROM runs WHERE run_id = ?", (run_id,)
+        ).fetchone()
+        if row is None:
+            print(f"Run {run_id} not found in {args.db}", file=sys.stderr)
+            sys.exit(1)
+        runs.append(dict(row) | {"metrics": json.loads(row["metrics"] or "{}")})
+    run_a, run_b = runs
+
+    rows = [
+        [field, run_a[field], run_b[field], ""]
+        for field in ("gpu", "model", "git_commit", "image", "returncode")
+    ]
+    for name in METRICS:
+        value_a = metric_value(run_a["metrics"], name)
+        value_b = metric_value(run_b["metrics"], name)
+        delta = (
+            f"{(value_b - value_a) / value_a * 100:+.1f}%"
+            if value_a and value_b is not None
+            else ""
+        )
+        rows.append([name, format_metric(value_a), format_metric(value_b), delta])
+
+    env_a, env_b = json.loads(run_a["env"]), json.loads(run_b["env"])
+    for key in sorted((set(env_a) | set(env_b)) - {"RUN_ID"}):
+        if env_a.get(key) != env_b.get(key):
+            rows.append([f"env:{key}", env_a.get(key), env_b.get(key), ""])
+
+    print_table(["", run_a["run_id"], run_b["run_id"], "delta"], rows)
+
+
+def scaling_efficiency(connection, args):
+    """
+    Compares every multi-GPU run of a model with the best single-GPU run on the GPU its
+    group is made of, efficiency = rate on N GPUs / (N * rate on one GPU).
+    """
+    runs = [
+        run
+        for run in fetch_runs(connection, args.model)
+        if run["returncode"] in (0, None)
+        and metric_value(run["metrics"], args.metric) is not None
+    ]
+    single_gpu = {}
+    for run in runs:
+        if (metric_value(run["metrics"], "num_gpus") or 1) == 1:
+            value = metric_value(run["metrics"], args.metric)
+            single_gpu[run["gpu"]] = max(value, single_gpu.get(run["gpu"], value))
+
+    rows = []
+    for run in runs:
+        topology = run["metrics"].get("topology") or {}
+        num_gpus = topology.get("num_gpus", 1)
+        if num_gpus == 1:
+            continue
+        value = metric_value(run["metrics"], args.metric)
+        baseline = single_gpu.get((topology.get("gpu_names") or [None])[0])
+        rows.append(
+            [
+                run["gpu"],
+                run["run_id"],
+                num_gpus,
+                topology.get("tensor_parallel_size"),
+                topology.get("data_parallel_size"),
+                format_metric(value),
+                format_metric(baseline),
+                f"{value / (num_gpus * baseline) * 100:.1f}%" if baseline else "",
+            ]
+        )
+    print_table(
+        ["gpu", "run_id", "gpus", "tp", "dp", args.metric, "1 gpu", "efficiency"],
+        rows,
+    )
+
+
+def register_dirs(connection, args):
+    for log_dir in args.log_dirs:
+        log_dir = log_dir.resolve()
+        points = metrics_points(log_dir)
+        if not points:
+            print(f"No metrics.json in {log_dir}, skipping.")
+            continue
+        metrics = next(iter(points.values()))
+        register_run(
+            run_id=log_dir.name,
+            log_dir=log_dir,
+            gpu=metrics.get("gpu") or log_dir.parent.parent.name.replace("_", " "),
+            model=metrics.get("model") or log_dir.parent.name,
+            db_path=args.db,
+        )
+        print(f"Registered {log_dir.name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query and compare profiling runs.")
+    parser.add_argument("--db", type=Path, default=DB_PATH, help="Results database.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    list_parser = subparsers.add_parser("list", help="List registered runs.")
+    list_parser.add_argument("--model")
+    list_parser.add_argument("--gpu")
+    list_parser.add_argument("--limit", type=int, default=50)
+    list_parser.add_argument(
+        "--metric", choices=METRICS, default="generation_tokens_per_s"
+    )
+
+    best_parser = subparsers.add_parser("best", help="Best run per GPU for a model.")
+    best_parser.add_argument("--model", required=True)
+    best_parser.add_argument(
+        "--metric", choices=METRICS, default="generation_tokens_per_s"
+    )
+
+    compare_parser = subparsers.add_parser("compare", help="Compare two runs.")
+    compare_parser.add_argument("run_a")
+    compare_parser.add_argument("run_b")
+
+    scaling_parser = subparsers.add_parser(
+        "scaling", help="Multi-GPU runs of a model against its best single-GPU run."
+    )
+    scaling_parser.add_argument("--model", required=True)
+    scaling_parser.add_argument(
+        "--metric", choices=RATES, default="generation_tokens_per_s"
+    )
+
+    register_parser = subparsers.add_parser(
+        "register", help="Index run directories containing a metrics.json."
+    )
+    register_parser.add_argument("log_dirs", type=Path, nargs="+")
+
+    args = parser.parse_args()
+
+    commands = {
+        "list": list_runs,
+        "best": best_runs,
+        "compare": compare_runs,
+        "scaling": scaling_efficiency,
+        "register": register_dirs,
+    }
+    connection = connect(args.db)
+    try:
+        commands[args.command](connection, args)
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,531 @@
+#!/usr/bin/env python3
+
+"""
+
+trace_analyzer.py - hot kernel and op lists from the Chrome traces of profiled runs
+
+Traces of a few decode iterations easily reach several GB, so they are never loaded as a whole:
+the traceEvents array is decoded one event at a time from .json or .json.gz files, and only a
+few numbers per GPU kernel are kept (names are interned). Per trace file, kernels are joined to
+the CPU op which launched them (External id) and to their runtime launch call (correlation), so
+the tables show GPU time by kernel and by parent op, call counts and launch overhead.
+
+GPU time is split into steps at idle gaps longer than --step-gap-us. A step running prefill
+attention kernels counts as prefill, one running decode attention kernels as decode, both as
+mixed. Steps without either are classified by length, steps longer than twice the median are
+prefill. This is a heuristic, check steps.csv when the split looks off.
+
+Usage:
+
+scripts/host/trace_analyzer.py analyze .logs/<GPU>/<MODEL>/<run_id>        # every trace below it
+scripts/host/trace_analyzer.py analyze trace.json.gz --top 30 -o analysis/
+scripts/host/trace_analyzer.py diff <analysis_or_run_a> <analysis_or_run_b> --by op
+
+"""
+
+import argparse
+import csv
+import gzip
+import json
+import re
+import statistics
+import sys
+from array import array
+from collections import defaultdict
+from pathlib import Path
+
+from results import print_table
+
+CHUNK_SIZE = 1 << 20
+EVENTS_KEY = re.compile(r'"traceEvents"\s*:\s*\[')
+SEPARATOR = re.compile(r"[\s,]*")
+# where the event after a malformed one starts
+NEXT_EVENT = re.compile(r"}\s*,\s*(?={)")
+# a decode error this close to the end of the buffer may just be an event cut off by the chunk
+CUT_OFF_MARGIN = 64
+# characters a single event may span before it counts as malformed, bounds the buffer
+MAX_EVENT_SIZE = 64 << 20
+GPU_CATEGORIES = {"kernel", "gpu_memcpy", "gpu_memset"}
+RUNTIME_CATEGORIES = {"cuda_runtime", "cuda_driver"}
+PREFILL_KERNELS = re.compile(r"prefill|varlen|fmha_fwd|context_attention", re.I)
+DECODE_KERNELS = re.compile(r"decode|paged_attention|paged_attn", re.I)
+KINDS = ("prefill", "decode", "mixed")
+UNATTRIBUTED = "<unattributed>"
+DEFAULT_STEP_GAP_US = 500
+
+
+def _open_trace(path):
+    if path.name.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+    return path.open("r", encoding="utf-8", errors="replace")
+
+
+def iter_events(path, chunk_size=CHUNK_SIZE):
+    """
+    Yields the events of a Chrome trace, either {"traceEvents": [...], ...} or a bare array,
+    holding at most one event and a chunk of the file in memory. Malformed events are skipped
+    up to the start of the next event.
+    """
+    decoder = json.JSONDecoder()
+    with _open_trace(Path(path)) as f:
+        buffer = ""
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            buffer += chunk
+            stripped = buffer.lstrip()
+            if stripped.startswith("["):
+                buffer = stripped[1:]
+                break
+            match = EVENTS_KEY.search(buffer)
+            if match:
+                buffer = buffer[match.end() :]
+                break
+            # the key may span two chunks
+            buffer = buffer[-64:]
+
+        position = 0
+        while True:
+            position = SEPARATOR.match(buffer, position).end()
+            if position == len(buffer) or buffer[position] != "]":
+                try:
+                    event, end = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError as err:
+                    cut_off = err.pos >= len(
+                        buffer
+                    ) - CUT_OFF_MARGIN or err.msg.startswith("Unterminated string")
+                    if cut_off and len(buffer) - position < MAX_EVENT_SIZE:
+                        # event cut off at the end of the buffer (or nothing left to decode yet)
+                        chunk = f.read(chunk_size)
+                        if not chunk:
+                            if buffer[position:].strip():
+                                # profiler killed while writing, keep what was complete
+                                print(
+                                    f"{path} is truncated, skipping its last event",
+                                    file=sys.stderr,
+                                )
+                            return
+                        buffer = buffer[position:] + chunk
+                        position = 0
+                        continue
+                    print(
+                        f"{path}: skipping a malformed event ({err.msg})",
+                        file=sys.stderr,
+                    )
+                    while not (match := NEXT_EVENT.search(buffer, position + 1)):
+                        chunk = f.read(chunk_size)
+                        if not chunk:
+                            return
+                        # the separator may span two chunks
+                        buffer = buffer[-CUT_OFF_MARGIN:] + chunk
+                        position = 0
+                    position = match.end()
+                    continue
+                yield event
+                position = end
+                if position > chunk_size:
+                    buffer = buffer[position:]
+                    position = 0
+            else:
+                return
+
+
+def _is_trace(path, root):
+    # traces/ of a run dir, or files named like torch and vLLM name their traces
+    return (path.name.endswith(".json") or path.name.endswith(".json.gz")) and (
+        "traces" in path.relative_to(root).parts[:-1] or "trace" in path.name
+    )
+
+
+def trace_files(paths):
+    for path in map(Path, paths):
+        if path.is_dir():
+            yield from sorted(
+                p for p in path.rglob("*") if p.is_file() and _is_trace(p, path)
+            )
+        else:
+            yield path
+
+
+class _Stats:
+    __slots__ = ("count", "total", "min", "max", "kinds", "launch", "launches", "queue")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self.kinds = dict.fromkeys(KINDS, 0.0)
+        self.launch = 0.0
+        self.launches = 0
+        self.queue = 0.0
+
+    def add(self, duration, kind, launch=None):
+        self.count += 1
+        self.total += duration
+        self.min = min(self.min, duration)
+        self.max = max(self.max, duration)
+        self.kinds[kind] += duration
+        if launch:
+            launch_duration, queue_delay = launch
+            self.launch += launch_duration
+            self.queue += queue_delay
+            self.launches += 1
+
+
+class TraceAnalyzer:
+    """
+    Aggregates GPU kernel time over any number of trace files.
+    """
+
+    def __init__(self, step_gap_us=DEFAULT_STEP_GAP_US):
+        self.step_gap_us = step_gap_us
+        self.names = {}
+        self.kernels = defaultdict(_Stats)
+        self.ops = defaultdict(_Stats)
+        self.steps = []
+        self.files = 0
+        self.events = 0
+
+    def _intern(self, name):
+        return self.names.setdefault(name, len(self.names))
+
+    def add_file(self, path):
+        # per kernel: start, duration, name index, External id, correlation
+        starts, durations = array("d"), array("d")
+        name_ids, external_ids, correlations = array("i"), array("q"), array("q")
+        op_names = {}
+        launches = {}
+
+        for event in iter_events(path):
+            self.events += 1
+            if event.get("ph") != "X":
+                continue
+            category = str(event.get("cat", "")).lower()
+            args = event.get("args") or {}
+            if category in GPU_CATEGORIES:
+                starts.append(float(event["ts"]))
+                durations.append(float(event.get("dur", 0)))
+                name_ids.append(self._intern(event.get("name", "?")))
+                external_ids.append(int(args.get("External id", -1)))
+                correlations.append(int(args.get("correlation", -1)))
+            elif category == "cpu_op" and "External id" in args:
+                op_names[int(args["External id"])] = self._intern(
+                    event.get("name", "?")
+                )
+            elif category in RUNTIME_CATEGORIES and "correlation" in args:
+                launches[int(args["correlation"])] = (
+                    float(event["ts"]),
+                    float(event.get("dur", 0)),
+                )
+
+        self.files += 1
+        if not starts:
+            return
+        order = sorted(range(len(starts)), key=starts.__getitem__)
+        names = list(self.names)
+        step_kinds = self._split_steps(path, order, starts, durations, name_ids, names)
+        for index, kind in zip(order, step_kinds):
+            name = names[name_ids[index]]
+            launch = launches.get(correlations[index])
+            if launch:
+                launch = (launch[1], starts[index] - launch[0])
+            self.kernels[name].add(durations[index], kind, launch)
+            op_id = op_names.get(external_ids[index])
+            op = names[op_id] if op_id is not None else UNATTRIBUTED
+            self.ops[op].add(durations[index], kind, launch)
+
+    def _split_steps(self, path, order, starts, durations, name_ids, names):
+        """
+        Returns the kind of the step of every kernel in order, recording the steps.
+        """
+        bounds = [0]
+        end = starts[order[0]]
+        for position, index in enumerate(order):
+            if starts[index] - end > self.step_gap_us:
+                bounds.append(position)
+            end = max(end, starts[index] + durations[index])
+        bounds.append(len(order))
+
+        steps = []
+        for first, last in zip(bounds, bounds[1:]):
+            kernels = order[first:last]
+            kernel_names = {names[name_ids[index]] for index in kernels}
+            prefill = any(PREFILL_KERNELS.search(name) for name in kernel_names)
+            decode = any(DECODE_KERNELS.search(name) for name in kernel_names)
+            kind = (
+                "mixed"
+                if prefill and decode
+                else "prefill" if prefill else "decode" if decode else None
+            )
+            steps.append(
+                {
+                    "file": str(path),
+                    "start_us": starts[kernels[0]],
+                    "gpu_us": sum(durations[index] for index in kernels),
+                    "kernels": len(kernels),
+                    "kind": kind,
+                }
+            )
+        unnamed = [step["gpu_us"] for step in steps if step["kind"] is None]
+        median = statistics.median(unnamed) if unnamed else 0
+        for step in steps:
+            if step["kind"] is None:
+                step["kind"] = "prefill" if step["gpu_us"] > 2 * median else "decode"
+        self.steps.extend(steps)
+
+        kinds = []
+        for step in steps:
+            kinds.extend([step["kind"]] * step["kernels"])
+        return kinds
+
+    def summary(self):
+        total = sum(stats.total for stats in self.kernels.values())
+        launches = sum(stats.launches for stats in self.kernels.values())
+        return {
+            "files": self.files,
+            "events": self.events,
+            "kernels": sum(stats.count for stats in self.kernels.values()),
+            "unique_kernels": len(self.kernels),
+            "gpu_time_us": total,
+            "steps": {
+                kind: {
+                    "count": sum(step["kind"] == kind for step in self.steps),
+                    "gpu_us": sum(
+                        step["gpu_us"] for step in self.steps if step["kind"] == kind
+                    ),
+                }
+                for kind in KINDS
+            },
+            "launch_us_mean": (
+                sum(stats.launch for stats in self.kernels.values()) / launches
+                if launches
+                else None
+            ),
+            "queue_us_mean": (
+                sum(stats.queue for stats in self.kernels.values()) / launches
+                if launches
+                else None
+            ),
+        }
+
+
+TABLE_COLUMNS = [
+    "name",
+    "count",
+    "total_us",
+    "mean_us",
+    "min_us",
+    "max_us",
+    "pct",
+    *(f"{kind}_us" for kind in KINDS),
+    "launch_us_mean",
+    "queue_us_mean",
+]
+
+
+def table_rows(stats_by_name):
+    total = sum(stats.total for stats in stats_by_name.values()) or 1
+    rows = []
+    for name, stats in sorted(stats_by_name.items(), key=lambda item: -item[1].total):
+        rows.append(
+            {
+                "name": name,
+                "count": stats.count,
+                "total_us": round(stats.total, 3),
+                "mean_us": round(stats.total / stats.count, 3),
+                "min_us": round(stats.min, 3),
+                "max_us": round(stats.max, 3),
+                "pct": round(stats.total / total * 100, 3),
+                **{f"{kind}_us": round(stats.kinds[kind], 3) for kind in KINDS},
+                "launch_us_mean": (
+                    round(stats.launch / stats.launches, 3) if stats.launches else None
+                ),
+                "queue_us_mean": (
+                    round(stats.queue / stats.launches, 3) if stats.launches else None
+                ),
+            }
+        )
+    return rows
+
+
+def write_csv(path, columns, rows):
+    with path.open("w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def read_csv(path):
+    with path.open("r", newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def _short(name, width=80):
+    return name if len(name) <= width else name[: width - 3] + "..."
+
+
+def print_top(title, rows, top):
+    print(f"\n{title}")
+    print_table(
+        ["name", "count", "total_ms", "mean_us", "pct", "prefill_ms", "decode_ms"],
+        [
+            [
+                _short(row["name"]),
+                row["count"],
+                f"{float(row['total_us']) / 1000:.3f}",
+                f"{float(row['mean_us']):.2f}",
+                f"{float(row['pct']):.1f}",
+                f"{float(row['prefill_us']) / 1000:.3f}",
+                f"{float(row['decode_us']) / 1000:.3f}",
+            ]
+            for row in rows[:top]
+        ],
+    )
+
+
+def default_output_dir(paths):
+    first = Path(paths[0])
+    return (first if first.is_dir() else first.parent) / "trace_analysis"
+
+
+def analyze(paths, output_dir, top=20, step_gap_us=DEFAULT_STEP_GAP_US):
+    analyzer = TraceAnalyzer(step_gap_us)
+    for path in trace_files(paths):
+        print(f"Reading {path}")
+        analyzer.add_file(path)
+    if not analyzer.files:
+        print(f"No traces found in {', '.join(map(str, paths))}", file=sys.stderr)
+        return None
+
+    output_dir = Path(output_dir or default_output_dir(paths))
+    output_dir.mkdir(parents=True, exist_ok=True)
+    kernels, ops = table_rows(analyzer.kernels), table_rows(analyzer.ops)
+    write_csv(output_dir / "kernels.csv", TABLE_COLUMNS, kernels)
+    write_csv(output_dir / "ops.csv", TABLE_COLUMNS, ops)
+    write_csv(
+        output_dir / "steps.csv",
+        ["file", "start_us", "gpu_us", "kernels", "kind"],
+        analyzer.steps,
+    )
+    summary = analyzer.summary()
+    with (output_dir / "summary.json").open("w") as f:
+        json.dump(summary, f, indent=2)
+
+    if top:
+        print_top("Kernels by GPU time", kernels, top)
+        print_top("Ops by GPU time of their kernels", ops, top)
+    steps = summary["steps"]
+    print(
+        f"\n{summary['kernels']} kernels in {summary['files']} traces, "
+        f"{summary['gpu_time_us'] / 1000:.1f} ms GPU time, "
+        + ", ".join(
+            f"{kind}: {steps[kind]['count']} steps / {steps[kind]['gpu_us'] / 1000:.1f} ms"
+            for kind in KINDS
+        )
+    )
+    print(f"Tables written to {output_dir}")
+    return output_dir
+
+
+def load_table(path, by, step_gap_us):
+    # an analysis dir as written by analyze, otherwise traces which are analyzed first
+    path = Path(path)
+    table_path = path / f"{by}s.csv"
+    if not table_path.exists():
+        analysis_dir = path / "trace_analysis" if path.is_dir() else None
+        if analysis_dir and (analysis_dir / f"{by}s.csv").exists():
+            table_path = analysis_dir / f"{by}s.csv"
+        else:
+            output_dir = analyze([path], None, top=0, step_gap_us=step_gap_us)
+            if output_dir is None:
+                sys.exit(1)
+            table_path = output_dir / f"{by}s.csv"
+    return {row["name"]: row for row in read_csv(table_path)}
+
+
+def diff(path_a, path_b, by="kernel", top=20, step_gap_us=DEFAULT_STEP_GAP_US):
+    """
+    Per-call time and share of GPU time of the top kernels/ops of two analyses, e.g. the same
+    model on two GPUs. Kernel names often differ between architectures, ops don't.
+    """
+    table_a = load_table(path_a, by, step_gap_us)
+    table_b = load_table(path_b, by, step_gap_us)
+
+    def share(table, name):
+        return float(table[name]["pct"]) if name in table else 0.0
+
+    names = sorted(
+        set(table_a) | set(table_b),
+        key=lambda name: -max(share(table_a, name), share(table_b, name)),
+    )[:top]
+    rows = []
+    for name in names:
+        row_a, row_b = table_a.get(name), table_b.get(name)
+        mean_a = float(row_a["mean_us"]) if row_a else None
+        mean_b = float(row_b["mean_us"]) if row_b else None
+        rows.append(
+            [
+                _short(name),
+                row_a["count"] if row_a else "",
+                row_b["count"] if row_b else "",
+                f"{mean_a:.2f}" if mean_a is not None else "",
+                f"{mean_b:.2f}" if mean_b is not None else "",
+                (
+                    f"{(mean_b - mean_a) / mean_a * 100:+.1f}%"
+                    if mean_a and mean_b
+                    else ""
+                ),
+                f"{share(table_a, name):.1f}",
+                f"{share(table_b, name):.1f}",
+            ]
+        )
+    print_table(
+        [by, "count_a", "count_b", "mean_us_a", "mean_us_b", "delta", "pct_a", "pct_b"],
+        rows,
+    )
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Stream-parse Chrome traces into per-kernel and per-op hot lists."
+    )
+    parser.add_argument(
+        "--step-gap-us",
+        help="Idle GPU time (microseconds) separating two steps.",
+        type=float,
+        default=DEFAULT_STEP_GAP_US,
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    analyze_parser = subparsers.add_parser(
+        "analyze", help="Aggregate trace files, or every trace below run directories."
+    )
+    analyze_parser.add_argument("paths", nargs="+")
+    analyze_parser.add_argument(
+        "-o",
+        "--output-dir",
+        help="Where the tables are written, <first path>/trace_analysis by default.",
+    )
+    analyze_parser.add_argument("--top", type=int, default=20)
+
+    diff_parser = subparsers.add_parser(
+        "diff", help="Compare two analyses (or run directories / traces)."
+    )
+    diff_parser.add_argument("path_a")
+    diff_parser.add_argument("path_b")
+    diff_parser.add_argument("--by", choices=("kernel", "op"), default="kernel")
+    diff_parser.add_argument("--top", type=int, default=20)
+
+    args = parser.parse_args()
+    if args.command == "analyze":
+        if analyze(args.paths, args.output_dir, args.top, args.step_gap_us) is None:
+            sys.exit(1)
+    else:
+        diff(args.path_a, args.path_b, args.by, args.top, args.step_gap_us)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+import sys
+from pathlib import Path
+
+# the scripts import each other as top-level modules, like when run from their directory
+SCRIPTS_DIR = Path(__file__).parents[1] / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR / "host"))
+sys.path.insert(0, str(SCRIPTS_DIR / "container"))
+sys.path.insert(0, str(SCRIPTS_DIR / "container" / "runners"))
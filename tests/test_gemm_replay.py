@@ -0,0 +1,95 @@
+import pytest
+
+from gemm_replay import TorchBackend, bench_args, export_bench, replay
+from hipblaslt_log import KEY_FIELDS, GemmAggregate, parse_line
+
+LOG_LINE = (
+    "hipblaslt-bench --api_method c -m 4096 -n 128 -k 1024 --lda 1024 --ldb 1024 "
+    "--ldc 4096 --ldd 4096 --stride_a 0 --stride_b 0 --stride_c 0 --stride_d 0 "
+    "--alpha 1.000000 --beta 0.000000 --transA T --transB N --batch_count 1 "
+    "--a_type f16_r --b_type f16_r --c_type f16_r --d_type f16_r "
+    "--scale_type f32_r --bias_type f32_r --compute_type c_f32_r"
+)
+
+
+def gemm(m, n, k, trans_a, trans_b, batch=1, dtype="f32_r"):
+    return {
+        "m": m,
+        "n": n,
+        "k": k,
+        "batch_count": batch,
+        "transA": trans_a,
+        "transB": trans_b,
+        "a_type": dtype,
+        "b_type": dtype,
+        "c_type": dtype,
+        "d_type": dtype,
+        "compute_type": "f32_r",
+    }
+
+
+class FixedBackend:
+    name = "fixed"
+
+    def supports(self, gemm):
+        return True
+
+    def time(self, gemm, warmup, repeats, rounds):
+        return 1e-6 * gemm["m"] / 1024
+
+
+def test_log_line_round_trips_to_bench_line(tmp_path):
+    aggregate = GemmAggregate()
+    for _ in range(3):
+        aggregate.feed(LOG_LINE)
+    aggregate.feed(LOG_LINE.replace("-m 4096", "-m 1024"))
+
+    results = replay(aggregate.records(), FixedBackend())
+    assert [result["total_us"] for result in results] == [12, 1]
+
+    out_path = tmp_path / "tune.txt"
+    assert export_bench(results, out_path, top=1) == 1
+    line = out_path.read_text()
+    assert line == (
+        "hipblaslt-bench -m 4096 -n 128 -k 1024 --batch_count 1 --transA T --transB N "
+        "--a_type f16_r --b_type f16_r --c_type f16_r --d_type f16_r "
+        "--compute_type f32_r\n"
+    )
+    # the exported line parses back to the logged GEMM
+    assert parse_line(line) == parse_line(LOG_LINE)
+    assert dict(zip(KEY_FIELDS, parse_line(line))) == {
+        name: results[0][name] for name in KEY_FIELDS
+    }
+
+
+def test_bench_args_skip_missing_types():
+    args = bench_args(gemm(8, 4, 2, "N", "N") | {"c_type": "", "compute_type": ""})
+    assert "--c_type" not in args and "--compute_type" not in args
+
+
+@pytest.mark.parametrize("trans_a", ["N", "T"])
+@pytest.mark.parametrize("trans_b", ["N", "T"])
+@pytest.mark.parametrize("batch", [1, 3])
+def test_torch_operands_match_column_major_layout(trans_a, trans_b, batch):
+    torch = pytest.importorskip("torch")
+    m, n, k = 24, 8, 16
+    a, b = TorchBackend("cpu").operands(gemm(m, n, k, trans_a, trans_b, batch))
+
+    # the column-major operands hipBLASLt sees are the transposed torch tensors
+    op_a, op_b = a.transpose(-2, -1), b.transpose(-2, -1)
+    assert op_a.shape[-2:] == (m, k) and op_b.shape[-2:] == (k, n)
+    # A is stored m x k (lda = m) for N, k x m (lda = k) read transposed for T
+    assert op_a.stride()[-2:] == ((1, m) if trans_a == "N" else (k, 1))
+    assert op_b.stride()[-2:] == ((1, k) if trans_b == "N" else (n, 1))
+    assert a.shape[:-2] == b.shape[:-2] == ((batch,) if batch > 1 else ())
+
+    result = torch.matmul(b, a)
+    expected = torch.matmul(op_a, op_b)
+    torch.testing.assert_close(result.transpose(-2, -1), expected)
+
+
+def test_torch_backend_times_on_cpu():
+    pytest.importorskip("torch")
+    backend = TorchBackend("cpu")
+    assert not backend.supports(gemm(8, 8, 8, "N", "N") | {"b_type": "f16_r"})
+    assert backend.time(gemm(32, 16, 8, "T", "N", batch=2), 1, 2, 2) > 0
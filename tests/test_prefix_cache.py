@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+from runner_utilities.mock import MockLLM, SamplingParams
+from runner_utilities.phases import PHASES
+from runner_utilities.prefix_cache import ARMS, run_prefix_ab
+from telemetry import annotate_metrics
+
+
+class ConstantPower:
+    # stands in for a TelemetrySampler at a constant 100 W
+    def summary(self):
+        return {"power_mean_w": 100}
+
+    def energy(self, start=None, end=None):
+        return 100 * (end - start)
+
+
+def test_both_arms_get_their_own_steady_state(tmp_path, monkeypatch):
+    monkeypatch.setenv("LOG_DIR", str(tmp_path))
+    monkeypatch.setenv("MOCK_DECODE_MS_PER_STEP", "1")
+    llm = MockLLM()
+    prompts = [f"shared system prompt {'word ' * 40} question {i}" for i in range(4)]
+    with PHASES.phase("engine_init"):
+        pass
+
+    run_prefix_ab("mock", None, 3, llm, prompts, SamplingParams(max_tokens=4))
+    annotate_metrics(tmp_path, ConstantPower())
+
+    for arm in ARMS:
+        metrics = json.loads((tmp_path / arm / "metrics.json").read_text())
+        names = [phase["name"] for phase in metrics["phases"]]
+        assert names[:2] == ["engine_init", "warmup"]
+        steady_state = metrics["phases"][2:]
+        assert [phase["name"] for phase in steady_state] == ["steady_state"] * 3
+        assert {phase["arm"] for phase in steady_state} == {arm}
+        busy = sum(phase["duration_s"] for phase in steady_state)
+        tokens = metrics["prompt_tokens"] + metrics["generation_tokens"]
+        assert metrics["telemetry"]["tokens_per_j"] == pytest.approx(
+            tokens / (100 * busy)
+        )
+    assert PHASES.drain() == []
@@ -0,0 +1,88 @@
+import csv
+import json
+
+import pytest
+
+from telemetry import annotate_metrics, start_sampler
+
+DEVICE = "/dev/dri/renderD128"
+
+
+def write_sysfs(root, power_file="power1_average"):
+    # raw sysfs units: bytes, microwatts, millidegrees and Hz
+    device = root / "class" / "drm" / "renderD128" / "device"
+    hwmon = device / "hwmon" / "hwmon3"
+    hwmon.mkdir(parents=True)
+    (device / "gpu_busy_percent").write_text("42\n")
+    (device / "mem_info_vram_used").write_text(f"{3 * 2**30}\n")
+    (hwmon / power_file).write_text("150000000\n")
+    (hwmon / "temp1_input").write_text("55000\n")
+    (hwmon / "temp2_input").write_text("61500\n")
+    (hwmon / "freq1_input").write_text("2100000000\n")
+
+
+@pytest.fixture
+def sysfs(tmp_path, monkeypatch):
+    root = tmp_path / "sys"
+    monkeypatch.setenv("GPU_DEVICE", DEVICE)
+    monkeypatch.setenv("TELEMETRY", "1")
+    monkeypatch.setenv("TELEMETRY_INTERVAL_MS", "10")
+    monkeypatch.setenv("TELEMETRY_SYSFS_ROOT", str(root))
+    return root
+
+
+def test_samples_are_scaled_to_column_units(sysfs, tmp_path):
+    write_sysfs(sysfs)
+    sampler = start_sampler(tmp_path)
+    summary = sampler.stop()
+
+    with (tmp_path / "telemetry.csv").open(newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == summary["samples"] >= 2
+    assert rows[0]["busy_pct"] == "42.0"
+    assert rows[0]["vram_used_mib"] == "3072.0"
+    assert rows[0]["power_w"] == "150.0"
+    assert rows[0]["temp_edge_c"] == "55.0"
+    assert rows[0]["temp_junction_c"] == "61.5"
+    assert rows[0]["sclk_mhz"] == "2100.0"
+    # sensors the device doesn't have stay empty
+    assert rows[0]["temp_mem_c"] == rows[0]["mclk_mhz"] == ""
+    assert summary["power_mean_w"] == summary["power_max_w"] == 150
+    assert summary["vram_peak_mib"] == 3072
+
+
+def test_power_falls_back_to_instantaneous(sysfs, tmp_path):
+    write_sysfs(sysfs, power_file="power1_input")
+    sampler = start_sampler(tmp_path)
+    assert sampler.stop()["power_mean_w"] == 150
+
+
+def test_no_sensors_disables_sampler(sysfs, tmp_path):
+    assert start_sampler(tmp_path) is None
+
+
+def test_annotate_metrics_tokens_per_j(sysfs, tmp_path):
+    write_sysfs(sysfs)
+    sampler = start_sampler(tmp_path)
+    sampler.stop()
+    start = sampler.samples[0][0]
+    # 2 s of steady state at 150 W is 300 J
+    metrics = {
+        "prompt_tokens": 600,
+        "generation_tokens": 300,
+        "phases": [
+            {"name": "warmup", "start": start - 1, "end": start},
+            {"name": "steady_state", "start": start, "end": start + 2},
+        ],
+    }
+    point_dir = tmp_path / "batch_size_8"
+    point_dir.mkdir()
+    (point_dir / "metrics.json").write_text(json.dumps(metrics))
+
+    annotate_metrics(tmp_path, sampler)
+
+    telemetry = json.loads((point_dir / "metrics.json").read_text())["telemetry"]
+    assert telemetry["steady_state_energy_j"] == pytest.approx(300)
+    assert telemetry["tokens_per_j"] == pytest.approx(3)
+    assert telemetry["generation_tokens_per_j"] == pytest.approx(1)
+    assert telemetry["power_mean_w"] == 150
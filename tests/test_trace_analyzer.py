@@ -0,0 +1,57 @@
+import gzip
+import json
+
+import pytest
+
+import trace_analyzer
+from trace_analyzer import iter_events
+
+
+def event(i):
+    return {"name": f"kernel_{i}", "ph": "X", "cat": "kernel", "ts": i, "dur": 1}
+
+
+def write_trace(path, events, tail="]}"):
+    body = ",\n".join(e if isinstance(e, str) else json.dumps(e) for e in events)
+    with gzip.open(path, "wt") as f:
+        f.write('{"schemaVersion": 1, "traceEvents": [' + body + tail)
+
+
+@pytest.mark.parametrize("chunk_size", [7, 64, 1 << 20])
+def test_events_are_decoded_across_chunks(tmp_path, chunk_size):
+    path = tmp_path / "trace.json.gz"
+    write_trace(path, [event(i) for i in range(50)])
+    assert list(iter_events(path, chunk_size)) == [event(i) for i in range(50)]
+
+
+@pytest.mark.parametrize("chunk_size", [16, 1 << 20])
+def test_malformed_event_is_skipped(tmp_path, capsys, chunk_size):
+    path = tmp_path / "trace.json.gz"
+    broken = '{"name": "broken", "args": {"x": nan-ish}}'
+    write_trace(path, [event(0), broken, *(event(i) for i in range(1, 20))])
+
+    events = list(iter_events(path, chunk_size))
+
+    assert events == [event(i) for i in range(20)]
+    assert "malformed" in capsys.readouterr().err
+
+
+def test_event_size_is_capped(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(trace_analyzer, "MAX_EVENT_SIZE", 256)
+    path = tmp_path / "trace.json.gz"
+    # valid JSON but longer than an event may be, buffering stops at MAX_EVENT_SIZE
+    huge = {"name": "huge", "args": {"values": [0] * 1000}}
+    write_trace(path, [event(0), huge, *(event(i) for i in range(1, 200))])
+
+    events = list(iter_events(path, chunk_size=32))
+
+    assert events == [event(i) for i in range(200)]
+    assert "malformed" in capsys.readouterr().err
+
+
+def test_truncated_trace_keeps_complete_events(tmp_path, capsys):
+    path = tmp_path / "trace.json.gz"
+    write_trace(path, [event(0), event(1), '{"name": "cut'], tail="")
+
+    assert list(iter_events(path, chunk_size=16)) == [event(0), event(1)]
+    assert "truncated" in capsys.readouterr().err